@@ -0,0 +1,262 @@
+import io
+import os
+import curses
+import hashlib
+import threading
+
+from typing import Dict, Optional
+
+import Formats
+
+
+# The shades of each channel in the 6x6x6 color cube of 256-color terminals
+LEVELS = 6
+CUBE = 16
+
+
+def colorIndex(r: int, g: int, b: int) -> int:
+    """
+    Summary:
+    -------
+    returns the 256-color terminal color closest to a pixel.
+
+    Parameters:
+    -------
+    r, g, b : int
+        The channels of the pixel, between 0 and 255
+
+    Returns:
+    -------
+    int
+        The index of the color in the color cube
+    """
+
+    return CUBE + 36 * ((r * (LEVELS - 1) + 127) // 255) \
+        + 6 * ((g * (LEVELS - 1) + 127) // 255) \
+        + (b * (LEVELS - 1) + 127) // 255
+
+
+class Palette:
+    def __init__(self, first: int):
+        """
+        Summary:
+        -------
+        hands out the color pairs (foreground and background)
+        the art is drawn with, creating them when first needed.
+
+        Parameters:
+        -------
+        first : int
+            The first color pair that can be used, the ones
+            before are left to the rest of the program
+        """
+
+        self.first = first
+        self.__pairs: Dict[tuple, int] = {}
+
+    @property
+    def available(self) -> int:
+        return max(min(curses.COLOR_PAIRS, 32767) - self.first - len(self.__pairs), 0)
+
+    def reset(self):
+        self.__pairs = {}
+
+    def pair(self, foreground: int, background: int) -> Optional[int]:
+        """
+        Summary:
+        -------
+        returns the attribute of a color pair.
+
+        Parameters:
+        -------
+        foreground : int
+            The color of the characters
+
+        background : int
+            The color behind the characters
+
+        Returns:
+        -------
+        int
+            The attribute, or None if there are no pairs left
+        """
+
+        key = (foreground, background)
+        if key not in self.__pairs:
+            if not self.available:
+                return None
+            self.__pairs[key] = self.first + len(self.__pairs)
+            curses.init_pair(self.__pairs[key], foreground, background)
+        return curses.color_pair(self.__pairs[key])
+
+
+class ArtCache:
+    def __init__(self, folder, index):
+        """
+        Summary:
+        -------
+        turns the cover art of the songs into thumbnails
+        small enough to be drawn in the terminal.
+        Thumbnails are named after the hash of the image they
+        come from, so the songs sharing the same art (an album)
+        share the same thumbnail, and are kept on disk so
+        an image is only ever decoded once.
+
+        Parameters:
+        -------
+        folder : str
+            The folder the thumbnails are stored in
+
+        index : IndexCache
+            Remembers which image belongs to which song
+        """
+
+        self.folder = folder
+        self.index = index
+        self.__thumbnails: Dict[tuple, Optional[bytes]] = {}
+        self.__lock = threading.Lock()
+        # The thumbnails made in the background, by song, and the one to make next
+        self.__made: Dict[tuple, Optional[bytes]] = {}
+        self.__wanted = None
+        self.__wake = threading.Condition(self.__lock)
+        self.__changed = False
+        self.__thread = None
+
+    def request(self, path, width, height) -> Optional[bytes]:
+        """
+        Summary:
+        -------
+        returns the cover art of a song, scaled down, without waiting
+        for it: reading the art and scaling it is done in the
+        background, and ready() tells when it's done. Only the latest
+        art asked for is made, the songs scrolled past are skipped.
+
+        Parameters:
+        -------
+        path : str
+            The path of the song
+
+        width : int
+            The width of the thumbnail, in pixels
+
+        height : int
+            The height of the thumbnail, in pixels
+
+        Returns:
+        -------
+        bytes
+            The RGB pixels of the thumbnail, row by row, or None
+            if it isn't made yet or the song has no (readable) art
+        """
+
+        wanted = (path, width, height)
+        with self.__lock:
+            if wanted in self.__made:
+                return self.__made[wanted]
+            self.__wanted = wanted
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__work, name="art", daemon=True)
+                self.__thread.start()
+            self.__wake.notify()
+        return None
+
+    def ready(self) -> bool:
+        # Wether thumbnails were made since the last call
+        with self.__lock:
+            changed, self.__changed = self.__changed, False
+        return changed
+
+    def __work(self):
+        while True:
+            with self.__wake:
+                self.__wake.wait_for(lambda: self.__wanted is not None)
+                wanted, self.__wanted = self.__wanted, None
+            try:
+                pixels = self.thumbnail(*wanted)
+            except OSError:
+                pixels = None
+            with self.__lock:
+                self.__made[wanted] = pixels
+                self.__changed = True
+
+    def thumbnail(self, path, width, height) -> Optional[bytes]:
+        """
+        Summary:
+        -------
+        returns the cover art of a song, scaled down.
+
+        Parameters:
+        -------
+        path : str
+            The path of the song
+
+        width : int
+            The width of the thumbnail, in pixels
+
+        height : int
+            The height of the thumbnail, in pixels
+
+        Returns:
+        -------
+        bytes
+            The RGB pixels of the thumbnail, row by row,
+            or None if the song has no (readable) art
+        """
+
+        data = None
+        key = self.index.get(path, "art")
+        if key is None:
+            try:
+                data = Formats.art(path)
+            except Exception:
+                data = None
+            key = hashlib.sha1(data).hexdigest() if data else ""
+            self.index.set(path, "art", key)
+        if not key:
+            return None
+
+        size = (key, width, height)
+        with self.__lock:
+            if size in self.__thumbnails:
+                return self.__thumbnails[size]
+
+        file = os.path.join(self.folder, f"{key}-{width}x{height}.rgb")
+        try:
+            with open(file, "rb") as f:
+                pixels = f.read()
+        except OSError:
+            pixels = None
+
+        if pixels is None or len(pixels) != width * height * 3:
+            if data is None:
+                try:
+                    data = Formats.art(path)
+                except Exception:
+                    data = None
+            pixels = self.__scale(data, width, height) if data else None
+            if pixels is not None:
+                os.makedirs(self.folder, exist_ok=True)
+                # Written aside first so a crash never leaves a broken thumbnail
+                with open(file + ".tmp", "wb") as f:
+                    f.write(pixels)
+                os.replace(file + ".tmp", file)
+
+        with self.__lock:
+            self.__thumbnails[size] = pixels
+        return pixels
+
+    @staticmethod
+    def __scale(data, width, height) -> Optional[bytes]:
+        # Pillow is optional, without it no art is shown
+        try:
+            from PIL import Image
+        except ImportError:
+            return None
+
+        try:
+            image = Image.open(io.BytesIO(data))
+            # JPEGs are decoded straight at a lower resolution
+            image.draft("RGB", (width, height))
+            return image.convert("RGB").resize((width, height), Image.BILINEAR).tobytes()
+        except Exception:
+            return None
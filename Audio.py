@@ -0,0 +1,80 @@
+import os
+import threading
+
+
+class Mixer:
+    def __init__(self):
+        """
+        Summary:
+        -------
+        gives access to pygame's mixer.
+        pygame is imported and the audio device is opened
+        in the background, so neither of them slows down
+        the startup. Using the mixer waits for them to be ready.
+        """
+
+        self.__mixer = None
+        self.__stream = None
+        self.__streamSettings = None
+        self.__error = None
+        self.__ready = threading.Event()
+        self.__thread = None
+        self.__lock = threading.Lock()
+
+    def init(self):
+        """
+        Summary:
+        -------
+        starts opening the audio device, if it wasn't already.
+        """
+
+        with self.__lock:
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__open, daemon=True)
+                self.__thread.start()
+
+    def __open(self):
+        # Hides the banner pygame prints when imported
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        try:
+            from pygame import mixer
+            mixer.init()
+            self.__mixer = mixer
+        except Exception as e:
+            self.__error = e
+        finally:
+            self.__ready.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.__ready.is_set() and self.__mixer is not None
+
+    def useStream(self, **settings):
+        """
+        Summary:
+        -------
+        plays through Stream.Stream rather than mixer.music.
+        It's created once the audio device is open.
+
+        Parameters:
+        -------
+        settings : Any
+            The settings of the stream (crossfade, equalizer)
+        """
+
+        self.__streamSettings = settings
+
+    @property
+    def music(self):
+        self.init()
+        self.__ready.wait()
+        if self.__mixer is None:
+            raise RuntimeError(f"Audio device hasn't been opened: {self.__error}")
+        if self.__streamSettings is None:
+            return self.__mixer.music
+
+        with self.__lock:
+            if self.__stream is None:
+                import Stream
+                self.__stream = Stream.Stream(self.__mixer, **self.__streamSettings)
+        return self.__stream
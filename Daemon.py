@@ -0,0 +1,1099 @@
+import os
+import json
+import stat
+import time
+import signal
+import socket
+import struct
+import tempfile
+import threading
+import subprocess
+
+from collections import deque
+from typing import Dict, List, Optional
+
+import History
+import Parser
+import Session
+import SmartPlaylist
+
+from Library import IndexShards, LibraryIndex, Queue, Song
+
+
+# How often the daemon looks for changes to send to the players, in seconds
+INTERVAL = 0.1
+# How long a player waits for a daemon it started to be ready, in seconds
+STARTUP = 5
+# How many shuffled songs past the one a player needs the daemon draws at once
+DRAW_AHEAD = 100
+# The credentials of the process at the other end of a socket (pid, uid, gid), see SO_PEERCRED
+PEER = struct.Struct("3i")
+# How much a client may fall behind on what it's sent, in bytes, before it's dropped
+BACKLOG = 64 * 1024 * 1024
+# The errors of the engine a failed command raises again in the players, the others are RuntimeErrors
+ERRORS = {error.__name__: error for error in (ValueError, KeyError)}
+
+
+def socketPath() -> str:
+    """
+    Summary:
+    -------
+    returns the Unix socket the daemon listens on.
+    There is one per user, in the runtime folder when there is one,
+    otherwise in a folder of the temporary folder only the user can open.
+
+    Returns:
+    -------
+    str
+        The path of the socket
+
+    Raises:
+    -------
+    PermissionError
+        If the folder belongs to someone else or others can open it
+    """
+
+    folder = os.environ.get("XDG_RUNTIME_DIR")
+    if not folder:
+        folder = os.path.join(tempfile.gettempdir(), f"musicli-{os.getuid()}")
+        try:
+            os.mkdir(folder, 0o700)
+        except FileExistsError:
+            pass
+    # Whoever can write to the folder could put their own socket in place of the daemon's
+    info = os.lstat(folder)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{folder} isn't private to the user")
+    return os.path.join(folder, f"musicli-{os.getuid()}.sock")
+
+
+def _peerIsUser(connection) -> bool:
+    # Where the credentials can't be read (outside of Linux), the private folder of the socket is relied on
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    _, uid, _ = PEER.unpack(connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEER.size))
+    return uid == os.getuid()
+
+
+def _encode(message: Dict) -> bytes:
+    # One JSON document per line
+    return json.dumps(message, default=str).encode("utf-8", "surrogateescape") + b"\n"
+
+
+def _send(connection, message: Dict):
+    connection.sendall(_encode(message))
+
+
+def _messages(connection):
+    # Reads the JSON documents sent on a connection, until it's closed
+    with connection.makefile("rb") as stream:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line.decode("utf-8", "surrogateescape"))
+
+
+def _songInfo(song) -> Dict:
+    # What the scripts get to know about a song
+    return {"path": song.path, "title": song.title, "artist": song.artist,
+            "album": song.album, "length": song.length}
+
+
+def _songState(song, library) -> List:
+    # The songs of the library are already known by the players, only their path is sent
+    return [song.path] if library.get(song.path) is song else [song.path, song.metadata]
+
+
+class Outbox:
+    def __init__(self, connection):
+        """
+        Summary:
+        -------
+        sends the messages of one client from a thread of its own,
+        so a client that reads slowly holds up neither the daemon
+        nor the other clients. Once it's too far behind, it's
+        closed rather than waited for.
+
+        Parameters:
+        -------
+        connection : socket
+            The connection of the client
+        """
+
+        self.connection = connection
+        # The topics the client subscribed to
+        self.topics = set()
+        self.__pending = deque()
+        self.__size = 0
+        self.__closed = False
+        self.__ready = threading.Condition()
+        threading.Thread(target=self.__write, daemon=True).start()
+
+    def put(self, data: bytes) -> bool:
+        # False once the client is closed, or would be too far behind
+        with self.__ready:
+            if self.__closed or self.__size + len(data) > BACKLOG:
+                return False
+            self.__pending.append(data)
+            self.__size += len(data)
+            self.__ready.notify()
+        return True
+
+    def close(self):
+        with self.__ready:
+            self.__closed = True
+            self.__pending.clear()
+            self.__ready.notify()
+        # Closing alone leaves the connection open while it's being read or written
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.connection.close()
+
+    def __write(self):
+        while True:
+            with self.__ready:
+                self.__ready.wait_for(lambda: self.__pending or self.__closed)
+                if self.__closed:
+                    return
+                data = self.__pending.popleft()
+            try:
+                self.connection.sendall(data)
+            except OSError:
+                self.close()
+                return
+            with self.__ready:
+                self.__size -= len(data)
+
+
+class Server:
+    def __init__(self, engine, path: str, configFile: Optional[str] = None):
+        """
+        Summary:
+        -------
+        shares an engine with the players and the scripts attached to it.
+        Every message is a JSON document on its own line. Commands
+        ({"id", "cmd", "args"}) are answered with {"id", "ok", "result"
+        or "error"}. A batch ({"id", "batch": [{"cmd", "args"}...]}) runs
+        every command at once and is answered with {"id", "ok", "results"},
+        one result per command, so many changes cost a single round trip.
+        A failed command also gets the "type" of its error.
+        After the "subscribe" command, the changes are sent as soon as
+        they happen: {"event": "changes"...} to the players ("library"),
+        {"event": "status"...} to the scripts ("status").
+
+        Parameters:
+        -------
+        engine : Engine
+            The engine to share
+
+        path : str
+            The Unix socket to listen on
+
+        configFile : str
+            The config file the playlists are saved to, if any
+        """
+
+        self.engine = engine
+        self.path = path
+        self.configFile = configFile
+        # What each connection is sent, and the topics it subscribed to
+        self.__clients: Dict[socket.socket, Outbox] = {}
+        # Held while sending, so the changes reach every client in the order they happen
+        self.__sendLock = threading.Lock()
+        self.__scanning = None
+        # The queue the players mirror, only its changes are sent until it's replaced
+        self.__mirrored = None
+        self.__running = False
+        self.__socket = None
+        self.commands = {
+            "play": self.__play,
+            "setQueue": engine.setQueue,
+            "enqueue": engine.enqueue,
+            "next": engine.next,
+            "previous": engine.previous,
+            "jump": engine.jump,
+            "pause": engine.pause,
+            "resume": engine.resume,
+            "seek": engine.seek,
+            "setVolume": engine.setVolume,
+            "setShuffled": engine.setShuffled,
+            "move": engine.move,
+            "playNext": engine.playNext,
+            "remove": engine.remove,
+            "startScan": engine.startScan,
+            "configure": engine.configure,
+            "updateSong": self.__updateSong,
+            "saveSession": engine.saveSession,
+            "search": self.__search,
+            "status": self.status,
+            "queue": self.__songs,
+            "drawQueue": self.__drawQueue,
+            "playlists": engine.playlists,
+            "createPlaylist": engine.createPlaylist,
+            "deletePlaylist": engine.deletePlaylist,
+            "addToPlaylist": engine.addToPlaylist,
+            "removeFromPlaylist": engine.removeFromPlaylist,
+        }
+
+    def listen(self):
+        """
+        Summary:
+        -------
+        opens the socket, replacing the one a daemon that
+        didn't stop properly may have left behind.
+        """
+
+        if os.path.exists(self.path):
+            if alive(self.path):
+                raise RuntimeError(f"A daemon is already listening on {self.path}")
+            os.unlink(self.path)
+
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Only the user can attach to their player. The socket is created with
+        # these permissions, it's never open to others, even for a moment
+        mask = os.umask(0o177)
+        try:
+            self.__socket.bind(self.path)
+        finally:
+            os.umask(mask)
+        self.__socket.listen()
+        self.__running = True
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+    def close(self):
+        self.__running = False
+        if self.__socket is not None:
+            self.__socket.close()
+            self.__socket = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        with self.__sendLock:
+            for client in self.__clients.values():
+                client.close()
+            self.__clients = {}
+
+    def __accept(self):
+        while self.__running:
+            try:
+                connection, _ = self.__socket.accept()
+            except OSError:
+                break
+            if not _peerIsUser(connection):
+                connection.close()
+                continue
+            threading.Thread(target=self.__serve, args=(connection, ), daemon=True).start()
+
+    def __serve(self, connection):
+        # Answers the commands of one client
+        client = Outbox(connection)
+        with self.__sendLock:
+            self.__clients[connection] = client
+
+        try:
+            for message in _messages(connection):
+                if not isinstance(message, dict):
+                    response = {"id": None, "ok": False, "error": "A command is a JSON object"}
+                elif message.get("cmd") == "subscribe":
+                    self.__subscribe(client, message)
+                    continue
+                elif not isinstance(message.get("batch", []), list):
+                    response = {"id": message.get("id"), "ok": False, "error": "A batch is a list of commands"}
+                elif "batch" in message:
+                    # Every command runs before anything is sent, so the clients get the changes at once
+                    with self.engine.lock:
+                        results = [self.__run(command) for command in message["batch"]]
+                    response = {"id": message.get("id"), "ok": all(result["ok"] for result in results),
+                                "results": results}
+                else:
+                    response = dict(self.__run(message), id=message.get("id"))
+
+                # The client sees what its commands changed as soon as it gets the answer
+                self.broadcast()
+                with self.__sendLock:
+                    self.__post(client, _encode(response))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.__sendLock:
+                self.__clients.pop(connection, None)
+            client.close()
+
+    def __post(self, client, data: bytes):
+        # Called with the send lock held. A client that fell too far behind is dropped
+        if not client.put(data):
+            self.__clients.pop(client.connection, None)
+            client.close()
+
+    def __run(self, command) -> Dict:
+        if not isinstance(command, dict):
+            return {"ok": False, "error": "A command is a JSON object"}
+        if command.get("cmd") not in self.commands:
+            return {"ok": False, "error": f"Unknown command {command.get('cmd')}"}
+        try:
+            with self.engine.lock:
+                result = self.commands[command["cmd"]](*command.get("args", []))
+            return {"ok": True, "result": result}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}", "type": type(e).__name__}
+
+    def __subscribe(self, client, message):
+        # Answered with the current state, so the client misses no change after it
+        topics = set((message.get("args") or [["status"]])[0])
+        with self.__sendLock:
+            with self.engine.lock:
+                # The changes made so far reach the other clients first, the snapshot already has them
+                self.__broadcast()
+                result = {"status": self.status()}
+                if "library" in topics:
+                    result["snapshot"] = self.__snapshot()
+            client.topics = topics
+            self.__post(client, _encode({"id": message.get("id"), "ok": True, "result": result}))
+
+    def __play(self, path=None, start=1.0):
+        # Without a song, carries on with the queue
+        if path is None:
+            if self.engine.playingSong:
+                self.engine.resume()
+                return True
+            return bool(len(self.engine.queue)) and self.engine.jump(self.engine.queue.index)
+        return self.engine.play(self.engine.library.get(path) or Song(path), start)
+
+    def __updateSong(self, path):
+        song = self.engine.library.get(path)
+        if song is not None:
+            # The player that changed the tags already wrote them to the file
+            song.reload()
+            self.engine.updateSong(song)
+
+    def __search(self, query, limit=50) -> List[Dict]:
+        return [_songInfo(song) for song in self.engine.search(query, limit)]
+
+    def __drawQueue(self, index):
+        # The players don't shuffle, they get what's drawn here with the changes
+        queue = self.engine.queue
+        if len(queue):
+            queue[min(index, len(queue) - 1)]
+
+    def __songs(self, start=0, count=None) -> List[Dict]:
+        queue = self.engine.queue
+        end = len(queue) if count is None else min(start + count, len(queue))
+        return [_songInfo(queue[i]) for i in range(start, end)]
+
+    def status(self) -> Dict:
+        """
+        Summary:
+        -------
+        returns what the daemon is doing, as sent to the scripts.
+
+        Returns:
+        -------
+        Dict
+            The "song" being played, wether it's "paused", the
+            "position" in it, the "volume", the "index" of the song
+            in the queue and its "length", wether it's "shuffled",
+            the "playlist" it comes from and the songs found by the
+            running scans ("scanning")
+        """
+
+        engine = self.engine
+        return {"song": _songInfo(engine.playingSong) if engine.playingSong else None,
+                "paused": engine.paused,
+                "position": engine.position(),
+                "volume": engine.configuration["volume"],
+                "index": engine.queue.index,
+                "length": len(engine.queue),
+                "shuffled": engine.queue.shuffled,
+                "playlist": engine.currentPlaylist,
+                "scanning": engine.scanning}
+
+    def __snapshot(self) -> Dict:
+        # Everything a player needs to show its first frame
+        library = self.engine.library
+        return {"songs": [[song.path, song.metadata] for song in library.allSongs],
+                "queue": self.__queue(),
+                "status": self.__status(),
+                "playlists": self.engine.playlists(),
+                **self.__scanState()}
+
+    def __queue(self) -> Dict:
+        # The whole queue, its changes are journaled from then on
+        queue = self.engine.queue
+        self.__mirrored = queue
+        queue.journal = []
+        # The order they were queued in comes back when the shuffle is turned off.
+        # Shuffled songs are drawn when first needed, and sent once drawn
+        return {"songs": [_songState(song, self.engine.library) for song in queue.linearSongs],
+                "order": queue.positions() if queue.shuffled else None,
+                "drawn": queue.drawn,
+                "index": queue.index,
+                "shuffled": queue.shuffled,
+                "playlist": self.engine.currentPlaylist}
+
+    def __queueChanges(self) -> Dict:
+        # What changed since the queue was last sent, replayed by the players
+        library = self.engine.library
+        changes, self.__mirrored.journal = self.__mirrored.journal, []
+        return {"changes": [[*change[:3], _songState(change[3], library), change[4]] if change[0] == "insert"
+                            else list(change) for change in changes],
+                "playlist": self.engine.currentPlaylist}
+
+    def __status(self) -> Dict:
+        song = self.engine.playingSong
+        return {"song": [song.path, song.metadata] if song else None,
+                "paused": self.engine.paused,
+                "position": self.engine.position(),
+                "volume": self.engine.configuration["volume"]}
+
+    def __scanState(self) -> Dict:
+        return {"scanning": self.engine.scanning,
+                "scanned": self.engine.scanned,
+                "eagerScanned": self.engine.eagerScanned}
+
+    def __savePlaylists(self, playlists):
+        # The rest of the file belongs to the players, only the playlists are replaced
+        if self.configFile is None:
+            return
+        configuration = {key: value for key, value in Parser.readConfigFile(self.configFile).items()
+                         if not key.startswith("playlist_")}
+        configuration.update({f"playlist_{name}": paths for name, paths in playlists.items()})
+        Parser.writeConfigFile(self.configFile, configuration)
+
+    def broadcast(self):
+        """
+        Summary:
+        -------
+        sends what changed in the engine since the last call
+        to every client that subscribed to it.
+        """
+
+        with self.__sendLock:
+            self.__broadcast()
+
+    def __broadcast(self):
+        # Called with the send lock held
+        with self.engine.lock:
+            changes = self.engine.update()
+            event = {"event": "changes"}
+            if changes["added"]:
+                event["added"] = [[song.path, song.metadata] for song in changes["added"]]
+            if changes["removed"]:
+                event["removed"] = changes["removed"]
+            if changes["updated"]:
+                event["updated"] = [[song.path, song.metadata] for song in changes["updated"]]
+            # A new queue is sent whole, otherwise only what changed in it
+            if self.engine.queue is not self.__mirrored:
+                event["queue"] = self.__queue()
+            elif changes["queue"] or self.__mirrored.journal:
+                event["queue"] = self.__queueChanges()
+            if changes["status"] or "queue" in event:
+                event["status"] = self.__status()
+            if changes["playlists"]:
+                event["playlists"] = self.engine.playlists()
+            if changes["played"]:
+                event["played"] = changes["played"]
+            if changes["scanned"] or self.engine.scanning != self.__scanning:
+                self.__scanning = self.engine.scanning
+                event.update(self.__scanState(), finished=changes["scanned"])
+            status = {"event": "status", **self.status()} \
+                if changes["status"] or "queue" in event else None
+
+        if changes["playlists"]:
+            try:
+                self.__savePlaylists(event["playlists"])
+            except OSError:
+                pass
+
+        if len(event) == 1:
+            return
+        # Encoded once for every client
+        event = _encode(event)
+        status = _encode(status) if status is not None else None
+        for client in list(self.__clients.values()):
+            if "library" in client.topics:
+                self.__post(client, event)
+            if "status" in client.topics and status is not None:
+                self.__post(client, status)
+
+    def serveForever(self):
+        sessionSavedAt = time.monotonic()
+        while self.__running:
+            time.sleep(INTERVAL)
+            self.broadcast()
+            # Keeps the session even if the daemon is killed
+            if time.monotonic() - sessionSavedAt > 30:
+                sessionSavedAt = time.monotonic()
+                self.engine.saveSession()
+
+
+def alive(path: str) -> bool:
+    """
+    Summary:
+    -------
+    tells wether a daemon is listening on a socket.
+
+    Parameters:
+    -------
+    path : str
+        The path of the socket
+
+    Returns:
+    -------
+    bool
+        Wether a daemon accepted the connection
+    """
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def spawn(command: List[str], path: Optional[str] = None) -> bool:
+    """
+    Summary:
+    -------
+    starts the daemon in the background, unless it's already running,
+    and waits for it to be ready. The daemon keeps running after
+    the terminal is closed.
+
+    Parameters:
+    -------
+    command : List
+        The command that starts the daemon
+
+    path : str
+        The socket the daemon listens on. By default, socketPath()
+
+    Returns:
+    -------
+    bool
+        Wether the daemon is running
+    """
+
+    try:
+        path = path or socketPath()
+    except PermissionError:
+        return False
+    if alive(path):
+        return True
+
+    subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + STARTUP
+    while time.monotonic() < deadline:
+        if alive(path):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def serve(engine, path: Optional[str] = None, configFile: Optional[str] = None):
+    """
+    Summary:
+    -------
+    runs the daemon: starts the library scan, resumes the
+    previous session and shares the engine until it's stopped.
+
+    Parameters:
+    -------
+    engine : Engine
+        The engine to share
+
+    path : str
+        The socket to listen on. By default, socketPath()
+
+    configFile : str
+        The config file the playlists are saved to
+    """
+
+    server = Server(engine, path or socketPath(), configFile)
+    server.listen()
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    engine.startScan()
+    session = Session.load(engine.sessionFile)
+    if session:
+        engine.restoreSession(session)
+
+    try:
+        server.serveForever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        engine.saveSession()
+        engine.close()
+
+
+class Control:
+    def __init__(self, path: Optional[str] = None):
+        """
+        Summary:
+        -------
+        a connection to the daemon, for the players and the scripts.
+        Answers and events are read in the background, so events
+        can be waited for while commands are being sent.
+
+        Parameters:
+        -------
+        path : str
+            The socket the daemon listens on. By default, socketPath()
+
+        Raises:
+        -------
+        OSError
+            If no daemon of the user is listening
+        """
+
+        self.connected = True
+        self.__connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.__connection.connect(path or socketPath())
+            # Commands and songs are only shared with a daemon of the same user
+            if not _peerIsUser(self.__connection):
+                raise PermissionError("The daemon belongs to another user")
+        except OSError:
+            self.__connection.close()
+            raise
+        self.__id = 0
+        self.__events = []
+        self.__responses = {}
+        self.__received = threading.Condition()
+        threading.Thread(target=self.__receive, daemon=True).start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __receive(self):
+        try:
+            for message in _messages(self.__connection):
+                with self.__received:
+                    if "event" in message:
+                        self.__events.append(message)
+                    else:
+                        self.__responses[message["id"]] = message
+                    self.__received.notify_all()
+        except (OSError, ValueError):
+            pass
+        with self.__received:
+            self.connected = False
+            self.__received.notify_all()
+
+    def __send(self, message) -> Dict:
+        # Sends a message and waits for its answer
+        with self.__received:
+            if not self.connected:
+                raise ConnectionError("The daemon stopped")
+            self.__id += 1
+            messageId = self.__id
+            try:
+                _send(self.__connection, dict(message, id=messageId))
+            except OSError:
+                self.connected = False
+                raise ConnectionError("The daemon stopped")
+            self.__received.wait_for(lambda: messageId in self.__responses or not self.connected)
+            if messageId not in self.__responses:
+                raise ConnectionError("The daemon stopped")
+            return self.__responses.pop(messageId)
+
+    def request(self, command: str, *args):
+        """
+        Summary:
+        -------
+        runs a command in the daemon and waits for its answer.
+
+        Parameters:
+        -------
+        command : str
+            The name of the command
+
+        args : Any
+            Its arguments, which have to fit in JSON
+
+        Returns:
+        -------
+        Any
+            What the command returned
+
+        Raises:
+        -------
+        ValueError, KeyError
+            If the command failed with one of these errors in the engine,
+            the same way it does when the engine is in the player
+
+        RuntimeError
+            If the command failed otherwise
+
+        ConnectionError
+            If the daemon is gone
+        """
+
+        response = self.__send({"cmd": command, "args": list(args)})
+        if not response["ok"]:
+            if response.get("type") in ERRORS:
+                raise ERRORS[response["type"]](response["error"].split(": ", 1)[-1])
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def batch(self, commands: List) -> List[Dict]:
+        """
+        Summary:
+        -------
+        runs several commands in a single round trip.
+        A failing command doesn't stop the ones after it.
+
+        Parameters:
+        -------
+        commands : List
+            The name and the arguments of each command,
+            as ("enqueue", [path...]) for example
+
+        Returns:
+        -------
+        List
+            The answer of each command, as {"ok", "result" or "error"}
+        """
+
+        response = self.__send({"batch": [{"cmd": command[0], "args": list(command[1:])}
+                                          for command in commands]})
+        return response["results"]
+
+    def subscribe(self, *topics) -> Dict:
+        # "status" for the playback status, "library" for everything a player shows
+        return self.request("subscribe", list(topics or ("status", )))
+
+    def events(self, timeout: Optional[float] = 0) -> List[Dict]:
+        """
+        Summary:
+        -------
+        returns the events received since the last call.
+
+        Parameters:
+        -------
+        timeout : float
+            How long to wait for one when there are none.
+            None waits until one comes
+
+        Returns:
+        -------
+        List
+            The events, oldest first
+        """
+
+        with self.__received:
+            if timeout != 0:
+                self.__received.wait_for(lambda: self.__events or not self.connected, timeout)
+            events, self.__events = self.__events, []
+        return events
+
+    def close(self):
+        try:
+            self.__connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.__connection.close()
+
+
+def connect(configuration: Dict, folder: str, path: Optional[str] = None):
+    """
+    Summary:
+    -------
+    attaches to the daemon, if one is running.
+
+    Parameters:
+    -------
+    configuration : Dict
+        The settings of the player
+
+    folder : str
+        The folder the player keeps its own cache in
+
+    path : str
+        The socket the daemon listens on. By default, socketPath()
+
+    Returns:
+    -------
+    RemoteEngine
+        The daemon's engine, or None if no daemon is running
+    """
+
+    try:
+        control = Control(path)
+    except OSError:
+        return None
+    return RemoteEngine(control, configuration, folder)
+
+
+class RemoteEngine:
+    # Plays the music through the daemon
+    remote = True
+
+    def __init__(self, control: Control, configuration: Dict, folder: str):
+        """
+        Summary:
+        -------
+        an engine running in the daemon, used like a local one.
+        The library, the queue and the playback status are mirrored
+        from what the daemon sends, so reading them never waits
+        for the daemon. Commands wait for its answer.
+
+        Parameters:
+        -------
+        control : Control
+            The connection to the daemon
+
+        configuration : Dict
+            The settings of the player
+
+        folder : str
+            The folder the player keeps its own cache (art...) in
+        """
+
+        self.configuration = configuration
+        # The daemon has its own cache, the player never writes to it
+        self.indexCache = IndexShards(folder, prefix="client")
+        # The daemon writes the history, it's read as of the last flush and then kept up from its events
+        self.history = History.History(folder, writable=False)
+        Song.history = self.history
+        self.library = LibraryIndex(SmartPlaylist.fromConfiguration(self.configuration))
+        self.queue = Queue()
+        self.playingSong = None
+        self.paused = True
+        self.currentPlaylist = None
+        self.scanning = None
+        self.scanned = False
+        self.eagerScanned = False
+        self.lock = threading.RLock()
+        self.__control = control
+        self.__position = 0.0
+        self.__positionAt = time.monotonic()
+        self.__changes = self.__noChanges()
+
+        # The snapshot is applied before the player shows anything
+        self.__apply(dict(control.subscribe("library")["snapshot"], event="snapshot"))
+
+    @staticmethod
+    def __noChanges() -> Dict:
+        return {"added": [], "removed": [], "updated": [], "scanned": False, "status": False, "queue": False,
+                "playlists": False, "played": []}
+
+    @property
+    def connected(self) -> bool:
+        return self.__control.connected
+
+    def __song(self, state) -> Song:
+        # Songs of the library are shared, the others are built from their metadata
+        if len(state) > 1:
+            return Song(state[0], metadata=state[1])
+        return self.library.get(state[0]) or Song(state[0], metadata={})
+
+    def __apply(self, event):
+        # Mirrors what the daemon sent
+        changes = self.__changes
+        if event["event"] == "snapshot":
+            self.library = LibraryIndex(SmartPlaylist.fromConfiguration(self.configuration))
+            event["added"] = event.pop("songs")
+            event["finished"] = True
+
+        for path in event.get("removed", []):
+            self.library.remove(path)
+            changes["removed"].append(path)
+        for kind in ("added", "updated"):
+            for path, metadata in event.get(kind, []):
+                song = Song(path, metadata=metadata)
+                self.library.add(song)
+                changes[kind].append(song)
+
+        if "queue" in event:
+            queue = event["queue"]
+            if "changes" in queue:
+                self.queue.replay([(*change[:3], self.__song(change[3]), change[4]) if change[0] == "insert"
+                                   else change for change in queue["changes"]])
+            else:
+                songs = [self.__song(state) for state in queue["songs"]]
+                self.queue = Queue(*songs, start=queue["index"], shuffled=queue["shuffled"],
+                                   order=queue["order"], drawn=queue["drawn"])
+                # The daemon shuffles, the mirror never draws by itself
+                self.queue.fetch = self.__drawQueue
+            self.currentPlaylist = queue["playlist"]
+            changes["queue"] = True
+
+        if "status" in event:
+            status = event["status"]
+            song = status["song"]
+            if song is None:
+                self.playingSong = None
+            elif self.playingSong is None or self.playingSong.path != song[0] \
+                    or self.playingSong.metadata != song[1]:
+                self.playingSong = next((other for other in self.queue.allSongs if other.path == song[0]
+                                         and other.metadata == song[1]), None) or Song(song[0], metadata=song[1])
+            self.paused = status["paused"]
+            self.__position = status["position"]
+            self.__positionAt = time.monotonic()
+            self.configuration["volume"] = status["volume"]
+            changes["status"] = True
+
+        for entry in event.get("played", []):
+            self.history.apply(entry)
+            if entry[1] != "start":
+                self.library.refresh(entry[2])
+            changes["played"].append(entry)
+
+        if "playlists" in event:
+            for key in [key for key in self.configuration if key.startswith("playlist_")]:
+                del self.configuration[key]
+            self.configuration.update({f"playlist_{name}": paths for name, paths in event["playlists"].items()})
+            changes["playlists"] = True
+
+        if "scanning" in event:
+            self.scanning = event["scanning"]
+            self.scanned = event["scanned"]
+            self.eagerScanned = event["eagerScanned"]
+            changes["scanned"] = changes["scanned"] or event["finished"]
+
+    def __drawQueue(self, index):
+        # The songs drawn come back with the daemon's changes, a page at a time
+        self.request("drawQueue", index + DRAW_AHEAD)
+
+    def __applyEvents(self):
+        for event in self.__control.events():
+            if event["event"] == "changes":
+                self.__apply(event)
+
+    def request(self, command, *args):
+        """
+        Summary:
+        -------
+        runs a command in the daemon and waits for its answer.
+
+        Parameters:
+        -------
+        command : str
+            The name of the command
+
+        args : Any
+            Its arguments, which have to fit in JSON
+
+        Returns:
+        -------
+        Any
+            What the command returned, or None if the daemon is gone
+        """
+
+        try:
+            return self.__control.request(command, *args)
+        except ConnectionError:
+            return None
+        finally:
+            # The changes caused by the command came before its answer
+            self.__applyEvents()
+
+    def update(self) -> Dict:
+        self.__applyEvents()
+        changes, self.__changes = self.__changes, self.__noChanges()
+        return changes
+
+    def position(self) -> float:
+        if not self.playingSong:
+            return 0.0
+        if self.paused:
+            return self.__position
+        return self.__position + time.monotonic() - self.__positionAt
+
+    def play(self, song, start=1.0) -> bool:
+        return bool(self.request("play", song.path, start))
+
+    def setQueue(self, songs, start=0, shuffled=False, playlist=None) -> bool:
+        paths = [song if isinstance(song, str) else song.path for song in songs]
+        return bool(self.request("setQueue", paths, start, shuffled, playlist))
+
+    def enqueue(self, songs, next=False) -> int:
+        paths = [song if isinstance(song, str) else song.path for song in songs]
+        return self.request("enqueue", paths, next) or 0
+
+    def next(self) -> bool:
+        return bool(self.request("next"))
+
+    def previous(self) -> bool:
+        return bool(self.request("previous"))
+
+    def jump(self, index) -> bool:
+        return bool(self.request("jump", index))
+
+    def pause(self):
+        self.request("pause")
+
+    def resume(self):
+        self.request("resume")
+
+    def seek(self, seconds):
+        self.request("seek", seconds)
+
+    def setVolume(self, volume):
+        self.configuration["volume"] = volume
+        self.request("setVolume", volume)
+
+    def setShuffled(self, shuffled):
+        self.request("setShuffled", shuffled)
+
+    def move(self, index, to):
+        self.request("move", index, to)
+
+    def playNext(self, index):
+        self.request("playNext", index)
+
+    def remove(self, index):
+        self.request("remove", index)
+
+    def startScan(self):
+        self.request("startScan")
+
+    def configure(self, settings: Dict):
+        self.request("configure", settings)
+
+    def updateSong(self, song):
+        self.request("updateSong", song.path)
+
+    def search(self, query: str, limit: int = 50) -> List:
+        return [self.library.get(song["path"]) or Song(song["path"], metadata=song)
+                for song in self.request("search", query, limit) or []]
+
+    def playlists(self) -> Dict[str, List[str]]:
+        return {key[9:]: value for key, value in self.configuration.items() if key.startswith("playlist_")}
+
+    def createPlaylist(self, name, paths=()):
+        self.request("createPlaylist", name, list(paths))
+
+    def deletePlaylist(self, name):
+        self.request("deletePlaylist", name)
+
+    def addToPlaylist(self, name, paths) -> int:
+        return self.request("addToPlaylist", name, list(paths)) or 0
+
+    def removeFromPlaylist(self, name, paths) -> int:
+        return self.request("removeFromPlaylist", name, list(paths)) or 0
+
+    def restoreSession(self, session):
+        # The daemon resumed the previous session when it started
+        pass
+
+    def saveSession(self, browsing: Optional[Dict] = None):
+        self.request("saveSession", browsing)
+
+    def close(self):
+        # Only the player goes away, the music keeps playing
+        self.indexCache.save()
+        self.__control.close()
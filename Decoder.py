@@ -0,0 +1,96 @@
+import shutil
+import subprocess
+
+from typing import Iterator
+
+
+def available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def spawn(path: str, rate: int = 44100, channels: int = 2, start: float = 0.0) -> subprocess.Popen:
+    """
+    Summary:
+    -------
+    starts decoding a song into raw audio with ffmpeg.
+    The audio is read from the process's stdout, by pcm or
+    straight into a buffer (readinto) to avoid any copy.
+
+    Parameters:
+    -------
+    path : str
+        The song to decode
+
+    rate : int
+        The sample rate to convert the audio to
+
+    channels : int
+        The number of channels to mix the audio to
+
+    start : float
+        Where to start decoding from, in seconds
+
+    Returns:
+    -------
+    subprocess.Popen
+        The ffmpeg process, writing signed 16 bit little endian
+        samples with the channels interleaved
+    """
+
+    # Given before the input, ffmpeg jumps there instead of decoding everything before it
+    seek = ["-ss", f"{start:.3f}"] if start > 0 else []
+    return subprocess.Popen(["ffmpeg", "-nostdin", "-v", "error", *seek, "-i", path,
+                             "-f", "s16le", "-ac", str(channels), "-ar", str(rate), "-"],
+                            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+
+def close(process: subprocess.Popen):
+    # Stops a decoding, finished or not
+    process.stdout.close()
+    if process.poll() is None:
+        process.kill()
+    process.wait()
+
+
+def pcm(path: str, rate: int = 44100, channels: int = 2, chunk: int = 1 << 16, start: float = 0.0) -> Iterator[bytes]:
+    """
+    Summary:
+    -------
+    decodes a song of any format into raw audio, a piece at a time.
+    The decoding itself is done by ffmpeg, in its own process.
+
+    Parameters:
+    -------
+    path : str
+        The song to decode
+
+    rate : int
+        The sample rate to convert the audio to
+
+    channels : int
+        The number of channels to mix the audio to
+
+    chunk : int
+        The size of the pieces, in bytes
+
+    start : float
+        Where to start decoding from, in seconds
+
+    Returns:
+    -------
+    Iterator
+        Signed 16 bit little endian samples, with the channels interleaved
+    """
+
+    process = spawn(path, rate, channels, start)
+    try:
+        while True:
+            data = process.stdout.read(chunk)
+            if not data:
+                break
+            yield data
+    finally:
+        close(process)
+
+    if process.returncode:
+        raise RuntimeError(f"Couldn't decode {path}")
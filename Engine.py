@@ -0,0 +1,866 @@
+import os
+import time
+import threading
+
+from typing import Dict, List, Optional
+
+import Audio
+import Formats
+import FrameIndex
+import History
+import Loudness
+import Scanner
+import Session
+import SmartPlaylist
+import Stream
+
+from Library import IndexShards, LibraryIndex, Queue, Song
+
+
+supportedExtensions = list(Formats.readers)
+mixer = Audio.Mixer()
+# How many times a song is started while the audio device finishes opening, and the wait in between (seconds)
+PLAY_ATTEMPTS = 10
+PLAY_RETRY = 0.05
+# How a music root is scanned: at startup, or in the background after the eager ones
+SCANS = ("eager", "lazy")
+
+
+def _root(root) -> List:
+    # A root can be written as its path alone, or without its last settings
+    return [root, "eager", 0] if isinstance(root, str) else list(root) + ["eager", 0][len(root) - 1:]
+
+
+def rootsAreValid(roots) -> bool:
+    # Written as [[path, scan, interval], ...], with the interval in minutes
+    if not isinstance(roots, list) or \
+            not all(isinstance(root, str) or isinstance(root, (list, tuple)) and 1 <= len(root) <= 3 for root in roots):
+        return False
+    return all(isinstance(path, str) and path and scan in SCANS and
+               isinstance(interval, (int, float)) and not isinstance(interval, bool) and interval >= 0
+               for path, scan, interval in map(_root, roots))
+
+
+class Engine:
+    # Plays the music itself, unlike Daemon.RemoteEngine
+    remote = False
+
+    def __init__(self, configuration: Dict, folder: str):
+        """
+        Summary:
+        -------
+        everything that plays music, without the interface:
+        the library and its scanners, the queue and the audio.
+        It runs inside the player, or inside the daemon
+        (see Daemon.py) for the players attached to it.
+
+        Parameters:
+        -------
+        configuration : Dict
+            The settings, shared with the interface
+
+        folder : str
+            The folder the caches and the session are stored in
+        """
+
+        # Decoding the songs itself allows crossfading and the equalizer, mixer.music can't do either
+        self.streaming = configuration["playback"] == "stream" and Stream.available()
+        if self.streaming:
+            mixer.useStream(crossfade=configuration["crossfade"], equalizer=configuration["equalizer"])
+        mixer.init()
+
+        self.configuration = configuration
+        self.folder = folder
+        self.indexCache = IndexShards(folder)
+        Song.cache = self.indexCache
+        self.sessionFile = os.path.join(folder, "session.snapshot")
+        self.loudness = Loudness.Analyzer(self.indexCache, configuration["loudnessWorkers"])
+        self.history = History.History(folder)
+        Song.history = self.history
+
+        self.library = LibraryIndex(SmartPlaylist.fromConfiguration(self.configuration))
+        self.queue = Queue()
+        self.playingSong = None
+        self.paused = True
+        self.playStart = 0.0
+        # The gain (dB) that brings the playing song to the same loudness as the others
+        self.gain = 0.0
+        # The playlist the queue comes from, if any
+        self.currentPlaylist = None
+        # Where the user was in the library, saved with the session
+        self.browsing = {"view": "album", "album": None, "browsePath": [], "insideAlbum": False}
+        # Held by everything that touches the queue or the audio
+        self.lock = threading.RLock()
+        self.scanners: Dict[str, Scanner.Scanner] = {}
+        self.scannedAt: Dict[str, float] = {}
+        self.__thread = None
+        # The song whose start was recorded in the history, until it ends
+        self.__listening = None
+        # The song the stream decodes ahead of time, to play after the current one
+        self.__queued = None
+        self.__changes = self.__noChanges()
+
+    @staticmethod
+    def __noChanges() -> Dict:
+        return {"added": [], "removed": [], "updated": [], "scanned": False, "status": False, "queue": False,
+                "playlists": False, "played": []}
+
+    # Library
+
+    def roots(self) -> List:
+        """
+        Summary:
+        -------
+        returns the folders the library is made of.
+
+        Returns:
+        -------
+        List
+            The [path, scan, interval] of each folder. The music folder
+            comes first and is always scanned eagerly
+        """
+
+        roots = [[os.path.abspath(self.configuration["musicFolder"]), "eager", 0]]
+        for root in self.configuration["musicRoots"]:
+            path, scan, interval = _root(root)
+            roots.append([os.path.abspath(os.path.expanduser(path)), scan, interval])
+        return roots
+
+    @property
+    def scanning(self) -> Optional[int]:
+        # The number of songs found by the running scans, None if nothing is being scanned
+        scanners = list(self.scanners.values())
+        return sum(scanner.found for scanner in scanners) if scanners else None
+
+    @property
+    def scanned(self) -> bool:
+        # Every folder was scanned at least once
+        return not self.scanners and all(path in self.scannedAt for path, _, _ in self.roots())
+
+    @property
+    def eagerScanned(self) -> bool:
+        return not any(scan != "lazy" and path in self.scanners for path, scan, _ in self.roots())
+
+    def startScan(self):
+        """
+        Summary:
+        -------
+        empties the library and starts looking for songs
+        in the music folders, in the background.
+        """
+
+        with self.lock:
+            for scanner in self.scanners.values():
+                scanner.stop()
+            self.scanners = {}
+            self.scannedAt = {}
+            removed = [song.path for song in self.library.allSongs]
+            self.library = LibraryIndex(SmartPlaylist.fromConfiguration(self.configuration))
+            self.__changes["removed"].extend(removed)
+
+        self.indexCache.setRoots([path for path, _, _ in self.roots()])
+        self.scheduleScans()
+
+    def scheduleScans(self):
+        """
+        Summary:
+        -------
+        starts scanning the folders that are due: the eager ones
+        right away, the lazy ones once the eager ones are done,
+        and every folder again once its interval has passed.
+        """
+
+        roots = self.roots()
+        eagerScanning = not self.eagerScanned
+        now = time.monotonic()
+
+        for path, scan, interval in roots:
+            if path in self.scanners:
+                continue
+            if path not in self.scannedAt:
+                if scan == "lazy" and eagerScanning:
+                    continue
+            elif not interval or now - self.scannedAt[path] < interval * 60:
+                continue
+
+            self.scanners[path] = Scanner.Scanner([path], supportedExtensions, Song,
+                                                  self.configuration["includeGlobs"],
+                                                  self.configuration["excludeGlobs"], Formats.sniff)
+            self.scanners[path].start()
+
+    def __collectScannedSongs(self):
+        # Adds the songs found by the scanners since the last call to the library.
+        # Once a folder is scanned, the songs that aren't in it anymore are removed
+        finished = False
+        for root, scanner in list(self.scanners.items()):
+            # Read before draining, so no song found before the end is left behind
+            done = scanner.done
+            # Rescans find the same songs again, only the new or changed ones are added
+            songs = [song for song in scanner.drain()
+                     if self.library.get(song.path) is None or self.library.get(song.path).added != song.added]
+            if songs:
+                self.library.extend(songs)
+                self.__changes["added"].extend(songs)
+
+            if done:
+                del self.scanners[root]
+                self.scannedAt[root] = time.monotonic()
+                finished = True
+                # An unreachable folder (unmounted drive...) keeps its songs until it's back
+                if not scanner.missing:
+                    prefix = os.path.join(root, "")
+                    for song in self.library.allSongs:
+                        if song.path.startswith(prefix) and song.path not in scanner.paths:
+                            self.library.remove(song.path)
+                            self.__changes["removed"].append(song.path)
+
+        if finished:
+            self.indexCache.save()
+            self.__changes["scanned"] = True
+
+    def update(self) -> Dict:
+        """
+        Summary:
+        -------
+        does the periodic work (collecting the songs found by the
+        scanners, starting the scans that are due) and tells what
+        changed since the last call.
+
+        Returns:
+        -------
+        Dict
+            The songs "added" to, "removed" (paths) from and "updated"
+            in the library, wether a folder finished being "scanned",
+            wether the playback "status", the "queue" or the
+            "playlists" changed, and the events "played" (History)
+        """
+
+        with self.lock:
+            self.__collectScannedSongs()
+            self.scheduleScans()
+            # Songs whose play count changed move in the views and smart playlists that depend on it.
+            # It's done here rather than by the queue thread, as the interface reads the library meanwhile
+            for _, event, path, _ in self.__changes["played"]:
+                if event != "start":
+                    self.library.refresh(path)
+            changes, self.__changes = self.__changes, self.__noChanges()
+        # Outside of the lock, so playback never waits for the disk
+        self.history.flush()
+        return changes
+
+    def configure(self, settings: Dict):
+        """
+        Summary:
+        -------
+        changes some settings, like the music folder.
+        The folders are scanned again by startScan().
+
+        Parameters:
+        -------
+        settings : Dict
+            The settings to change and their new value
+        """
+
+        with self.lock:
+            self.configuration.update(settings)
+
+    def updateSong(self, song):
+        """
+        Summary:
+        -------
+        moves a song to its new place in the library after its tags changed.
+
+        Parameters:
+        -------
+        song : Song
+            The song that changed
+        """
+
+        with self.lock:
+            # Without a playing song the queue thread doesn't move on
+            self.__endListening(completed=False)
+            mixer.music.stop()
+            mixer.music.unload()
+            self.playingSong = None
+            self.library.update(song)
+            self.__changes["updated"].append(song)
+            self.__changes["status"] = True
+
+    def search(self, query: str, limit: int = 50) -> List:
+        """
+        Summary:
+        -------
+        finds the songs whose title, artist or album contain every word of a query.
+
+        Parameters:
+        -------
+        query : str
+            The words to look for, in any case
+
+        limit : int
+            The most songs to return
+
+        Returns:
+        -------
+        List
+            The matching songs, in library order
+        """
+
+        words = query.lower().split()
+        found = []
+        for song in self.library.allSongs:
+            text = f"{song.title} {song.artist} {song.album}".lower()
+            if all(word in text for word in words):
+                found.append(song)
+                if len(found) >= limit:
+                    break
+        return found
+
+    # Playback
+
+    def play(self, song, start=1.0) -> bool:
+        """
+        Summary:
+        -------
+        plays a given song.
+
+        Parameters:
+        -------
+        song : Song
+            The song to play
+
+        start : float
+            The start time of the song
+
+        Returns:
+        -------
+        bool
+            Wether the song could be played
+        """
+
+        gain = self.getGain(song)
+        with self.lock:
+            self.__endListening(completed=False)
+            self.playingSong = song
+            self.playStart = start
+            self.gain = gain
+
+            try:
+                if self.streaming:
+                    # Not stopped first, the song may already be fading in
+                    mixer.music.load(song.path, length=song.length)
+                else:
+                    mixer.music.stop()
+                    mixer.music.load(song.path)
+                # Loading resets the volume, it's set before the song is heard
+                self.applyVolume()
+                self.__startPlayback(start)
+            except Exception:
+                # The library reads more formats than pygame can play (M4A...),
+                # and there may be no audio device at all
+                self.playingSong = None
+            else:
+                self.paused = False
+                self.__listening = song
+                self.__record("start", song)
+                self.__queueNext()
+            self.__changes["status"] = True
+
+        if self.playingSong is None:
+            return False
+
+        # Measures the next song while this one plays, so its gain is ready in time.
+        # Reading it may draw it, which is a change of the queue
+        with self.lock:
+            if self.queue.index + 1 < len(self.queue) and self.configuration["replayGain"] != "off":
+                self.loudness.analyze(self.queue[self.queue.index + 1])
+
+        # Indexes the song's frames in the background, so it can be seeked quickly
+        if song.path.lower().endswith(".mp3") and self.indexCache.get(song.path, "frames") is None:
+            threading.Thread(target=self.__indexFrames, args=(song.path,), daemon=True).start()
+
+        if self.__thread is None or not self.__thread.is_alive():
+            self.__thread = threading.Thread(target=self.__queueHelper, daemon=True)
+            self.__thread.start()
+        return True
+
+    @staticmethod
+    def __startPlayback(start):
+        # Retried while the audio device finishes opening ("pygame.error: Audio device hasn't been opened"),
+        # any other error is raised right away
+        for attempt in range(PLAY_ATTEMPTS):
+            try:
+                mixer.music.play(start=start)
+                return
+            except Exception as e:
+                if "hasn't been opened" not in str(e) or attempt == PLAY_ATTEMPTS - 1:
+                    raise
+            time.sleep(PLAY_RETRY)
+
+    def __queueNext(self, changed=False):
+        # The stream decodes the next song ahead of time, to fade into it (or play it without a gap).
+        # When the queue changed, the song queued before is replaced, unless it's still the next one
+        if not self.streaming or self.playingSong is None:
+            return
+        following = self.queue[self.queue.index + 1] if self.queue.index + 1 < len(self.queue) else None
+        if changed and following is self.__queued:
+            return
+        self.__queued = following
+        if following is None:
+            mixer.music.unqueue()
+            return
+        gain = self.getGain(following)
+        mixer.music.queue(following.path, length=following.length, gain=10 ** ((gain - self.gain) / 20))
+
+    def setQueue(self, songs, start=0, shuffled=False, playlist=None) -> bool:
+        """
+        Summary:
+        -------
+        replaces the queue and plays its first song.
+
+        Parameters:
+        -------
+        songs : List
+            The songs (or their paths) to queue
+
+        start : int
+            The index of the song to start from
+
+        shuffled : bool
+            Wether the songs after the first one are played randomly
+
+        playlist : str
+            The name of the playlist the songs come from, if any
+
+        Returns:
+        -------
+        bool
+            Wether the first song could be played
+        """
+
+        songs = [self.library.get(song) or song if isinstance(song, str) else song for song in songs]
+        with self.lock:
+            self.currentPlaylist = playlist
+            self.queue = Queue(*songs, start=start, shuffled=shuffled)
+            self.__changes["queue"] = True
+            if not len(self.queue):
+                return False
+            return self.play(self.queue.current, start=0.0)
+
+    def next(self) -> bool:
+        with self.lock:
+            return bool(len(self.queue)) and self.play(self.queue.advance())
+
+    def previous(self) -> bool:
+        with self.lock:
+            return bool(len(self.queue)) and self.play(self.queue.rewind())
+
+    def jump(self, index) -> bool:
+        with self.lock:
+            self.queue.index = index
+            return self.play(self.queue.current)
+
+    def pause(self):
+        with self.lock:
+            if self.playingSong and not self.paused:
+                mixer.music.pause()
+                self.paused = True
+                self.__changes["status"] = True
+
+    def resume(self):
+        with self.lock:
+            if self.playingSong and self.paused:
+                mixer.music.unpause()
+                self.paused = False
+                self.__changes["status"] = True
+
+    def __indexFrames(self, path):
+        # Builds the frame index of a song and stores it in the cache
+        try:
+            index = FrameIndex.build(path)
+        except OSError:
+            return
+        if index is not None:
+            self.indexCache.set(path, "frames", index)
+
+    def seek(self, seconds):
+        """
+        Summary:
+        -------
+        moves the playback position of the current song.
+        When the song has a frame index, playback restarts
+        from the exact frame, without going through the decoder's
+        own (slow, for VBR files) seeking.
+
+        Parameters:
+        -------
+        seconds : float
+            How much to move by. Negative values seek backwards
+        """
+
+        if not self.playingSong or not isinstance(self.playingSong.length, (int, float)):
+            return
+
+        position = min(max(self.position() + seconds, 0.0), max(self.playingSong.length - 1, 0.0))
+        index = self.indexCache.get(self.playingSong.path, "frames")
+
+        with self.lock:
+            # The stream seeks with the decoder itself
+            if index is not None and not self.streaming:
+                offset, position = index.locate(position)
+                mixer.music.load(FrameIndex.FileSlice(self.playingSong.path, offset), "mp3")
+                self.applyVolume()
+                mixer.music.play()
+            else:
+                mixer.music.play(start=position)
+            self.playStart = position
+
+            if self.paused:
+                mixer.music.pause()
+            self.__changes["status"] = True
+
+    def position(self) -> float:
+        """
+        Summary:
+        -------
+        returns the playback position of the current song.
+
+        Returns:
+        -------
+        float
+            The position in seconds
+        """
+
+        if not self.playingSong:
+            return 0.0
+
+        # get_pos only counts the time since play() was called
+        return self.playStart + max(mixer.music.get_pos(), 0) / 1000
+
+    def __queueHelper(self):
+        # Plays the next song once the current one is over
+        while True:
+            time.sleep(0.1)
+            with self.lock:
+                # A paused song isn't busy either
+                if self.paused or not self.playingSong or not len(self.queue) or mixer.music.get_busy():
+                    continue
+
+                self.__endListening(completed=True)
+                self.play(self.queue.advance(), start=0.0)
+
+    def __record(self, event, song, position=0.0):
+        self.__changes["played"].append(self.history.record(event, song.path, position, song.length))
+
+    def __endListening(self, completed):
+        # Records how the song that was playing ended
+        song, self.__listening = self.__listening, None
+        if song is None:
+            return
+        if completed:
+            self.__record("complete", song, song.length or self.position())
+        else:
+            self.__record("skip", song, self.position())
+
+    def setVolume(self, volume):
+        with self.lock:
+            self.configuration["volume"] = volume
+            # The mixer may still be opening, in which case the volume is set once a song plays
+            if mixer.ready:
+                self.applyVolume()
+
+    def applyVolume(self):
+        """
+        Summary:
+        -------
+        sets the volume of the mixer from the volume setting
+        and the gain of the playing song.
+        """
+
+        # Usually it should be divided by 100,
+        # But on my test machine the volume was extremely high.
+        mixer.music.set_volume(min(self.configuration["volume"] / 500 * 10 ** (self.gain / 20), 1.0))
+
+    def getGain(self, song) -> float:
+        """
+        Summary:
+        -------
+        returns the gain a song is played with, according to the ReplayGain setting.
+
+        Parameters:
+        -------
+        song : Song
+            The song to play
+
+        Returns:
+        -------
+        float
+            The gain in dB. 0 if it isn't known yet
+        """
+
+        if self.configuration["replayGain"] == "album":
+            gain = self.loudness.albumGain(song, self.library.album(song) or [song])
+        elif self.configuration["replayGain"] == "track":
+            gain = self.loudness.trackGain(song)
+        else:
+            gain = None
+        return gain or 0.0
+
+    # Queue
+
+    def enqueue(self, songs, next=False) -> int:
+        """
+        Summary:
+        -------
+        adds songs to the queue, without changing the song being played.
+
+        Parameters:
+        -------
+        songs : List
+            The songs (or their paths) to queue
+
+        next : bool
+            Wether they're played right after the current
+            song rather than at the end of the queue
+
+        Returns:
+        -------
+        int
+            The number of songs queued
+        """
+
+        # Every song is loaded before any is queued, so a missing one leaves the queue as it was
+        songs = [self.library.get(song) or Song(song) if isinstance(song, str) else song for song in songs]
+        with self.lock:
+            # Inserted backwards, so they're played in the given order
+            for song in reversed(songs) if next else songs:
+                if next:
+                    self.queue.insertNext(song)
+                else:
+                    self.queue.append(song)
+            self.__changes["queue"] = True
+            self.__queueNext(changed=True)
+        return len(songs)
+
+    def setShuffled(self, shuffled):
+        with self.lock:
+            # The current queue is reordered, not rebuilt
+            self.queue.shuffled = shuffled
+            self.__changes["queue"] = True
+            self.__queueNext(changed=True)
+
+    def move(self, index, to):
+        with self.lock:
+            self.queue.move(index, to)
+            self.__changes["queue"] = True
+            self.__queueNext(changed=True)
+
+    def playNext(self, index):
+        with self.lock:
+            if index != self.queue.index:
+                self.queue.move(index, self.queue.index if index < self.queue.index else self.queue.index + 1)
+                self.__changes["queue"] = True
+                self.__queueNext(changed=True)
+
+    def remove(self, index):
+        # Removes a song from the queue, skipping it if it's playing
+        with self.lock:
+            playing = index == self.queue.index
+            self.queue.pop(index)
+            self.__changes["queue"] = True
+            if playing and len(self.queue):
+                self.play(self.queue.current)
+            elif not playing:
+                self.__queueNext(changed=True)
+
+    # Playlists
+
+    def playlists(self) -> Dict[str, List[str]]:
+        return {key[9:]: value for key, value in self.configuration.items() if key.startswith("playlist_")}
+
+    def __playlist(self, name) -> List[str]:
+        if f"playlist_{name}" not in self.configuration:
+            raise KeyError(f"Playlist {name} doesn't exist")
+        return self.configuration[f"playlist_{name}"]
+
+    def createPlaylist(self, name, paths=()):
+        """
+        Summary:
+        -------
+        creates a playlist, with its songs if it already has some,
+        so a whole imported playlist is stored in one go.
+
+        Parameters:
+        -------
+        name : str
+            The name of the playlist
+
+        paths : List
+            The paths of the songs. Duplicates are left out
+
+        Raises:
+        -------
+        ValueError
+            If the playlist already exists
+        """
+
+        with self.lock:
+            if f"playlist_{name}" in self.configuration:
+                raise ValueError(f"Playlist {name} already exists")
+            self.configuration[f"playlist_{name}"] = list(dict.fromkeys(paths))
+            self.__changes["playlists"] = True
+
+    def deletePlaylist(self, name):
+        with self.lock:
+            self.__playlist(name)
+            del self.configuration[f"playlist_{name}"]
+            if self.currentPlaylist == name:
+                self.currentPlaylist = None
+                self.__changes["queue"] = True
+            self.__changes["playlists"] = True
+
+    def addToPlaylist(self, name, paths) -> int:
+        """
+        Summary:
+        -------
+        adds songs to a playlist. Songs already in it are left out.
+
+        Parameters:
+        -------
+        name : str
+            The name of the playlist
+
+        paths : List
+            The paths of the songs
+
+        Returns:
+        -------
+        int
+            The number of songs added
+        """
+
+        with self.lock:
+            playlist = self.__playlist(name)
+            count = len(playlist)
+            known = set(playlist)
+            for path in paths:
+                if path not in known:
+                    known.add(path)
+                    playlist.append(path)
+            self.__changes["playlists"] = True
+        return len(playlist) - count
+
+    def removeFromPlaylist(self, name, paths) -> int:
+        """
+        Summary:
+        -------
+        removes songs from a playlist.
+
+        Parameters:
+        -------
+        name : str
+            The name of the playlist
+
+        paths : List
+            The paths of the songs
+
+        Returns:
+        -------
+        int
+            The number of songs removed
+        """
+
+        with self.lock:
+            playlist = self.__playlist(name)
+            removed = set(paths)
+            kept = [path for path in playlist if path not in removed]
+            count = len(playlist) - len(kept)
+            playlist[:] = kept
+            self.__changes["playlists"] = True
+        return count
+
+    # Session
+
+    def restoreSession(self, session):
+        """
+        Summary:
+        -------
+        rebuilds the queue of a previous session and resumes
+        playing where it was left. Songs that no longer exist are skipped.
+
+        Parameters:
+        -------
+        session : Dict
+            The state loaded from the session snapshot
+        """
+
+        self.browsing = {key: session[key] for key in ("view", "album", "browsePath", "insideAlbum")}
+        paths, order, index = session["paths"], session["order"], session["index"]
+        if not paths or index >= len(order) or not os.path.isfile(paths[order[index]]):
+            return
+
+        # The current song is loaded first so that it can start playing right away
+        playing = order[index]
+        current = Song(paths[playing])
+        self.currentPlaylist = session["playlist"] \
+            if f"playlist_{session['playlist']}" in self.configuration.keys() else None
+        self.queue = Queue(current)
+        self.play(current, start=session["position"])
+        if session["paused"]:
+            self.pause()
+
+        with self.lock:
+            # The queue is rebuilt as it was, nothing is shuffled again. The songs
+            # that are gone are left out of both orders, the others keep their place
+            kept = {}
+            songs = []
+            for position, path in enumerate(paths):
+                if position == playing or os.path.isfile(path):
+                    kept[position] = len(songs)
+                    songs.append(current if position == playing else path)
+            self.queue = Queue(*songs, start=sum(position in kept for position in order[:index]),
+                               shuffled=session["shuffled"],
+                               order=[kept[position] for position in order if position in kept],
+                               drawn=sum(position in kept for position in order[:session["drawn"]]))
+            self.__changes["queue"] = True
+
+    def saveSession(self, browsing: Optional[Dict] = None):
+        """
+        Summary:
+        -------
+        saves the queue, the playback position and the
+        browsing position, so they can be restored on the next start.
+
+        Parameters:
+        -------
+        browsing : Dict
+            Where the user is in the library ("view", "album",
+            "browsePath", "insideAlbum"). By default, where it last was
+        """
+
+        if browsing is not None:
+            self.browsing = dict(browsing)
+        with self.lock:
+            state = {"paths": [song.path for song in self.queue.linearSongs],
+                     "order": self.queue.positions() if self.queue.shuffled else None,
+                     "drawn": self.queue.drawn,
+                     "index": self.queue.index,
+                     "shuffled": self.queue.shuffled,
+                     "position": self.position() if self.playingSong else 0.0,
+                     "paused": self.paused or not self.playingSong,
+                     "playlist": self.currentPlaylist}
+        state.update(self.browsing)
+        try:
+            Session.save(self.sessionFile, state)
+        except OSError:
+            pass
+
+    def close(self):
+        for scanner in self.scanners.values():
+            scanner.stop()
+        # Stops the decoders of the stream
+        if self.streaming and mixer.ready:
+            mixer.music.stop()
+        self.loudness.stop()
+        self.indexCache.save()
+        self.history.save()
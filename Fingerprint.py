@@ -0,0 +1,295 @@
+import multiprocessing
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import Decoder
+
+
+# Songs are fingerprinted on their first two minutes, in mono, at a low rate
+RATE = 11025
+DURATION = 120
+# Each sub-fingerprint covers 186 ms of audio and a new one starts every 23 ms,
+# so two copies starting at slightly different times still line up
+FRAME = 2048
+HOP = 256
+# The spectrum between these frequencies is split in 33 bands, giving 32 bits
+LOWEST = 300
+HIGHEST = 2000
+BANDS = 33
+# Frames are transformed this many at a time, to bound the memory used
+BATCH = 512
+
+# Two songs sharing fewer sub-fingerprints than this aren't compared
+MIN_MATCHES = 3
+# Values shared by more songs than this (silence...) say nothing about a song
+MAX_BUCKET = 50
+# The share of differing bits below which two songs are the same recording
+MAX_BIT_ERRORS = 0.35
+MIN_OVERLAP = 100
+
+
+def compute(path: str) -> Optional[bytes]:
+    """
+    Summary:
+    -------
+    computes the fingerprint of a song: one 32 bit value per frame,
+    each bit telling wether the energy difference between two neighbour
+    bands grew or shrank since the previous frame. Unlike the file
+    itself, it barely changes between two rips of the same recording.
+
+    Parameters:
+    -------
+    path : str
+        The song to fingerprint
+
+    Returns:
+    -------
+    bytes
+        The values as little endian 32 bit integers,
+        or None if the song is too short or can't be decoded
+    """
+
+    import numpy as np
+
+    data = bytearray()
+    chunks = Decoder.pcm(path, rate=RATE, channels=1)
+    try:
+        for chunk in chunks:
+            data += chunk
+            if len(data) >= DURATION * RATE * 2:
+                break
+    except RuntimeError:
+        return None
+    finally:
+        # Stops the decoder once enough audio was read
+        chunks.close()
+
+    samples = np.frombuffer(bytes(data[:DURATION * RATE * 2]), dtype="<i2").astype(np.float32)
+    if len(samples) < FRAME * 2:
+        return None
+
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME)[::HOP]
+    window = np.hanning(FRAME).astype(np.float32)
+    edges = np.unique((np.geomspace(LOWEST, HIGHEST, BANDS + 1) * FRAME / RATE).astype(int))
+
+    energies = []
+    for start in range(0, len(frames), BATCH):
+        spectrum = np.abs(np.fft.rfft(frames[start:start + BATCH] * window, axis=1)) ** 2
+        energies.append(np.add.reduceat(spectrum, edges, axis=1)[:, :len(edges) - 1])
+    energies = np.concatenate(energies)
+
+    differences = energies[:, :-1] - energies[:, 1:]
+    bits = (differences[1:] - differences[:-1]) > 0
+    # Pads to 32 bits if some bands were merged by the rounding
+    bits = np.pad(bits, ((0, 0), (0, 32 - bits.shape[1])))
+    return np.packbits(bits, axis=1).view(">u4").ravel().astype("<u4").tobytes()
+
+
+def _bitErrors(first, second, offset) -> Optional[float]:
+    import numpy as np
+
+    # Lines up the two fingerprints, "second" starting "offset" frames later
+    if offset >= 0:
+        first = first[offset:]
+    else:
+        second = second[-offset:]
+    overlap = min(len(first), len(second))
+    if overlap < MIN_OVERLAP:
+        return None
+
+    different = np.bitwise_xor(first[:overlap], second[:overlap])
+    return np.unpackbits(different.view(np.uint8)).mean()
+
+
+class DuplicateIndex:
+    def __init__(self):
+        """
+        Summary:
+        -------
+        finds the songs that are the same recording.
+        Every sub-fingerprint of a song is put in a hash index, so only
+        the songs sharing some of them are compared bit by bit, instead
+        of every song with every other one.
+        """
+
+        self.__fingerprints = {}
+        self.__buckets: Dict[int, List[str]] = defaultdict(list)
+
+    def __len__(self):
+        return len(self.__fingerprints)
+
+    def __contains__(self, path):
+        return path in self.__fingerprints
+
+    def add(self, path: str, fingerprint: bytes):
+        import numpy as np
+
+        values = np.frombuffer(fingerprint, dtype="<u4")
+        self.__fingerprints[path] = values
+        for value in set(values.tolist()):
+            self.__buckets[value].append(path)
+
+    def groups(self) -> List[List[str]]:
+        """
+        Summary:
+        -------
+        returns the groups of songs that are duplicates of each other.
+
+        Returns:
+        -------
+        List
+            The paths of the songs in each group, biggest groups first
+        """
+
+        # For each pair of songs, the frame offsets their shared values are found at
+        offsets = defaultdict(lambda: defaultdict(int))
+        positions = {path: None for path in self.__fingerprints}
+        for value, paths in self.__buckets.items():
+            if len(paths) < 2 or len(paths) > MAX_BUCKET:
+                continue
+            for i, first in enumerate(paths):
+                for second in paths[i + 1:]:
+                    if positions[first] is None:
+                        positions[first] = self.__positions(first)
+                    if positions[second] is None:
+                        positions[second] = self.__positions(second)
+                    offset = positions[first][value] - positions[second][value]
+                    offsets[(first, second)][offset] += 1
+
+        parents = {}
+
+        def root(path):
+            while parents.get(path, path) != path:
+                path = parents[path]
+            return path
+
+        for (first, second), counts in offsets.items():
+            offset, matches = max(counts.items(), key=lambda item: item[1])
+            if matches < MIN_MATCHES or root(first) == root(second):
+                continue
+            errors = _bitErrors(self.__fingerprints[first], self.__fingerprints[second], offset)
+            if errors is not None and errors < MAX_BIT_ERRORS:
+                parents[root(second)] = root(first)
+
+        groups = defaultdict(list)
+        for path in parents:
+            groups[root(path)].append(path)
+        for path, group in groups.items():
+            if path not in group:
+                group.insert(0, path)
+        return sorted((sorted(group) for group in groups.values()), key=len, reverse=True)
+
+    def __positions(self, path) -> Dict[int, int]:
+        # Where each value first appears in the fingerprint
+        positions = {}
+        for position, value in enumerate(self.__fingerprints[path].tolist()):
+            positions.setdefault(value, position)
+        return positions
+
+
+class Fingerprinter:
+    def __init__(self, file, workers=None):
+        """
+        Summary:
+        -------
+        fingerprints songs in other processes, so the work is
+        spread over every core without slowing down the interface.
+        Fingerprints are kept on disk, so a song is only ever
+        fingerprinted once. At about 20 KB a song, they have a file
+        of their own rather than being in the index cache loaded
+        at startup, and it's only read once they're needed.
+
+        Parameters:
+        -------
+        file : str
+            The file the fingerprints are kept in
+
+        workers : int
+            The number of processes. By default, one per core
+        """
+
+        self.file = file
+        self.cache = None
+        self.workers = workers
+        self.total = 0
+        self.__pool = None
+        self.__futures = {}
+        self.index = DuplicateIndex()
+
+    @property
+    def done(self) -> int:
+        return self.total - len(self.__futures)
+
+    def start(self, songs):
+        """
+        Summary:
+        -------
+        starts fingerprinting the songs that weren't already.
+
+        Parameters:
+        -------
+        songs : List
+            The songs to fingerprint
+        """
+
+        if self.cache is None:
+            from Library import IndexCache
+            self.cache = IndexCache(self.file)
+
+        for song in songs:
+            if song.path in self.index or song.path in self.__futures:
+                continue
+            fingerprint = self.cache.get(song.path, "fingerprint")
+            if fingerprint is not None:
+                if fingerprint:
+                    self.index.add(song.path, fingerprint)
+                continue
+            if not Decoder.available():
+                continue
+
+            if self.__pool is None:
+                # Spawned rather than forked, as the interface runs several threads
+                self.__pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                  mp_context=multiprocessing.get_context("spawn"))
+            self.__futures[song.path] = self.__pool.submit(compute, song.path)
+            self.total += 1
+
+    def collect(self) -> bool:
+        """
+        Summary:
+        -------
+        stores the fingerprints computed since the last call.
+
+        Returns:
+        -------
+        bool
+            Wether any fingerprint was added
+        """
+
+        added = False
+        for path, future in list(self.__futures.items()):
+            if not future.done():
+                continue
+            del self.__futures[path]
+            try:
+                fingerprint = future.result()
+            except Exception:
+                fingerprint = None
+            # Songs that can't be fingerprinted are remembered as well, so they aren't tried again
+            self.cache.set(path, "fingerprint", fingerprint or b"")
+            if fingerprint:
+                self.index.add(path, fingerprint)
+                added = True
+        return added
+
+    def save(self):
+        if self.cache is not None:
+            self.cache.save()
+
+    def stop(self):
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=False, cancel_futures=True)
+            self.__pool = None
+        self.__futures = {}
@@ -0,0 +1,382 @@
+import os
+import abc
+
+from typing import Dict, Optional
+
+
+readers: Dict[str, "Reader"] = {}
+
+
+def _first(tags, key):
+    try:
+        value = tags[key]
+    except (KeyError, ValueError, TypeError):
+        return None
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return str(value) if value is not None else None
+
+
+def _gain(text) -> Optional[float]:
+    # "-6.54 dB" -> -6.54
+    try:
+        return float(str(text).lower().replace("db", "").strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _cover(pictures) -> Optional[bytes]:
+    # The front cover (type 3) if there is one, any picture otherwise
+    pictures = sorted(pictures, key=lambda picture: picture.type != 3)
+    return pictures[0].data if pictures else None
+
+
+def _split(number):
+    # "3/12" -> ("3", "12")
+    if not number:
+        return None, None
+    track, _, total = str(number).partition("/")
+    return track or None, total or None
+
+
+class Reader(abc.ABC):
+    """
+    Summary:
+    -------
+    reads and writes the tags of one audio format.
+    Each reader only parses the blocks holding the tags and
+    the stream information, never the audio itself.
+    """
+
+    extensions = ()
+    fields = {}
+    # The tags the ReplayGain values may be stored in
+    gains = {}
+    # The (offset, bytes) the files of the format start with
+    signatures = ()
+
+    @abc.abstractmethod
+    def open(self, path):
+        # The mutagen object of a file
+        pass
+
+    def sniff(self, header: bytes) -> bool:
+        """
+        Summary:
+        -------
+        tells wether the first bytes of a file belong to the format.
+
+        Parameters:
+        -------
+        header : bytes
+            The first bytes of the file
+
+        Returns:
+        -------
+        bool
+            Wether the file looks like one of the format
+        """
+
+        return any(header[offset:offset + len(signature)] == signature for offset, signature in self.signatures)
+
+    def read(self, path) -> Dict:
+        """
+        Summary:
+        -------
+        reads the metadata of a file.
+
+        Parameters:
+        -------
+        path : str
+            The file to read
+
+        Returns:
+        -------
+        Dict
+            The title, artist, album, length, track, trackTotal,
+            year, trackGain and albumGain (in dB) of the song.
+            Missing tags are None
+        """
+
+        audio = self.open(path)
+        tags = audio.tags if audio.tags is not None else {}
+        metadata = {field: _first(tags, key) for field, key in self.fields.items()}
+        metadata["length"] = audio.info.length
+        metadata["year"] = (metadata["year"] or "")[:4] or None
+        metadata.update(self.readGains(tags))
+        return metadata
+
+    def readGains(self, tags) -> Dict:
+        gains = {}
+        for field, keys in self.gains.items():
+            values = (_gain(_first(tags, key)) for key in keys)
+            gains[field] = next((value for value in values if value is not None), None)
+        return gains
+
+    def art(self, path) -> Optional[bytes]:
+        """
+        Summary:
+        -------
+        returns the cover art embedded in a file.
+
+        Parameters:
+        -------
+        path : str
+            The file to read
+
+        Returns:
+        -------
+        bytes
+            The encoded image (JPEG, PNG...), or None if there is none
+        """
+
+        return None
+
+    def write(self, path, field, value):
+        """
+        Summary:
+        -------
+        changes a tag of a file.
+
+        Parameters:
+        -------
+        path : str
+            The file to change
+
+        field : str
+            The tag to change (title, artist or album)
+
+        value : str
+            The new value
+        """
+
+        audio = self.open(path)
+        if audio.tags is None:
+            audio.add_tags()
+        audio.tags[self.fields[field]] = [value]
+        audio.save()
+
+
+class ID3Reader(Reader):
+    extensions = ("mp3", )
+    fields = {"title": "TIT2", "artist": "TPE1", "album": "TALB", "track": "TRCK", "year": "TDRC"}
+    signatures = ((0, b"ID3"), )
+    gains = {"trackGain": ("TXXX:REPLAYGAIN_TRACK_GAIN", "TXXX:replaygain_track_gain"),
+             "albumGain": ("TXXX:REPLAYGAIN_ALBUM_GAIN", "TXXX:replaygain_album_gain")}
+
+    def sniff(self, header: bytes) -> bool:
+        # Files without tags start straight with a frame sync
+        return super().sniff(header) or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0)
+
+    def open(self, path):
+        from mutagen.mp3 import MP3
+        return MP3(path)
+
+    def read(self, path) -> Dict:
+        metadata = super().read(path)
+        metadata["track"], metadata["trackTotal"] = _split(metadata["track"])
+        return metadata
+
+    def art(self, path) -> Optional[bytes]:
+        audio = self.open(path)
+        return _cover(audio.tags.getall("APIC")) if audio.tags is not None else None
+
+    def write(self, path, field, value):
+        from mutagen import id3
+
+        audio = self.open(path)
+        if audio.tags is None:
+            audio.add_tags()
+        key = self.fields[field]
+        audio.tags[key] = getattr(id3, key)(encoding=3, text=value)
+        audio.save()
+
+
+class VorbisReader(Reader):
+    fields = {"title": "title", "artist": "artist", "album": "album", "track": "tracknumber",
+              "trackTotal": "tracktotal", "year": "date"}
+    gains = {"trackGain": ("replaygain_track_gain", ), "albumGain": ("replaygain_album_gain", )}
+
+    def read(self, path) -> Dict:
+        metadata = super().read(path)
+        track, total = _split(metadata["track"])
+        metadata["track"], metadata["trackTotal"] = track, metadata["trackTotal"] or total
+        return metadata
+
+    def art(self, path) -> Optional[bytes]:
+        import base64
+        from mutagen.flac import Picture
+
+        audio = self.open(path)
+        if audio.tags is None:
+            return None
+        pictures = []
+        for data in audio.tags.get("metadata_block_picture", []):
+            try:
+                pictures.append(Picture(base64.b64decode(data)))
+            except Exception:
+                continue
+        return _cover(pictures)
+
+
+class FlacReader(VorbisReader):
+    extensions = ("flac", )
+    signatures = ((0, b"fLaC"), (0, b"ID3"))
+
+    def open(self, path):
+        from mutagen.flac import FLAC
+        return FLAC(path)
+
+    def art(self, path) -> Optional[bytes]:
+        return _cover(self.open(path).pictures)
+
+
+class OggVorbisReader(VorbisReader):
+    extensions = ("ogg", "oga")
+    signatures = ((0, b"OggS"), )
+
+    def open(self, path):
+        from mutagen.oggvorbis import OggVorbis
+        return OggVorbis(path)
+
+
+class OpusReader(VorbisReader):
+    extensions = ("opus", )
+    signatures = ((0, b"OggS"), )
+
+    def open(self, path):
+        from mutagen.oggopus import OggOpus
+        return OggOpus(path)
+
+    def readGains(self, tags) -> Dict:
+        gains = super().readGains(tags)
+        # Opus stores its gains in 1/256 dB, relative to -23 LUFS instead of -18
+        for field, key in (("trackGain", "r128_track_gain"), ("albumGain", "r128_album_gain")):
+            value = _gain(_first(tags, key))
+            if gains[field] is None and value is not None:
+                gains[field] = value / 256 + 5
+        return gains
+
+
+class MP4Reader(Reader):
+    extensions = ("m4a", "mp4")
+    signatures = ((4, b"ftyp"), )
+    fields = {"title": "\xa9nam", "artist": "\xa9ART", "album": "\xa9alb", "year": "\xa9day"}
+    gains = {"trackGain": ("----:com.apple.iTunes:replaygain_track_gain",
+                           "----:com.apple.iTunes:REPLAYGAIN_TRACK_GAIN"),
+             "albumGain": ("----:com.apple.iTunes:replaygain_album_gain",
+                           "----:com.apple.iTunes:REPLAYGAIN_ALBUM_GAIN")}
+
+    def open(self, path):
+        from mutagen.mp4 import MP4
+        return MP4(path)
+
+    def read(self, path) -> Dict:
+        audio = self.open(path)
+        tags = audio.tags if audio.tags is not None else {}
+        metadata = {field: _first(tags, key) for field, key in self.fields.items()}
+        metadata["length"] = audio.info.length
+        metadata["year"] = (metadata["year"] or "")[:4] or None
+        metadata.update(self.readGains(tags))
+        # The track number is stored as a (number, total) pair
+        track, total = (tags.get("trkn") or [(0, 0)])[0]
+        metadata["track"] = str(track) if track else None
+        metadata["trackTotal"] = str(total) if total else None
+        return metadata
+
+    def art(self, path) -> Optional[bytes]:
+        audio = self.open(path)
+        covers = (audio.tags or {}).get("covr")
+        return bytes(covers[0]) if covers else None
+
+
+def register(reader: Reader):
+    """
+    Summary:
+    -------
+    makes the files with the extensions of a reader readable.
+
+    Parameters:
+    -------
+    reader : Reader
+        The reader to register
+    """
+
+    for extension in reader.extensions:
+        readers[extension] = reader
+
+
+for _reader in (ID3Reader(), FlacReader(), OggVorbisReader(), OpusReader(), MP4Reader()):
+    register(_reader)
+
+
+def readerFor(path) -> Reader:
+    """
+    Summary:
+    -------
+    returns the reader able to read a file.
+
+    Parameters:
+    -------
+    path : str
+        The file to read
+
+    Returns:
+    -------
+    Reader
+        The reader, or None if the format isn't supported
+    """
+
+    return readers.get(os.path.splitext(path)[1][1:].lower())
+
+
+def read(path) -> Dict:
+    reader = readerFor(path)
+    if reader is None:
+        raise ValueError(f"Unsupported format: {path}")
+    return reader.read(path)
+
+
+def art(path) -> Optional[bytes]:
+    reader = readerFor(path)
+    if reader is None:
+        raise ValueError(f"Unsupported format: {path}")
+    return reader.art(path)
+
+
+def write(path, field, value):
+    reader = readerFor(path)
+    if reader is None:
+        raise ValueError(f"Unsupported format: {path}")
+    reader.write(path, field, value)
+
+
+def sniff(path) -> bool:
+    """
+    Summary:
+    -------
+    tells wether a file looks like a song, by its first bytes.
+    Much cheaper than reading its tags.
+
+    Parameters:
+    -------
+    path : str
+        The file to check
+
+    Returns:
+    -------
+    bool
+        Wether the file is in a supported format
+    """
+
+    reader = readerFor(path)
+    if reader is None:
+        return False
+    try:
+        with open(path, "rb") as f:
+            header = f.read(12)
+    except OSError:
+        return False
+    return reader.sniff(header)
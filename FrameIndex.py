@@ -0,0 +1,235 @@
+import io
+import mmap
+
+from array import array
+from typing import Optional, Tuple
+
+
+# Kbps, indexed by [MPEG 1 or not][layer][bitrate index]
+BITRATES = {
+    True: {1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+           2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+           3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]},
+    False: {1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+            2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+            3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]},
+}
+# Hz, indexed by [version bits][sample rate index]
+SAMPLE_RATES = {0: [11025, 12000, 8000], 2: [22050, 24000, 16000], 3: [44100, 48000, 32000]}
+
+
+def _parseHeader(header: bytes) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Summary:
+    -------
+    parses the 4 byte header of an MPEG audio frame.
+
+    Parameters:
+    -------
+    header : bytes
+        The header to parse
+
+    Returns:
+    -------
+    Tuple
+        The frame size, sample rate, samples per frame and channel mode,
+        or None if the header isn't valid
+    """
+
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+
+    version = (header[1] >> 3) & 3
+    layer = 4 - ((header[1] >> 1) & 3)
+    bitrateIndex = header[2] >> 4
+    sampleRateIndex = (header[2] >> 2) & 3
+    if version == 1 or layer == 4 or bitrateIndex in (0, 15) or sampleRateIndex == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = BITRATES[mpeg1][layer][bitrateIndex] * 1000
+    sampleRate = SAMPLE_RATES[version][sampleRateIndex]
+    padding = (header[2] >> 1) & 1
+
+    if layer == 1:
+        return (12 * bitrate // sampleRate + padding) * 4, sampleRate, 384, header[3] >> 6
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sampleRate + padding, sampleRate, 576, header[3] >> 6
+    return 144 * bitrate // sampleRate + padding, sampleRate, 1152, header[3] >> 6
+
+
+def _audioStart(data) -> int:
+    # Skips the ID3v2 tag, if there is one
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+def _isInfoFrame(data, offset, channelMode, mpeg1) -> bool:
+    # Xing/Info and VBRI frames only carry information about the stream
+    sideInfo = (17 if channelMode == 3 else 32) if mpeg1 else (9 if channelMode == 3 else 17)
+    return data[offset + 4 + sideInfo:offset + 8 + sideInfo] in (b"Xing", b"Info") \
+        or data[offset + 36:offset + 40] == b"VBRI"
+
+
+class FrameIndex:
+    def __init__(self, sampleRate, samplesPerFrame, offsets, frames, frameCount):
+        """
+        Summary:
+        -------
+        the position of an MP3 file's frames, with one
+        entry for every second of audio.
+
+        Parameters:
+        -------
+        sampleRate : int
+            The sample rate of the file
+
+        samplesPerFrame : int
+            The number of samples in each frame
+
+        offsets : array
+            The byte offset of the first frame of every second
+
+        frames : array
+            The number of the first frame of every second
+
+        frameCount : int
+            The number of audio frames in the file
+        """
+
+        self.sampleRate = sampleRate
+        self.samplesPerFrame = samplesPerFrame
+        self.offsets = offsets
+        self.frames = frames
+        self.frameCount = frameCount
+
+    @property
+    def duration(self) -> float:
+        return self.frameCount * self.samplesPerFrame / self.sampleRate
+
+    def locate(self, seconds) -> Tuple[int, float]:
+        """
+        Summary:
+        -------
+        finds the frame to start playing from to seek to a given time.
+
+        Parameters:
+        -------
+        seconds : float
+            The time to seek to
+
+        Returns:
+        -------
+        Tuple
+            The byte offset of the frame and the exact time it starts at
+        """
+
+        i = min(max(int(seconds), 0), len(self.offsets) - 1)
+        return self.offsets[i], self.frames[i] * self.samplesPerFrame / self.sampleRate
+
+
+def build(path) -> Optional[FrameIndex]:
+    """
+    Summary:
+    -------
+    scans the frames of an MP3 file once and builds its index.
+    Only the frame headers are read.
+
+    Parameters:
+    -------
+    path : str
+        The file to scan
+
+    Returns:
+    -------
+    FrameIndex
+        The index, or None if the file isn't a valid MP3 file
+    """
+
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            return None
+
+    with data:
+        offset = _audioStart(data)
+        offsets, frames = array("Q"), array("I")
+        sampleRate = samplesPerFrame = None
+        count = 0
+
+        while offset + 4 <= len(data):
+            header = _parseHeader(data[offset:offset + 4])
+            if header is None:
+                if data[offset:offset + 3] == b"TAG":
+                    break
+                # Lost sync: looks for the next frame
+                offset = data.find(b"\xff", offset + 1)
+                if offset == -1:
+                    break
+                continue
+
+            size, rate, samples, channelMode = header
+            if sampleRate is None:
+                sampleRate, samplesPerFrame = rate, samples
+                if _isInfoFrame(data, offset, channelMode, (data[offset + 1] >> 3) & 3 == 3):
+                    offset += size
+                    continue
+
+            if count * samplesPerFrame >= len(offsets) * sampleRate:
+                offsets.append(offset)
+                frames.append(count)
+            count += 1
+            offset += size
+
+    if not count:
+        return None
+    return FrameIndex(sampleRate, samplesPerFrame, offsets, frames, count)
+
+
+class FileSlice(io.RawIOBase):
+    def __init__(self, path, start):
+        """
+        Summary:
+        -------
+        a read-only file that begins at a given offset of another file,
+        so that a decoder starts playing from there.
+
+        Parameters:
+        -------
+        path : str
+            The file to read
+
+        start : int
+            The offset the slice begins at
+        """
+
+        super().__init__()
+        self.__file = open(path, "rb")
+        self.__start = start
+        self.__file.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.__file.readinto(buffer)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            offset += self.__start
+        return self.__file.seek(offset, whence) - self.__start
+
+    def tell(self):
+        return self.__file.tell() - self.__start
+
+    def close(self):
+        self.__file.close()
+        super().close()
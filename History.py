@@ -0,0 +1,268 @@
+import os
+import json
+import heapq
+import pickle
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+# Events are written to disk in batches: once this many are waiting,
+# or once the oldest has waited this many seconds
+BATCH = 64
+INTERVAL = 30
+# A song played for this share of its length, or this many seconds, counts as played even if it was skipped
+PLAYED_SHARE = 0.5
+PLAYED_SECONDS = 240
+
+# The aggregates kept for every song
+STARTS = 0
+PLAYS = 1
+SKIPS = 2
+LAST_PLAYED = 3
+
+
+class History:
+    def __init__(self, folder: str, writable: bool = True):
+        """
+        Summary:
+        -------
+        records what is played: every start, skip and completion
+        is appended to a log, and the play counts, last play times
+        and skip rates are kept up to date in memory, so they never
+        have to be computed from the log.
+        Events are written in batches, away from the playback,
+        and the aggregates are saved with the log size they
+        cover, so only the events after it are read at startup.
+
+        Parameters:
+        -------
+        folder : str
+            The folder the log and the aggregates are stored in
+
+        writable : bool
+            Wether the events are written to disk. The players attached
+            to the daemon only mirror the history the daemon writes
+        """
+
+        self.logFile = os.path.join(folder, "history.log")
+        self.statsFile = os.path.join(folder, "history.stats")
+        self.writable = writable
+        self.__stats: Dict[str, List] = {}
+        # The songs by the time they were last played, the most recent last
+        self.__recent: Dict[str, float] = OrderedDict()
+        self.__buffer: List[str] = []
+        self.__lock = threading.Lock()
+        self.__oldest = None
+        self.__changed = False
+        self.__load()
+
+    def __load(self):
+        try:
+            with open(self.statsFile, "rb") as f:
+                saved = pickle.load(f)
+            offset = saved["offset"]
+            self.__stats = saved["stats"]
+        except Exception:
+            # Missing or corrupted: everything is read from the log
+            offset = 0
+            self.__stats = {}
+
+        try:
+            with open(self.logFile, "rb") as f:
+                # The log was replaced: its aggregates are read from scratch
+                if offset > os.fstat(f.fileno()).st_size:
+                    offset = 0
+                    self.__stats = {}
+                f.seek(offset)
+                for line in f:
+                    try:
+                        self.apply(json.loads(line))
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                self.__changed = f.tell() != offset
+        except OSError:
+            pass
+
+        self.__recent = OrderedDict((path, stats[LAST_PLAYED]) for path, stats in
+                                    sorted(self.__stats.items(), key=lambda item: item[1][LAST_PLAYED])
+                                    if stats[LAST_PLAYED])
+
+    def record(self, event: str, path: str, position: float = 0.0, length: Optional[float] = None) -> List:
+        """
+        Summary:
+        -------
+        records an event. It's only kept in memory
+        until the next flush, so it never waits for the disk.
+
+        Parameters:
+        -------
+        event : str
+            "start", "skip" or "complete"
+
+        path : str
+            The song the event is about
+
+        position : float
+            Where the song was when it ended, in seconds
+
+        length : float
+            The length of the song. A song skipped after
+            most of it was heard counts as played
+
+        Returns:
+        -------
+        List
+            The event as written to the log
+        """
+
+        if event == "skip" and (position >= PLAYED_SECONDS or length and position >= length * PLAYED_SHARE):
+            event = "complete"
+        entry = [round(time.time(), 3), event, path, round(position, 3)]
+        with self.__lock:
+            self.apply(entry)
+            if self.writable:
+                if not self.__buffer:
+                    self.__oldest = time.monotonic()
+                self.__buffer.append(json.dumps(entry) + "\n")
+        return entry
+
+    def apply(self, entry: List):
+        """
+        Summary:
+        -------
+        updates the aggregates with an event.
+
+        Parameters:
+        -------
+        entry : List
+            The event, as written to the log
+        """
+
+        when, event, path = entry[:3]
+        stats = self.__stats.setdefault(path, [0, 0, 0, 0.0])
+        if event == "start":
+            stats[STARTS] += 1
+        elif event == "complete":
+            stats[PLAYS] += 1
+            stats[LAST_PLAYED] = when
+            self.__recent.pop(path, None)
+            self.__recent[path] = when
+        elif event == "skip":
+            stats[SKIPS] += 1
+        self.__changed = True
+
+    def flush(self, force: bool = False):
+        """
+        Summary:
+        -------
+        appends the events waiting in memory to the log,
+        all at once, if there are enough of them or
+        they have been waiting long enough.
+
+        Parameters:
+        -------
+        force : bool
+            Wether to write the events even if there are few of them
+        """
+
+        with self.__lock:
+            if not self.__buffer:
+                return
+            if not force and len(self.__buffer) < BATCH and time.monotonic() - self.__oldest < INTERVAL:
+                return
+            self.__write()
+
+    def __write(self):
+        batch, self.__buffer = "".join(self.__buffer), []
+        try:
+            with open(self.logFile, "a", encoding="utf-8") as f:
+                f.write(batch)
+        except OSError:
+            pass
+
+    def save(self):
+        """
+        Summary:
+        -------
+        writes the events left and the aggregates, so the
+        log doesn't have to be read on the next start.
+        """
+
+        if not self.writable:
+            return
+        # Held throughout, so the aggregates match the log exactly up to the saved size
+        with self.__lock:
+            if self.__buffer:
+                self.__write()
+            if not self.__changed:
+                return
+            try:
+                offset = os.path.getsize(self.logFile)
+                # Written aside first so a crash never leaves broken aggregates
+                with open(self.statsFile + ".tmp", "wb") as f:
+                    pickle.dump({"offset": offset, "stats": self.__stats}, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(self.statsFile + ".tmp", self.statsFile)
+                self.__changed = False
+            except OSError:
+                pass
+
+    def plays(self, path: str) -> int:
+        stats = self.__stats.get(path)
+        return stats[PLAYS] if stats else 0
+
+    def lastPlayed(self, path: str) -> Optional[float]:
+        stats = self.__stats.get(path)
+        return stats[LAST_PLAYED] or None if stats else None
+
+    def skipRate(self, path: str) -> float:
+        # The share of the times the song started that it was skipped
+        stats = self.__stats.get(path)
+        return stats[SKIPS] / stats[STARTS] if stats and stats[STARTS] else 0.0
+
+    def mostPlayed(self, limit: int = 50) -> List[str]:
+        """
+        Summary:
+        -------
+        returns the songs played the most times.
+
+        Parameters:
+        -------
+        limit : int
+            The most songs to return
+
+        Returns:
+        -------
+        List
+            The paths of the songs, the most played first
+        """
+
+        played = ((stats[PLAYS], path) for path, stats in self.__stats.items() if stats[PLAYS])
+        return [path for _, path in heapq.nlargest(limit, played)]
+
+    def recentlyPlayed(self, limit: int = 50) -> List[str]:
+        """
+        Summary:
+        -------
+        returns the songs played last.
+
+        Parameters:
+        -------
+        limit : int
+            The most songs to return
+
+        Returns:
+        -------
+        List
+            The paths of the songs, the last played first
+        """
+
+        paths = []
+        for path in reversed(self.__recent):
+            if len(paths) >= limit:
+                break
+            paths.append(path)
+        return paths
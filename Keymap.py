@@ -0,0 +1,126 @@
+import os
+
+from typing import Dict, Optional
+
+
+# The actions every context reacts to, named after their setting without "ks_".
+# When two actions share a key, the one listed first wins
+contexts = {
+    "global": ["Quit", "HelpMenu", "Queue", "Duplicates", "MoveBetweenWins"],
+    "list": ["SongSelectionDown", "SongSelectionUp", "PlayPauseSong", "NewPlaylist",
+             "AddToPlaylist", "RemoveFromPlaylist", "ChangeView", "ImportPlaylist", "ExportPlaylist"],
+    "meta": ["ChangeMetadata", "ChangeFolderSetting", "ChangeFlowSetting"],
+    "bar": ["VolumeDown", "VolumeUp", "SongPrevious", "SongNext", "SeekForward", "SeekBackward",
+            "PlayPauseSong"],
+    "queue": ["Queue", "SongSelectionDown", "SongSelectionUp", "QueueMoveUp", "QueueMoveDown",
+              "QueuePlayNext", "QueueRemove", "PlayPauseSong"],
+    "duplicates": ["Duplicates", "SongSelectionDown", "SongSelectionUp"]
+}
+# The contexts of the main windows, where the global actions work as well
+windows = ["list", "meta", "bar"]
+# Holding these keys down repeats them, and the repetitions are handled at once
+repeatable = {"SongSelectionDown", "SongSelectionUp", "VolumeDown", "VolumeUp", "SeekForward", "SeekBackward"}
+
+
+def compileKeymap(configuration: Dict) -> Dict[str, Dict[int, str]]:
+    """
+    Summary:
+    -------
+    turns the keybindings of the configuration into one
+    table per context, from the key code to the action.
+
+    Parameters:
+    -------
+    configuration : Dict
+        The configuration, as made readable by the code
+
+    Returns:
+    -------
+    Dict
+        The table of every context
+    """
+
+    tables = {}
+    for context, actions in contexts.items():
+        tables[context] = {configuration[f"ks_{action}"]: action for action in reversed(actions)}
+    # The global actions come first, as they used to be checked before the window ones
+    for context in windows:
+        tables[context].update(tables["global"])
+    return tables
+
+
+class Keymap:
+    def __init__(self, file: str, configuration: Dict):
+        """
+        Summary:
+        -------
+        finds the action bound to a key with a single lookup,
+        and notices when the config file is edited, so the
+        keybindings can change while the music keeps playing.
+
+        Parameters:
+        -------
+        file : str
+            The config file
+
+        configuration : Dict
+            The configuration, as made readable by the code
+        """
+
+        self.file = file
+        self.tables: Dict[str, Dict[int, str]] = {}
+        self.__modified = self.__modifiedAt()
+        self.build(configuration)
+
+    def build(self, configuration: Dict):
+        # Updated in place, so the tables already handed out stay valid
+        tables = compileKeymap(configuration)
+        for context, table in tables.items():
+            self.tables.setdefault(context, {}).clear()
+            self.tables[context].update(table)
+
+    def action(self, context: str, key: int) -> Optional[str]:
+        """
+        Summary:
+        -------
+        returns the action bound to a key.
+
+        Parameters:
+        -------
+        context : str
+            Where the key was pressed: "list", "meta", "bar", "queue"...
+
+        key : int
+            The key code
+
+        Returns:
+        -------
+        str
+            The action, or None if the key isn't bound
+        """
+
+        return self.tables[context].get(key)
+
+    def outdated(self) -> bool:
+        """
+        Summary:
+        -------
+        checks if the config file changed since the last call.
+
+        Returns:
+        -------
+        bool
+            Wether the keybindings should be read again
+        """
+
+        modified = self.__modifiedAt()
+        if modified == self.__modified:
+            return False
+        self.__modified = modified
+        return True
+
+    def __modifiedAt(self) -> Optional[int]:
+        try:
+            return os.stat(self.file).st_mtime_ns
+        except OSError:
+            return None
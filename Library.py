@@ -0,0 +1,1164 @@
+import os
+import bisect
+import hashlib
+import pickle
+import random
+import threading
+import time
+
+from typing import Callable, Dict, List, Tuple
+
+import Formats
+import SmartPlaylist
+
+
+unknown = "[ Unknown ]"
+
+
+def trackNumber(song) -> int:
+    """
+    Summary:
+    -------
+    converts the track tag of a song ("3", "03", "3/12")
+    into a number that can be used for sorting.
+    Songs without a track number are sorted last.
+
+    Parameters:
+    -------
+    song : Song
+        The song to read the track number from
+
+    Returns:
+    -------
+    int
+        The track number
+    """
+
+    try:
+        return int(str(song.track).split("/")[0])
+    except (TypeError, ValueError):
+        return 1 << 16
+
+
+def _text(value) -> str:
+    return str(value).lower()
+
+
+def _year(song) -> Tuple:
+    try:
+        return 0, int(str(song.year)[:4])
+    except (TypeError, ValueError):
+        return 1, 0
+
+
+def _day(song, field="added") -> str:
+    try:
+        return time.strftime("%Y-%m-%d", time.localtime(getattr(song, field)))
+    except (TypeError, ValueError, OverflowError):
+        return unknown
+
+
+def _playCount(song) -> str:
+    if not song.plays:
+        return "Never played"
+    return f"{song.plays} plays" if song.plays != 1 else "1 play"
+
+
+class Song:
+    # Where the metadata read from the files is kept between runs
+    cache = None
+    # Where the play counts are kept
+    history = None
+
+    def __init__(self, path, metadata=None):
+        """
+        Summary:
+        -------
+        a song of the library.
+
+        Parameters:
+        -------
+        path : str
+            The path of the song
+
+        metadata : Dict
+            The metadata of the song, if it's already known
+            (sent by the daemon...). Otherwise it's read from the file
+        """
+
+        self.path = path
+        if metadata is None:
+            self.__loadMetadata()
+        else:
+            self.__setMetadata(metadata)
+
+    def __str__(self):
+        return str(self.title)
+
+    def __loadMetadata(self, reread=False):
+        metadata = None
+        if Song.cache is not None and not reread:
+            metadata = Song.cache.get(self.path, "metadata")
+        if metadata is None:
+            try:
+                metadata = Formats.read(self.path)
+            except Exception:
+                metadata = {}
+            if Song.cache is not None:
+                Song.cache.set(self.path, "metadata", metadata)
+        self.__setMetadata(dict(metadata, added=os.path.getmtime(self.path)))
+
+    def __setMetadata(self, metadata):
+        self.__length = metadata.get("length")
+        self.__title = metadata.get("title") or unknown
+        self.__artist = metadata.get("artist") or unknown
+        self.__album = metadata.get("album") or unknown
+        self.__track = metadata.get("track")
+        self.__track_total = metadata.get("trackTotal")
+        self.__year = metadata.get("year")
+        self.__trackGain = metadata.get("trackGain")
+        self.__albumGain = metadata.get("albumGain")
+        self.__added = metadata.get("added")
+        self.__metadata = metadata
+
+    def __writeTag(self, field, value):
+        Formats.write(self.path, field, value)
+        self.__loadMetadata(reread=True)
+
+    def reload(self):
+        # Reads the tags again, after another process changed them
+        self.__loadMetadata(reread=True)
+
+    @property
+    def metadata(self) -> Dict:
+        return self.__metadata
+
+    @property
+    def length(self):
+        return self.__length
+
+    @property
+    def year(self):
+        return self.__year
+
+    @property
+    def added(self):
+        return self.__added
+
+    @property
+    def track(self):
+        return self.__track
+
+    @property
+    def track_total(self):
+        return self.__track_total
+
+    @property
+    def trackGain(self):
+        return self.__trackGain
+
+    @property
+    def albumGain(self):
+        return self.__albumGain
+
+    @property
+    def plays(self) -> int:
+        return Song.history.plays(self.path) if Song.history is not None else 0
+
+    @property
+    def lastPlayed(self):
+        return Song.history.lastPlayed(self.path) if Song.history is not None else None
+
+    @property
+    def skipRate(self) -> float:
+        return Song.history.skipRate(self.path) if Song.history is not None else 0.0
+
+    @property
+    def title(self):
+        return self.__title
+
+    @title.setter
+    def title(self, value):
+        self.__writeTag("title", value)
+
+    @property
+    def artist(self):
+        return self.__artist
+
+    @artist.setter
+    def artist(self, value):
+        self.__writeTag("artist", value)
+
+    @property
+    def album(self):
+        return self.__album
+
+    @album.setter
+    def album(self, value):
+        self.__writeTag("album", value)
+
+
+class Queue:
+    def __init__(self, *args, start=0, shuffled=False, order=None, drawn=None):
+        """
+        Summary:
+        -------
+        the songs waiting to be played.
+        The play order is kept separate from the songs themselves:
+        when shuffling, the order is drawn one song at a time
+        (a lazy Fisher-Yates shuffle), so moving forward or backwards
+        and turning the shuffle on never touch the whole queue.
+
+        Parameters:
+        -------
+        args : Song | str
+            The songs to queue. Paths are loaded as songs and
+            the ".." wildcard is ignored
+
+        start : int
+            The index of the song to start from
+
+        shuffled : bool
+            Wether or not the songs after the first one are played randomly
+
+        order : List
+            The play order of a queue being restored, as positions in the
+            songs. "start" is then a position in the play order
+
+        drawn : int
+            How many positions of the restored play order were already drawn,
+            the others are drawn when needed, as if nothing happened
+        """
+
+        # When it's a list, every change is added to it, to be replayed on a mirror of the queue
+        self.journal = None
+        # Set on a mirror: called with a position that wasn't drawn yet, to have it drawn by the original
+        self.fetch = None
+
+        self.__linear = [Song(song) if isinstance(song, str) else song for song in args if song != ".."]
+        self.__order = list(self.__linear) if order is None else [self.__linear[position] for position in order]
+        self.__index = min(max(start, 0), max(len(self.__order) - 1, 0))
+        # Positions before this one have already been drawn
+        self.__drawn = len(self.__order)
+        self.__shuffled = False
+        if order is None:
+            self.shuffled = shuffled
+        elif shuffled:
+            self.__shuffled = True
+            self.__drawn = min(max(drawn if drawn is not None else len(self.__order), self.__index + 1),
+                               len(self.__order))
+
+    def __len__(self):
+        return len(self.__order)
+
+    def __getitem__(self, index):
+        if self.__shuffled and index >= self.__drawn:
+            if self.fetch is not None:
+                self.fetch(index)
+            else:
+                for position in range(self.__drawn, index + 1):
+                    # Picks a random song among the ones not drawn yet
+                    self.__change("draw", position, random.randrange(position, len(self.__order)))
+        return self.__order[index]
+
+    def __change(self, *change):
+        """
+        Summary:
+        -------
+        applies a change to the queue. Every change goes through
+        here and holds its outcome (what was drawn, where a song
+        went...), so replaying them gives an identical queue.
+
+        Parameters:
+        -------
+        change : Any
+            The kind of change and its values
+        """
+
+        kind, values = change[0], change[1:]
+        order = self.__order
+        if kind == "draw":
+            position, other = values
+            order[position], order[other] = order[other], order[position]
+            self.__drawn = position + 1
+        elif kind == "index":
+            self.__index, self.__drawn = values
+        elif kind == "shuffle":
+            value, index = values
+            if value:
+                # The current song becomes the first one and
+                # every other song is left to be drawn
+                if order:
+                    order[0], order[self.__index] = order[self.__index], order[0]
+                self.__drawn = min(len(order), 1)
+            else:
+                self.__order = list(self.__linear)
+                self.__drawn = len(self.__order)
+            self.__index = index
+            self.__shuffled = value
+        elif kind == "insert":
+            position, linearPosition, song, self.__drawn = values
+            order.insert(position, song)
+            self.__linear.insert(linearPosition, song)
+        elif kind == "pop":
+            index, linearPosition = values
+            del order[index]
+            del self.__linear[linearPosition]
+            if index < self.__drawn:
+                self.__drawn -= 1
+            if index < self.__index:
+                self.__index -= 1
+            elif self.__index >= len(order):
+                self.__index = 0
+        elif kind == "move":
+            index, to = values
+            order.insert(to, order.pop(index))
+            # Keeps the same song playing
+            if index == self.__index:
+                self.__index = to
+            elif index < self.__index <= to:
+                self.__index -= 1
+            elif to <= self.__index < index:
+                self.__index += 1
+            # Unshuffled, both orders are the same
+            if not self.__shuffled:
+                self.__linear.insert(to, self.__linear.pop(index))
+
+        if self.journal is not None:
+            self.journal.append(change)
+
+    def replay(self, changes: List):
+        """
+        Summary:
+        -------
+        applies the changes journaled by another queue,
+        which this one mirrors. Nothing is drawn again.
+
+        Parameters:
+        -------
+        changes : List
+            The changes, oldest first
+        """
+
+        for change in changes:
+            self.__change(*change)
+
+    @property
+    def allSongs(self):
+        return self.__order
+
+    @property
+    def linearSongs(self):
+        # In the order they were queued, which comes back when the shuffle is turned off
+        return self.__linear
+
+    @property
+    def drawn(self):
+        return self.__drawn if self.__shuffled else len(self.__order)
+
+    def positions(self) -> List[int]:
+        """
+        Summary:
+        -------
+        returns the play order as positions in linearSongs,
+        so the queue can be rebuilt exactly (see "order").
+
+        Returns:
+        -------
+        List
+            The position of every song of the play order
+        """
+
+        # A song queued twice is the same object twice, either position fits
+        where = {}
+        for position, song in enumerate(self.__linear):
+            where.setdefault(id(song), []).append(position)
+        return [where[id(song)].pop() for song in self.__order]
+
+    @property
+    def index(self):
+        return self.__index
+
+    @index.setter
+    def index(self, i):
+        self[i]  # Makes sure the position has been drawn
+        self.__change("index", i, self.__drawn)
+
+    @property
+    def current(self):
+        return self[self.__index] if self.__order else None
+
+    @property
+    def shuffled(self):
+        return self.__shuffled
+
+    @shuffled.setter
+    def shuffled(self, value):
+        if value == self.__shuffled:
+            return
+
+        if value:
+            self.__change("shuffle", True, 0)
+        else:
+            current = self.current
+            self.__change("shuffle", False, self.__linear.index(current) if current in self.__linear else 0)
+
+    def advance(self):
+        """
+        Summary:
+        -------
+        moves to the next song, starting over once
+        the queue is over. When shuffling, every pass
+        plays the songs in a new order.
+
+        Returns:
+        -------
+        Song
+            The new current song
+        """
+
+        if not self.__order:
+            return None
+
+        if self.__index + 1 < len(self.__order):
+            self.__change("index", self.__index + 1, self.__drawn)
+        else:
+            self.__change("index", 0, 0 if self.__shuffled else self.__drawn)
+        return self[self.__index]
+
+    def rewind(self):
+        """
+        Summary:
+        -------
+        moves to the previous song.
+
+        Returns:
+        -------
+        Song
+            The new current song
+        """
+
+        if not self.__order:
+            return None
+
+        if self.__index or not self.__shuffled:
+            self.__change("index", (self.__index - 1) % len(self.__order), self.__drawn)
+        return self[self.__index]
+
+    def insertNext(self, song):
+        """
+        Summary:
+        -------
+        queues a song right after the current one.
+
+        Parameters:
+        -------
+        song : Song
+            The song to queue
+        """
+
+        if not self.__order:
+            self.__change("insert", 0, len(self.__linear), song, 1)
+            return
+
+        self.__change("insert", self.__index + 1, self.__linearPosition(self.__index) + 1, song,
+                      self.__drawn + 1)
+
+    def append(self, song):
+        """
+        Summary:
+        -------
+        queues a song at the end of the queue.
+        When shuffling, it joins the songs not drawn yet.
+
+        Parameters:
+        -------
+        song : Song
+            The song to queue
+        """
+
+        self.__change("insert", len(self.__order), len(self.__linear), song,
+                      self.__drawn if self.__shuffled else len(self.__order) + 1)
+
+    def pop(self, index):
+        """
+        Summary:
+        -------
+        removes the song at a given position of the play order.
+
+        Parameters:
+        -------
+        index : int
+            The position of the song
+
+        Returns:
+        -------
+        Song
+            The removed song
+        """
+
+        song = self[index]
+        self.__change("pop", index, self.__linearPosition(index))
+        return song
+
+    def move(self, index, to):
+        """
+        Summary:
+        -------
+        moves a song to another position of the play order.
+
+        Parameters:
+        -------
+        index : int
+            The current position of the song
+
+        to : int
+            The new position of the song
+        """
+
+        self[max(index, to)]  # Makes sure both positions have been drawn
+        self.__change("move", index, to)
+
+    def __linearPosition(self, index):
+        # Where the song at a position of the play order is in the order they were queued in.
+        # Unshuffled, both orders are the same. Shuffled, the songs are compared by
+        # identity (Song has no __eq__), it's still a pass over the queue
+        if not self.__shuffled:
+            return index
+        try:
+            return self.__linear.index(self.__order[index])
+        except ValueError:
+            return len(self.__linear) - 1
+
+
+class Album:
+    def __init__(self, name, *args):
+        self.__name = name
+        self.__songs = []
+        for song in args:
+            self.__songs.append(song)
+
+    def __len__(self):
+        return len(self.allSongs)
+
+    def __getitem__(self, index):
+        return self.allSongs[index]
+
+    def index(self, value):
+        return self.allSongs.index(value)
+
+    @property
+    def allSongs(self):
+        return self.__songs
+
+    @property
+    def name(self):
+        return self.__name
+
+    def append(self, song):
+        self.__songs.append(song)
+
+    def pop(self, index):
+        self.__songs.pop(index)
+
+
+class Group:
+    def __init__(self, name, path, title, children, songs):
+        """
+        Summary:
+        -------
+        an intermediate level of the library (an artist, a year...).
+        Its contents are only built when the user enters it.
+
+        Parameters:
+        -------
+        name : str
+            The name of the group
+
+        path : Tuple
+            The names of the groups above it, including its own
+
+        title : str
+            What the group represents ("Artist", "Year"...)
+
+        children : int
+            The number of groups inside it
+
+        songs : int
+            The number of songs inside it
+        """
+
+        self.__name = name
+        self.__path = path
+        self.__title = title
+        self.__children = children
+        self.__songs = songs
+
+    def __len__(self):
+        return self.__children
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def title(self):
+        return self.__title
+
+    @property
+    def songs(self):
+        return self.__songs
+
+
+class Level:
+    def __init__(self, title: str, groupBy: Callable, groupOrder: Callable):
+        """
+        Summary:
+        -------
+        describes one level of the library hierarchy.
+
+        Parameters:
+        -------
+        title : str
+            What the groups of this level represent
+
+        groupBy : Callable
+            Returns the name of the group a song belongs to
+
+        groupOrder : Callable
+            Returns the sort key of the group a song belongs to.
+            It must be the same for every song of a group
+        """
+
+        self.title = title
+        self.groupBy = groupBy
+        self.groupOrder = groupOrder
+
+
+class View:
+    def __init__(self, name: str, title: str, levels: List[Level], songOrder: Callable):
+        """
+        Summary:
+        -------
+        describes how the library is grouped and sorted.
+
+        Parameters:
+        -------
+        name : str
+            The name used in the configuration file
+
+        title : str
+            The name shown to the user
+
+        levels : List
+            The levels of the hierarchy, from the outermost one.
+            Songs are listed inside the groups of the last level
+
+        songOrder : Callable
+            Returns the sort key of a song inside its group
+        """
+
+        self.name = name
+        self.title = title
+        self.levels = levels
+        self.songOrder = songOrder
+
+
+artistLevel = Level("Artist",
+                    groupBy=lambda song: str(song.artist),
+                    groupOrder=lambda song: _text(song.artist))
+albumLevel = Level("Album",
+                   groupBy=lambda song: str(song.album),
+                   groupOrder=lambda song: _text(song.album))
+yearLevel = Level("Year",
+                  groupBy=lambda song: str(_year(song)[1]) if not _year(song)[0] else unknown,
+                  groupOrder=_year)
+dayLevel = Level("Added",
+                 groupBy=_day,
+                 groupOrder=lambda song: -int(_day(song).replace("-", "")) if _day(song) != unknown else 0)
+playedDayLevel = Level("Played",
+                       groupBy=lambda song: _day(song, "lastPlayed") if song.lastPlayed else "Never played",
+                       groupOrder=lambda song: -int(_day(song, "lastPlayed").replace("-", ""))
+                       if song.lastPlayed and _day(song, "lastPlayed") != unknown else 0)
+playCountLevel = Level("Plays",
+                       groupBy=_playCount,
+                       groupOrder=lambda song: -song.plays)
+
+views: Dict[str, View] = {
+    "album": View("album", "Artist / Album", [artistLevel, albumLevel],
+                  songOrder=lambda song: (trackNumber(song), _text(song.title))),
+    "artist": View("artist", "Artist", [artistLevel],
+                   songOrder=lambda song: (_text(song.album), trackNumber(song), _text(song.title))),
+    "year": View("year", "Year / Album", [yearLevel, albumLevel],
+                 songOrder=lambda song: (trackNumber(song), _text(song.title))),
+    "recent": View("recent", "Recently Added", [dayLevel],
+                   songOrder=lambda song: (-(song.added or 0), _text(song.album), trackNumber(song))),
+    "played": View("played", "Recently Played", [playedDayLevel],
+                   songOrder=lambda song: (-(song.lastPlayed or 0), _text(song.title))),
+    "plays": View("plays", "Most Played", [playCountLevel],
+                  songOrder=lambda song: (_text(song.artist), _text(song.album), trackNumber(song))),
+}
+
+
+class _ViewIndex:
+    def __init__(self, view: View):
+        """
+        Summary:
+        -------
+        keeps the library sorted according to a view.
+        Songs are inserted and removed with a binary search,
+        so the ordering never has to be computed from scratch.
+        Groups are identified by their path inside the hierarchy,
+        so albums with the same name by different artists
+        don't collide.
+
+        Parameters:
+        -------
+        view : View
+            The view to keep the songs sorted by
+        """
+
+        self.view = view
+        self.__children: Dict[Tuple, List[Tuple]] = {}
+        self.__counts: Dict[Tuple, int] = {}
+        self.__orders: Dict[Tuple, Tuple] = {}
+        self.__groups: Dict[Tuple, List[Tuple]] = {}
+        self.__entries: Dict[str, Tuple] = {}
+        self.__albums: Dict[Tuple, Album] = {}
+        self.__dirty = set()
+
+    def insert(self, song):
+        node = ()
+        for level in self.view.levels:
+            child = node + (level.groupBy(song),)
+            if child not in self.__counts:
+                self.__counts[child] = 0
+                self.__orders[child] = level.groupOrder(song)
+                bisect.insort(self.__children.setdefault(node, []), (self.__orders[child], child[-1]))
+            self.__counts[child] += 1
+            node = child
+
+        key = (self.view.songOrder(song), song.path)
+        bisect.insort(self.__groups.setdefault(node, []), key)
+        self.__entries[song.path] = (node, key)
+        self.__dirty.add(node)
+
+    def delete(self, path):
+        leaf, key = self.__entries.pop(path)
+        group = self.__groups[leaf]
+        del group[bisect.bisect_left(group, key)]
+
+        if group:
+            self.__dirty.add(leaf)
+        else:
+            del self.__groups[leaf]
+            self.__albums.pop(leaf, None)
+            self.__dirty.discard(leaf)
+
+        # Walks back up the hierarchy, removing the groups left empty
+        for depth in range(len(leaf), 0, -1):
+            node = leaf[:depth]
+            self.__counts[node] -= 1
+            if self.__counts[node]:
+                continue
+
+            siblings = self.__children[node[:-1]]
+            del siblings[bisect.bisect_left(siblings, (self.__orders[node], node[-1]))]
+            if not siblings:
+                del self.__children[node[:-1]]
+            del self.__counts[node]
+            del self.__orders[node]
+
+    def level(self, path: Tuple, songs: Dict) -> Dict:
+        depth = len(path)
+        out = {}
+        for _, name in self.__children.get(path, []):
+            node = path + (name,)
+            if depth + 1 < len(self.view.levels):
+                out[name] = Group(name, node, self.view.levels[depth].title,
+                                  len(self.__children.get(node, [])), self.__counts[node])
+                continue
+
+            # Only the groups that changed since they were last shown are rebuilt
+            if node in self.__dirty or node not in self.__albums:
+                self.__albums[node] = Album(name, *[songs[p] for _, p in self.__groups[node]], "..")
+                self.__dirty.discard(node)
+            out[name] = self.__albums[node]
+
+        return out
+
+    def group(self, path, songs: Dict) -> List:
+        # The songs of the innermost group a song is in, without building the group
+        if path not in self.__entries:
+            return []
+        return [songs[p] for _, p in self.__groups[self.__entries[path][0]]]
+
+
+class LibraryIndex:
+    def __init__(self, smartPlaylists: Dict[str, List[str]] = None):
+        """
+        Summary:
+        -------
+        holds every known song and keeps one precomputed
+        ordering for each available view, and the songs
+        of each smart playlist.
+
+        Parameters:
+        -------
+        smartPlaylists : Dict
+            The rules of every smart playlist, by name
+        """
+
+        self.__songs = {}
+        self.__views = {name: _ViewIndex(view) for name, view in views.items()}
+        self.__smart = {name: SmartPlaylist.SmartPlaylist(name, rules)
+                        for name, rules in (smartPlaylists or {}).items()}
+        self.__smartAlbums: Dict[str, Album] = {}
+
+    def __len__(self):
+        return len(self.__songs)
+
+    def __contains__(self, path):
+        return path in self.__songs
+
+    @property
+    def allSongs(self):
+        return list(self.__songs.values())
+
+    def get(self, path):
+        return self.__songs.get(path)
+
+    def add(self, song):
+        """
+        Summary:
+        -------
+        adds a song to the library, replacing any song
+        with the same path.
+
+        Parameters:
+        -------
+        song : Song
+            The song to add
+        """
+
+        if song.path in self.__songs:
+            self.remove(song.path)
+
+        self.__songs[song.path] = song
+        for index in self.__views.values():
+            index.insert(song)
+        for playlist in self.__smart.values():
+            playlist.insert(song)
+
+    def extend(self, songs):
+        for song in songs:
+            self.add(song)
+
+    def remove(self, path):
+        """
+        Summary:
+        -------
+        removes a song from the library.
+
+        Parameters:
+        -------
+        path : str
+            The path of the song to remove
+        """
+
+        if path not in self.__songs:
+            return
+
+        del self.__songs[path]
+        for index in self.__views.values():
+            index.delete(path)
+        for playlist in self.__smart.values():
+            playlist.delete(path)
+
+    def update(self, song):
+        """
+        Summary:
+        -------
+        moves a song to its new position after its tags changed.
+
+        Parameters:
+        -------
+        song : Song
+            The song that changed
+        """
+
+        self.remove(song.path)
+        self.add(song)
+
+    def refresh(self, path):
+        """
+        Summary:
+        -------
+        moves a song to its new position after its play count
+        changed, in the views and the smart playlists.
+
+        Parameters:
+        -------
+        path : str
+            The path of the song
+        """
+
+        song = self.__songs.get(path)
+        if song is not None:
+            self.update(song)
+
+    def level(self, view="album", path=()) -> Dict:
+        """
+        Summary:
+        -------
+        returns one level of the library hierarchy, grouped
+        and sorted according to a view. Only the requested
+        level is built.
+
+        Parameters:
+        -------
+        view : str
+            The name of the view
+
+        path : Tuple
+            The names of the groups to descend into.
+            An empty path returns the outermost level
+
+        Returns:
+        -------
+        Dict
+            The groups (Group) or the albums (Album) of the level, in order
+        """
+
+        return self.__views.get(view, self.__views["album"]).level(tuple(path), self.__songs)
+
+    def album(self, song) -> List:
+        """
+        Summary:
+        -------
+        returns the songs of a song's album, as grouped by the album
+        view (the same artist and album), without going through
+        the whole library.
+
+        Parameters:
+        -------
+        song : Song
+            The song
+
+        Returns:
+        -------
+        List
+            The songs of the album, empty if the song isn't in the library
+        """
+
+        return self.__views["album"].group(song.path, self.__songs)
+
+    @property
+    def smartPlaylists(self) -> List[str]:
+        return list(self.__smart.keys())
+
+    def smartPlaylist(self, name) -> Album:
+        """
+        Summary:
+        -------
+        returns the songs of a smart playlist, as kept up
+        to date while songs are added, removed or retagged.
+
+        Parameters:
+        -------
+        name : str
+            The name of the smart playlist
+
+        Returns:
+        -------
+        Album
+            The songs of the playlist, in order
+        """
+
+        playlist = self.__smart[name]
+        # Only rebuilt if the playlist changed since it was last shown
+        if playlist.changed or name not in self.__smartAlbums:
+            self.__smartAlbums[name] = Album(name, *[self.__songs[path] for path in playlist.paths], "..")
+            playlist.changed = False
+        return self.__smartAlbums[name]
+
+
+class IndexCache:
+    def __init__(self, file):
+        """
+        Summary:
+        -------
+        stores data computed from the songs (metadata, frame indexes...)
+        on disk, so it only has to be computed once.
+        The data of a song is thrown away as soon as its
+        file changes.
+
+        Parameters:
+        -------
+        file : str
+            The file the cache is stored in
+        """
+
+        self.file = file
+        self.__lock = threading.Lock()
+        self.__changed = False
+        try:
+            with open(file, "rb") as f:
+                self.__records = pickle.load(f)
+        except Exception:
+            # Missing, outdated or corrupted: starts over
+            self.__records = {}
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def get(self, path, field):
+        """
+        Summary:
+        -------
+        returns a piece of data about a song.
+
+        Parameters:
+        -------
+        path : str
+            The path of the song
+
+        field : str
+            The name of the data
+
+        Returns:
+        -------
+        Any
+            The data, or None if it isn't known or the file changed
+        """
+
+        record = self.__records.get(path)
+        if record is None or field not in record[1]:
+            return None
+
+        try:
+            if record[0] != self._signature(path):
+                return None
+        except OSError:
+            return None
+        return record[1][field]
+
+    def set(self, path, field, value):
+        """
+        Summary:
+        -------
+        stores a piece of data about a song.
+
+        Parameters:
+        -------
+        path : str
+            The path of the song
+
+        field : str
+            The name of the data
+
+        value : Any
+            The data itself
+        """
+
+        try:
+            signature = self._signature(path)
+        except OSError:
+            return
+
+        with self.__lock:
+            record = self.__records.get(path)
+            if record is None or record[0] != signature:
+                record = self.__records[path] = (signature, {})
+            record[1][field] = value
+            self.__changed = True
+
+    def save(self):
+        """
+        Summary:
+        -------
+        writes the cache to disk, if anything changed.
+        """
+
+        with self.__lock:
+            if not self.__changed:
+                return
+            # Written aside first so a crash never leaves a broken cache
+            with open(self.file + ".tmp", "wb") as f:
+                pickle.dump(self.__records, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(self.file + ".tmp", self.file)
+            self.__changed = False
+
+
+class IndexShards:
+    def __init__(self, folder, prefix="library"):
+        """
+        Summary:
+        -------
+        splits the IndexCache in one file per music root, so each
+        root is only loaded when one of its songs is first looked up,
+        and a slow root never holds up the others.
+        It can be used in place of an IndexCache.
+
+        Parameters:
+        -------
+        folder : str
+            The folder the files are stored in
+
+        prefix : str
+            The start of the name of the files, so two
+            processes can keep their own caches in the same folder
+        """
+
+        self.folder = folder
+        self.prefix = prefix
+        self.__roots = []
+        self.__shards = {}
+        self.__lock = threading.Lock()
+
+    def setRoots(self, roots: List[str]):
+        # Nested roots are matched from the deepest one
+        self.__roots = sorted((os.path.join(root, "") for root in roots), key=len, reverse=True)
+
+    def shardFor(self, path) -> IndexCache:
+        """
+        Summary:
+        -------
+        returns the cache holding the data of a song.
+
+        Parameters:
+        -------
+        path : str
+            The path of the song
+
+        Returns:
+        -------
+        IndexCache
+            The cache of the root the song is in. Songs outside of
+            every root share one more cache
+        """
+
+        root = next((root for root in self.__roots if path.startswith(root)), "")
+        with self.__lock:
+            if root not in self.__shards:
+                name = hashlib.sha1(root.encode("utf-8", "surrogateescape")).hexdigest()[:12]
+                self.__shards[root] = IndexCache(os.path.join(self.folder, f"{self.prefix}-{name}.index"))
+            return self.__shards[root]
+
+    def get(self, path, field):
+        return self.shardFor(path).get(path, field)
+
+    def set(self, path, field, value):
+        self.shardFor(path).set(path, field, value)
+
+    def save(self):
+        with self.__lock:
+            shards = list(self.__shards.values())
+        for shard in shards:
+            shard.save()
@@ -0,0 +1,237 @@
+import math
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+import Decoder
+
+
+# The loudness ReplayGain brings every song to, in LUFS
+TARGET = -18.0
+# Songs are analyzed at a lower rate, loudness barely depends on the highest frequencies
+RATE = 22050
+# The loudness is measured over 400 ms blocks, overlapping by 300 ms
+HOP = RATE // 10
+HOPS_PER_BLOCK = 4
+
+
+def measure(chunks: Iterable[bytes], channels: int = 2) -> Optional[Tuple[float, int]]:
+    """
+    Summary:
+    -------
+    measures the loudness of some audio, gating out the
+    silent and quiet blocks like EBU R128 does.
+    The audio is never held in memory as a whole: each piece
+    is reduced to the power of its 100 ms hops right away.
+
+    Parameters:
+    -------
+    chunks : Iterable
+        Signed 16 bit samples at RATE, with the channels interleaved
+
+    channels : int
+        The number of channels of the audio
+
+    Returns:
+    -------
+    Tuple
+        The loudness (LUFS) and the number of blocks it was measured
+        on, or None if the audio is silent
+    """
+
+    import numpy as np
+
+    frame = HOP * channels * 2
+    powers = []
+    leftover = b""
+    for data in chunks:
+        data = leftover + data
+        usable = len(data) // frame * frame
+        leftover = data[usable:]
+        if not usable:
+            continue
+        samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768
+        # The mean square of each channel over each hop, summed over the channels
+        powers.append((samples.reshape(-1, HOP, channels) ** 2).mean(axis=1).sum(axis=1))
+
+    if not powers:
+        return None
+
+    powers = np.concatenate(powers)
+    if len(powers) >= HOPS_PER_BLOCK:
+        blocks = np.convolve(powers, np.ones(HOPS_PER_BLOCK) / HOPS_PER_BLOCK, "valid")
+    else:
+        blocks = powers.mean(keepdims=True)
+
+    # Absolute gate at -70 LUFS, then relative gate 10 LU below what's left
+    blocks = blocks[blocks > 10 ** ((-70 + 0.691) / 10)]
+    if not len(blocks):
+        return None
+    relative = -0.691 + 10 * math.log10(blocks.mean()) - 10
+    blocks = blocks[blocks > 10 ** ((relative + 0.691) / 10)]
+
+    return -0.691 + 10 * math.log10(blocks.mean()), len(blocks)
+
+
+def combine(measures: List[Tuple[float, int]]) -> float:
+    """
+    Summary:
+    -------
+    returns the loudness of several songs played one after the other,
+    like the songs of an album.
+
+    Parameters:
+    -------
+    measures : List
+        The loudness and the number of blocks of each song
+
+    Returns:
+    -------
+    float
+        The loudness of the whole, in LUFS
+    """
+
+    blocks = sum(count for _, count in measures)
+    power = sum(count * 10 ** (loudness / 10) for loudness, count in measures)
+    return 10 * math.log10(power / blocks)
+
+
+class Analyzer:
+    def __init__(self, cache, workers=2):
+        """
+        Summary:
+        -------
+        works out how much each song has to be amplified (or
+        attenuated) so all of them sound equally loud.
+        ReplayGain tags are used when the song has them, otherwise
+        the song is decoded and measured in the background.
+        Measures are kept in the index cache, so a song is only
+        ever measured once.
+
+        Parameters:
+        -------
+        cache : IndexCache
+            Where the measures are kept
+
+        workers : int
+            The number of songs measured at the same time
+        """
+
+        self.cache = cache
+        self.workers = workers
+        self.__pool = None
+        self.__pending = set()
+        self.__lock = threading.Lock()
+
+    def analyze(self, song):
+        """
+        Summary:
+        -------
+        starts measuring a song in the background, unless it
+        has ReplayGain tags or was already measured.
+
+        Parameters:
+        -------
+        song : Song
+            The song to measure
+        """
+
+        if song.trackGain is not None or self.cache.get(song.path, "loudness") is not None:
+            return
+        if not Decoder.available():
+            return
+
+        with self.__lock:
+            if song.path in self.__pending:
+                return
+            self.__pending.add(song.path)
+            if self.__pool is None:
+                self.__pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="loudness")
+            self.__pool.submit(self.__measure, song.path)
+
+    def __measure(self, path):
+        try:
+            result = measure(Decoder.pcm(path, rate=RATE, channels=2))
+        except Exception:
+            result = None
+        finally:
+            with self.__lock:
+                self.__pending.discard(path)
+        # Songs that can't be measured are remembered as well, so they aren't tried again
+        self.cache.set(path, "loudness", result or ())
+
+    def trackGain(self, song) -> Optional[float]:
+        """
+        Summary:
+        -------
+        returns the gain of a song on its own.
+
+        Parameters:
+        -------
+        song : Song
+            The song
+
+        Returns:
+        -------
+        float
+            The gain in dB, or None if it isn't known yet
+        """
+
+        if song.trackGain is not None:
+            return song.trackGain
+
+        measured = self.cache.get(song.path, "loudness")
+        if not measured:
+            self.analyze(song)
+            return None
+        return TARGET - measured[0]
+
+    def albumGain(self, song, album: List) -> Optional[float]:
+        """
+        Summary:
+        -------
+        returns the gain of a song as part of its album, which keeps
+        the differences in loudness between the songs of the album.
+
+        Parameters:
+        -------
+        song : Song
+            The song
+
+        album : List
+            All the songs of its album
+
+        Returns:
+        -------
+        float
+            The gain in dB. Until the whole album is measured,
+            the gain of the song on its own
+        """
+
+        if song.albumGain is not None:
+            return song.albumGain
+
+        measures = []
+        waiting = False
+        for other in album:
+            if other.trackGain is not None:
+                # Blocks start every 100 ms, so a song has about 10 per second
+                measures.append((TARGET - other.trackGain, max(int((other.length or 0) * 10), 1)))
+                continue
+            measured = self.cache.get(other.path, "loudness")
+            if measured is None:
+                self.analyze(other)
+                waiting = True
+            elif measured:
+                measures.append(measured)
+
+        if waiting or not measures:
+            return self.trackGain(song)
+        return TARGET - combine(measures)
+
+    def stop(self):
+        with self.__lock:
+            if self.__pool is not None:
+                self.__pool.shutdown(wait=False, cancel_futures=True)
+                self.__pool = None
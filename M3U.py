@@ -0,0 +1,136 @@
+import os
+
+from typing import Iterable, Iterator, List, Tuple
+from urllib.parse import unquote, urlparse
+
+import Scanner
+
+
+# The most folder listings kept while checking a playlist. Songs of a playlist
+# are usually grouped by album, so few listings are needed at any time
+LISTINGS = 1024
+extensions = [".m3u", ".m3u8"]
+
+
+def _decode(line: bytes, encoding: str) -> str:
+    try:
+        return line.decode(encoding)
+    except UnicodeDecodeError:
+        # Old M3U files are written in the system's code page, most often Latin-1
+        return line.decode("latin-1")
+
+
+def entries(file: str) -> Iterator[str]:
+    """
+    Summary:
+    -------
+    yields the songs of a M3U or M3U8 playlist, one line at a time,
+    so even huge playlists are read in little memory.
+    Relative paths are resolved from the playlist's folder,
+    and streams (http://...) are left out.
+
+    Parameters:
+    -------
+    file : str
+        The playlist
+
+    Returns:
+    -------
+    Iterator
+        The absolute paths of the songs
+    """
+
+    folder = os.path.dirname(os.path.abspath(file))
+    with open(file, "rb") as f:
+        for line in f:
+            entry = _decode(line, "utf-8-sig").strip()
+            # #EXTM3U, #EXTINF and the other directives
+            if not entry or entry.startswith("#"):
+                continue
+
+            if "://" in entry:
+                url = urlparse(entry)
+                if url.scheme != "file":
+                    continue
+                entry = unquote(url.path)
+            elif os.sep == "/" and "\\" in entry:
+                # Written on Windows
+                entry = entry.replace("\\", "/")
+
+            yield os.path.normpath(os.path.join(folder, entry))
+
+
+def load(file: str) -> Tuple[List[str], int]:
+    """
+    Summary:
+    -------
+    reads a playlist and keeps the songs that exist.
+    Each folder is listed once rather than every song checked
+    on its own, which matters on network drives.
+
+    Parameters:
+    -------
+    file : str
+        The playlist
+
+    Returns:
+    -------
+    Tuple
+        The paths of the songs found, in order and without duplicates,
+        and the number of songs that are missing
+    """
+
+    listings = {}
+    found = {}
+    missing = 0
+    for path in entries(file):
+        folder, name = os.path.split(path)
+        if folder not in listings:
+            if len(listings) >= LISTINGS:
+                listings.clear()
+            listings[folder] = Scanner.listFiles(folder)
+
+        # The songs of a folder that can't be read are kept, they may well be there
+        if listings[folder] is None or name in listings[folder]:
+            found[path] = None
+        else:
+            missing += 1
+    return list(found), missing
+
+
+def write(file: str, songs: Iterable):
+    """
+    Summary:
+    -------
+    writes songs to a playlist (UTF-8, whatever its extension).
+    Songs inside the playlist's folder are written relative to it,
+    so the folder can be moved with its playlist.
+
+    Parameters:
+    -------
+    file : str
+        The playlist
+
+    songs : Iterable
+        The songs, or their paths
+
+    Returns:
+    -------
+    int
+        The number of songs written
+    """
+
+    folder = os.path.join(os.path.dirname(os.path.abspath(file)), "")
+    count = 0
+    # Written aside first, so an existing playlist is only replaced once complete
+    with open(file + ".tmp", "w", encoding="utf-8", newline="\n") as f:
+        f.write("#EXTM3U\n")
+        for song in songs:
+            path = song if isinstance(song, str) else song.path
+            if not isinstance(song, str):
+                length = int(song.length) if isinstance(song.length, (int, float)) else -1
+                f.write(f"#EXTINF:{length},{song.artist} - {song.title}\n")
+            f.write((path[len(folder):] if path.startswith(folder) else path) + "\n")
+            count += 1
+    os.replace(file + ".tmp", file)
+    return count
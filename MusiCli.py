@@ -2,157 +2,151 @@ import os
 import curses
 import sys
 import time
-import random
-import kthread
+
+# Measured as early as possible, for the startup benchmark
+startTime = time.perf_counter()
+
 import string
+import itertools
 
 from pathlib import Path
+from typing import List, Dict, Tuple
 
-from tinytag import TinyTag
-from mutagen.id3 import ID3, TALB, TIT2, TPE1
-from mutagen.mp3 import MP3
-from pygame import mixer
-from typing import List, Dict
-from pyfiglet import Figlet
-
+# pygame, pyfiglet and mutagen are slow to import, so
+# they are only imported when first needed, outside of the startup
+import Art
+import Daemon
+import Engine
 import Parser
+import Scanner
+import Session
+import Fingerprint
+import Formats
+import Keymap
+import M3U
+import SmartPlaylist
+import Stream
+import Visualizer
 
+from Library import Album, Group, Song, views
 
-pathsep = os.path.sep
-supportedExtensions = ["mp3", ]
-
-
-class Song:
-    def __init__(self, path):
-        self.path = path
-        self.__loadMetadata()
-
-    def __str__(self):
-        return str(self.title)
-
-    def __loadMetadata(self):
-        try:
-            self.__length = MP3(self.path).info.length
-            self.__id3 = ID3(self.path)
-            self.__title = str(self.__id3["TIT2"])
-            self.__artist = str(self.__id3["TPE1"])
-            self.__album = str(self.__id3["TALB"])
-        except:
-            self.__length = self.__title = self.__artist = self.__album = "[ Unknown ]"
-
-        self.__tinytag = TinyTag.get(self.path)
-        self.__track = self.__tinytag.track
-        self.__track_total = self.__tinytag.track_total
-
-    @property
-    def length(self):
-        return self.__length
-
-    @property
-    def track(self):
-        return self.__track
-
-    @property
-    def track_total(self):
-        return self.__track_total
-
-    @property
-    def title(self):
-        return self.__title
-
-    @title.setter
-    def title(self, value):
-        self.__id3["TIT2"] = TIT2(encoding=3, text=value)
-        self.__id3.save(self.path)
-        self.__loadMetadata()
-
-    @property
-    def artist(self):
-        return self.__artist
-
-    @artist.setter
-    def artist(self, value):
-        self.__id3["TPE1"] = TPE1(encoding=3, text=value)
-        self.__id3.save(self.path)
-        self.__loadMetadata()
-
-    @property
-    def album(self):
-        return self.__album
-
-    @album.setter
-    def album(self, value):
-        self.__id3["TALB"] = TALB(encoding=3, text=value)
-        self.__id3.save(self.path)
-        self.__loadMetadata()
-
-
-class Album:
-    def __init__(self, name, *args):
-        self.__name = name
-        self.__songs = []
-        for song in args:
-            self.__songs.append(song)
-
-    def __len__(self):
-        return len(self.allSongs)
 
-    def __getitem__(self, index):
-        return self.allSongs[index]
-
-    def index(self, value):
-        return self.allSongs.index(value)
-
-    @property
-    def allSongs(self):
-        return self.__songs
-
-    @property
-    def name(self):
-        return self.__name
-
-    def append(self, song):
-        self.__songs.append(song)
-
-    def pop(self, index):
-        self.__songs.pop(index)
-
-
-class Queue:
-    def __init__(self, *args):
-        self.__index = 0
-        self.__songs = []
-        for song in args:
-            if song != "..":
-                self.__songs.append(Song(song) if isinstance(song, str) else song)
-
-    def __len__(self):
-        return len(self.allSongs)
-
-    def __getitem__(self, index):
-        return self.allSongs[index]
-
-    @property
-    def allSongs(self):
-        return self.__songs
-
-    @property
-    def index(self):
-        return self.__index
-
-    @index.setter
-    def index(self, i):
-        self.__index = i
-
-    @property
-    def next(self):
-        return self.__songs[self.index + 1]
-
-    def append(self, song):
-        self.__songs.append(song)
-
-    def pop(self, index):
-        self.__songs.pop(index)
+pathsep = os.path.sep
+viewOrder = ["album", "artist", "year", "recent", "played", "plays"]
+figlets = {}
+defaultConfiguration = {
+    "musicFolder": str(os.path.join(Path.home(), "Music")),
+    "# Music Roots": "More folders to add to the library, as [path, scan, interval] or the path alone. Scan is "
+                     "eager (scanned at startup) or lazy (scanned in the background after the eager ones), "
+                     "interval is the minutes between rescans (0: never)",
+    "musicRoots": [],
+    "# Daemon": "Starts the daemon when it isn't running, so the music keeps playing "
+                "after the player is closed (True / False)",
+    "daemon": False,
+    "volume": 25,
+    "# Frame Rate": "The most times per second the screen is drawn",
+    "maxFps": 30,
+    "# Visualizer": "Shows the playing song under the progress bar: spectrum, vu or off (needs numpy and ffmpeg). "
+                    "The budget is the share of one core it may take, in percent",
+    "visualizer": "off",
+    "visualizerFps": 20,
+    "visualizerBudget": 5,
+    "# Playback": "music (pygame plays the songs) or stream (the songs are decoded in pieces, needs numpy and "
+                  "ffmpeg). The stream can crossfade songs (seconds, 0: without a gap) and equalize them, "
+                  "with [frequency, gain] pairs in Hz and dB like [[60, 4], [12000, -2]]",
+    "playback": "music",
+    "crossfade": 0,
+    "equalizer": [],
+    "forwardSkip": 5,
+    "backwardsSkip": 5,
+    "random": False,
+    "view": "album",
+    "# ReplayGain": "track (every song equally loud), album (every album equally loud) or off",
+    "replayGain": "track",
+    "loudnessWorkers": 2,
+    "# Scanned Files": "Globs matched against the path inside the music folder, "
+                       "an empty include list scans every song",
+    "includeGlobs": [],
+    "excludeGlobs": [".*"],
+    "# Smart Playlists": "Added as smart_<name> settings, holding a list of rules like 'artist = Queen', "
+                        "'album contains live', 'length < 5:00', 'added < 30' (days ago), 'plays > 10', "
+                        "'played < 7' (days ago), 'skipped < 50' (percent), "
+                        "'sort added', 'sort -plays' (reversed) or 'limit 50'",
+    "# Available Special Keys": "<UP> , <DOWN> , <LEFT> , <RIGHT> , "
+                                "<TAB> , <SPACE>",
+    "ks_SongSelectionUp": "<UP>",
+    "ks_VolumeUp": "<UP>",
+    "ks_SongNext": "<RIGHT>",
+    "ks_SongPrevious": "<LEFT>",
+    "ks_SeekForward": ">",
+    "ks_SeekBackward": "<",
+    "ks_SongSelectionDown": "<DOWN>",
+    "ks_VolumeDown": "<DOWN>",
+    "ks_MoveBetweenWins": "<TAB>",
+    "ks_PlayPauseSong": "<SPACE>",
+    "ks_Quit": "q",
+    "ks_NewPlaylist": "n",
+    "ks_AddToPlaylist": "+",
+    "ks_RemoveFromPlaylist": "-",
+    "ks_ChangeFolderSetting": "c",
+    "ks_ChangeFlowSetting": "f",
+    "ks_ChangeView": "v",
+    "ks_HelpMenu": "h",
+    "ks_Queue": "p",
+    "ks_QueueMoveUp": "[",
+    "ks_QueueMoveDown": "]",
+    "ks_QueueRemove": "x",
+    "ks_QueuePlayNext": ".",
+    "ks_Duplicates": "d",
+    "ks_ChangeMetadata": "m",
+    "ks_ImportPlaylist": "i",
+    "ks_ExportPlaylist": "e"
+}
+
+
+def _renderFiglet(text, font) -> str:
+    # Loading a font is slow, so each one is only loaded once
+    if font not in figlets:
+        from pyfiglet import Figlet
+        figlets[font] = Figlet(font=font)
+    return figlets[font].renderText(text)
+
+
+def loadConfiguration(file) -> Tuple[Dict, Dict, bool]:
+    """
+    Summary:
+    -------
+    reads the config file, adding the settings
+    it's missing from the default configuration.
+
+    Parameters:
+    -------
+    file : str
+        The config file
+
+    Returns:
+    -------
+    Tuple
+        The configuration as used by the code, the configuration
+        as written in the file and wether the file is valid
+    """
+
+    validSyntax = Parser.syntaxIsValid(file)
+    configuration = Parser.readConfigFile(file)
+
+    # Settings added in newer versions are missing from older config files
+    for key, value in defaultConfiguration.items():
+        if not key.startswith("#"):
+            configuration.setdefault(key, value)
+    if configuration["view"] not in views.keys():
+        configuration["view"] = "album"
+
+    notParsedConfiguration = {k: v for k, v in configuration.items()}  # Clone without linking
+    valid = validSyntax and Parser.configurationIsValid(notParsedConfiguration) and \
+        all(SmartPlaylist.rulesAreValid(rules) for rules in SmartPlaylist.fromConfiguration(configuration).values()) and \
+        Stream.equalizerIsValid(configuration["equalizer"]) and \
+        Engine.rootsAreValid(configuration["musicRoots"])
+    return Parser.makeReadableByCode(configuration), notParsedConfiguration, valid
 
 
 class Player:
@@ -168,54 +162,35 @@ class Player:
         curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)
         curses.init_pair(3, 11, curses.COLOR_BLACK)
         self.stdscr.keypad(True)
-        mixer.init()
 
-        self.playingSong = None
+        self.engine = None
+        # The parts of the screen to draw with the next frame
+        self.dirty = set()
+        self.pendingUpdate = False
+        self.renderedAt = 0.0
         self.selectedEntry = None
         self.selectedAlbumName = None
-        self.queue = Queue()
-        self.paused = True
-        self.queueThread = None
-        self.progressBarThread = None
-        self.currentPlaylist = None
+        self.barWinState = None
+        # The playing song as last drawn, to notice when the engine moves on
+        self.shownSong = None
         self.listWinStart = 0
         self.barWinProgress = 0
         self.albums: Dict[str, Album] = dict()
         self.insideAlbum = False
+        self.browsePath: List[str] = []
         self.configFile = os.path.join(pathsep.join(os.path.abspath(__file__).split(pathsep)[:-1]), "settings.config")
+        self.sessionFile = os.path.join(os.path.dirname(self.configFile), "session.snapshot")
+        # The pairs before are used by the rest of the interface
+        self.palette = Art.Palette(16)
+        self.sessionSavedAt = time.monotonic()
+        self.session = None
 
         if not os.path.isfile(self.configFile):
             # It's most likely the first time the user
             # opens the program, so it creates a default
             # config file and shows a welcome message
 
-            Parser.writeConfigFile(self.configFile,
-                                   {
-                                       "musicFolder": str(os.path.join(Path.home(), "Music")),
-                                       "volume": 25,
-                                       "forwardSkip": 5,
-                                       "backwardsSkip": 5,
-                                       "random": False,
-                                       "# Available Special Keys": "<UP> , <DOWN> , <LEFT> , <RIGHT> , "
-                                                                   "<TAB> , <SPACE>",
-                                       "ks_SongSelectionUp": "<UP>",
-                                       "ks_VolumeUp": "<UP>",
-                                       "ks_SongNext": "<RIGHT>",
-                                       "ks_SongPrevious": "<LEFT>",
-                                       "ks_SongSelectionDown": "<DOWN>",
-                                       "ks_VolumeDown": "<DOWN>",
-                                       "ks_MoveBetweenWins": "<TAB>",
-                                       "ks_PlayPauseSong": "<SPACE>",
-                                       "ks_Quit": "q",
-                                       "ks_NewPlaylist": "n",
-                                       "ks_AddToPlaylist": "+",
-                                       "ks_RemoveFromPlaylist": "-",
-                                       "ks_ChangeFolderSetting": "c",
-                                       "ks_ChangeFlowSetting": "f",
-                                       "ks_HelpMenu": "h",
-                                       "ks_Queue": "p",
-                                       "ks_ChangeMetadata": "m"
-                                   })
+            Parser.writeConfigFile(self.configFile, defaultConfiguration)
             self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
                                           self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
             self.popupWin.border(']', '[', '=', '=', '+', '+', '+', '+')
@@ -227,10 +202,7 @@ class Player:
             self.popupWin.clear()
             self.stdscr.clear()
 
-        self.validSyntax = Parser.syntaxIsValid(self.configFile)
-        self.configuration = Parser.readConfigFile(self.configFile)
-        self.notParsedConfiguration = {k: v for k, v in self.configuration.items()}  # Clone without linking
-        self.configuration = Parser.makeReadableByCode(self.configuration)
+        self.configuration, self.notParsedConfiguration, validConfiguration = loadConfiguration(self.configFile)
 
         # !!! Remove once you add resizability !!!
         if self.stdscr.getmaxyx()[0] < 28 or self.stdscr.getmaxyx()[1] < 130:
@@ -239,36 +211,150 @@ class Player:
 
         self.listWin, self.barWin, self.metaWin = self._generateWindows()
         self.selectedWin = self.listWin
-
-        # Checks for missing songs inside playlists, as playlists can contain songs
-        # from different folders, and trying to access a song that has been deleted
-        # would crash the program
-        missing = Parser.getSongsMissingFromPlaylist({k: v for k, v in self.configuration.items()
-                                                      if k.startswith("playlist_")})
-        if missing:
-            for name, songs in missing.items():
-                for song in songs:
-                    self.configuration[name].remove(
-                        os.path.join(self.configuration["musicFolder"], song))
-            Parser.writeConfigFile(self.configFile,
-                                   self.configuration)
-            self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
-                                          self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
-            self._makeErrorPopup(self.popupWin, "Unaccessible songs were removed from playlists", "Playlists")
+        # Keys are read from a window that's never drawn on, so reading
+        # them doesn't update the terminal outside of a frame
+        self.inputWin = curses.newwin(1, 1, 0, 0)
+        self.inputWin.keypad(True)
+        self.keymap = Keymap.Keymap(self.configFile, self.configuration)
+        self.keymapCheckedAt = time.monotonic()
+        # What every action does, by context. They're all given how many times the key was pressed
+        self.handlers = {
+            "global": {"Quit": lambda count: self.stop(),
+                       "HelpMenu": lambda count: self._showHelpMenu(),
+                       "Queue": lambda count: self._showQueue(),
+                       "Duplicates": lambda count: self._showDuplicates(),
+                       "MoveBetweenWins": self._nextWindow},
+            "list": {"SongSelectionDown": self._scroll,
+                     "SongSelectionUp": lambda count: self._scroll(-count),
+                     "PlayPauseSong": self._openSelected,
+                     "NewPlaylist": self._newPlaylist,
+                     "AddToPlaylist": lambda count: self._addToPlaylist(),
+                     "RemoveFromPlaylist": lambda count: self._removeFromPlaylist(),
+                     "ChangeView": lambda count: self._changeView(),
+                     "ImportPlaylist": lambda count: self._importPlaylist(),
+                     "ExportPlaylist": lambda count: self._exportPlaylist()},
+            "meta": {"ChangeMetadata": lambda count: self._changeMetadataFor(self.selectedEntry),
+                     "ChangeFolderSetting": self._changeFolder,
+                     "ChangeFlowSetting": self._changeFlow},
+            "bar": {"VolumeDown": lambda count: self._stepVolume(-count),
+                    "VolumeUp": self._stepVolume,
+                    "SongPrevious": lambda count: self._skip(forward=False),
+                    "SongNext": lambda count: self._skip(forward=True),
+                    "SeekForward": lambda count: self._seek(self.configuration["forwardSkip"] * count),
+                    "SeekBackward": lambda count: self._seek(-self.configuration["backwardsSkip"] * count),
+                    "PlayPauseSong": self._togglePause}
+        }
 
         # Checks if the configuration file is valid. If it's not it shows an error and quits
-        if not self.validSyntax or not Parser.configurationIsValid(self.notParsedConfiguration):
+        if not validConfiguration:
             self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
                                           self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
             self._makeErrorPopup(self.popupWin, "Invalid configuration file", "Configuration")
             sys.exit(-1)
 
+        self.engine = self._connectEngine()
+        self.visualizer = self._createVisualizer()
+        self.artCache = Art.ArtCache(os.path.join(os.path.dirname(self.configFile), "art"), self.indexCache)
+
+        # The playlists are checked for missing songs once the library is scanned (see _checkPlaylists)
+        self.playlistsChecked = False
+
         self._refreshWindow(self.listWin)
         self._refreshWindow(self.barWin)
         self._refreshWindow(self.metaWin)
         self.selectableWins = [self.listWin, self.metaWin, self.barWin]
+        self.fingerprinter = Fingerprint.Fingerprinter(os.path.join(os.path.dirname(self.configFile),
+                                                                    "fingerprints.index"))
         self._changeVolume(self.configuration["volume"])
 
+    def _connectEngine(self):
+        """
+        Summary:
+        -------
+        attaches to the daemon when one is running (starting it
+        first if the settings say so), otherwise plays by itself.
+
+        Returns:
+        -------
+        Engine | Daemon.RemoteEngine
+            The engine the player uses
+        """
+
+        folder = os.path.dirname(self.configFile)
+        if self.configuration["daemon"]:
+            Daemon.spawn([sys.executable, os.path.abspath(__file__), "--daemon"])
+        engine = Daemon.connect(self.configuration, folder)
+        if engine is None:
+            engine = Engine.Engine(self.configuration, folder)
+        return engine
+
+    def _createVisualizer(self):
+        """
+        Summary:
+        -------
+        creates the visualizer the settings ask for, if it can run.
+
+        Returns:
+        -------
+        Visualizer
+            The visualizer, or None
+        """
+
+        if self.configuration["visualizer"] not in Visualizer.modes[:-1] or not Visualizer.available():
+            return None
+        # Never drawn more often than the rest of the screen
+        return Visualizer.Visualizer(self.configuration["visualizer"],
+                                     min(self.configuration["visualizerFps"], self.configuration["maxFps"]),
+                                     self.configuration["visualizerBudget"])
+
+    def _visualizerArea(self) -> Tuple[int, int, int, int]:
+        # Under the progress bar, inside the border
+        height, width = self.barWin.getmaxyx()
+        return 4, 1, height - 5, width - 2
+
+    def _updateVisualizer(self):
+        """
+        Summary:
+        -------
+        draws the next frame of the visualizer, if one is due.
+        While paused the last frame stays on screen.
+        """
+
+        if not self.visualizer:
+            return
+        if not self.playingSong:
+            self.visualizer.follow(None, 0.0)
+            return
+        if self.paused:
+            return
+
+        self.visualizer.follow(self.playingSong.path, self.engine.position())
+        try:
+            if self.visualizer.frame(self.barWin, *self._visualizerArea()):
+                self._refreshWindow(self.barWin)
+        except curses.error:
+            pass
+
+    @property
+    def library(self):
+        return self.engine.library
+
+    @property
+    def queue(self):
+        return self.engine.queue
+
+    @property
+    def playingSong(self):
+        return self.engine.playingSong if self.engine else None
+
+    @property
+    def paused(self):
+        return self.engine.paused
+
+    @property
+    def indexCache(self):
+        return self.engine.indexCache
+
     def _generateWindows(self):
         """
         Summary:
@@ -315,8 +401,10 @@ class Player:
         win.border('|', '|', '-', '-', '+', '+', '+', '+')
         if self.selectedWin == win:
             win.border(']', '[', '=', '=', '+', '+', '+', '+')
-        win.refresh()
-        self.stdscr.refresh()
+        # The terminal itself is updated by _render
+        self.stdscr.noutrefresh()
+        win.noutrefresh()
+        self.pendingUpdate = True
 
     def _checkForInput(self):
         """
@@ -326,23 +414,11 @@ class Player:
         Checks for keypresses.
         """
 
-        key = self.stdscr.getch()
-
-        # Quits the program
-        if self.configuration["ks_Quit"] == key:
-            self.stop()
-            # raise KeyboardInterrupt()
-
-        # Shows the help menu
-        elif self.configuration["ks_HelpMenu"] == key:
-            self._showHelpMenu()
-
-        # Shows the queue
-        elif self.configuration["ks_Queue"] == key:
-            self._showQueue()
+        context = {self.listWin: "list", self.metaWin: "meta", self.barWin: "bar"}[self.selectedWin]
+        key, count = self._readKey(context)
 
         # Add resizability
-        elif curses.KEY_RESIZE == key:
+        if curses.KEY_RESIZE == key:
             for window in self.selectableWins:
                 del window
 
@@ -350,361 +426,277 @@ class Player:
             self.selectableWins = [self.listWin, self.metaWin, self.barWin]
             self.selectedWin = self.listWin
             self._refreshEverything()
+            return
+
+        action = self.keymap.action(context, key)
+        if action is None:
+            return
+        if action in self.handlers["global"]:
+            self.handlers["global"][action](count)
+        # Nothing has been found yet
+        elif context != "list" or self.albums:
+            self.handlers[context][action](count)
+
+    def _reloadKeymap(self):
+        """
+        Summary:
+        -------
+        reads the keybindings again when the config file
+        changed, without touching the rest of the settings.
+        """
 
+        if not self.keymap.outdated():
+            return
+        configuration, notParsedConfiguration, valid = loadConfiguration(self.configFile)
+        # A file being edited can be invalid for a while, the old keybindings are kept
+        if not valid:
+            return
+        for key, value in configuration.items():
+            if key.startswith("ks_"):
+                self.configuration[key] = value
+                self.notParsedConfiguration[key] = notParsedConfiguration[key]
+        self.keymap.build(self.configuration)
+
+    def _nextWindow(self, count=1):
         # Moves between windows
-        elif self.configuration["ks_MoveBetweenWins"] == key:
-            self.selectedWin = self.selectableWins[
-                (self.selectableWins.index(self.selectedWin) + 1) % len(self.selectableWins)]
-            self._refreshEverything()
+        self.selectedWin = self.selectableWins[
+            (self.selectableWins.index(self.selectedWin) + count) % len(self.selectableWins)]
+        self._refreshEverything()
 
-        # Song Selection Window specific hotkeys
-        if self.selectedWin == self.listWin:
-
-            # Scrolls songs down
-            if self.configuration["ks_SongSelectionDown"] == key:
-                if self.insideAlbum:
-                    self.listWinStart += 1 if self.listWinStart < len(self.albums.get(self.selectedAlbumName)) else 0
-                    try:
-                        self.selectedEntry = self.albums.get(self.selectedAlbumName)[self.listWinStart]
-                    except IndexError:
-                        self.listWinStart -= 1
-                    self.listWin.clear()
-                    self._populateSongs(self.listWin, self.albums.get(self.selectedAlbumName),
-                                        start=self.listWinStart, insideAlbum=True)
-
-                else:
-                    self.listWinStart += 1 if self.listWinStart < len(list(self.albums.keys())) else 0
-                    try:
-                        self.selectedAlbumName = list(self.albums.keys())[self.listWinStart]
-                    except IndexError:
-                        self.listWinStart -= 1
-                    self._populateSongs(self.listWin, self.albums, start=self.listWinStart)
+    def _openSelected(self, count=1):
+        """
+        Summary:
+        -------
+        plays the selected song, or opens the selected album or group.
+        """
 
-                self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
-                self._refreshEverything()
-
-            # Scrolls songs up
-            elif self.configuration["ks_SongSelectionUp"] == key:
-                if self.insideAlbum:
-                    self.listWinStart -= 1 if self.listWinStart > 0 else 0
-                    try:
-                        self.selectedEntry = self.albums.get(self.selectedAlbumName)[self.listWinStart]
-                    except IndexError:
-                        self.listWinStart += 1
-                    self.listWin.clear()
-                    self._populateSongs(self.listWin, self.albums.get(self.selectedAlbumName),
-                                        start=self.listWinStart, insideAlbum=True)
-
-                else:
-                    self.listWinStart -= 1 if self.listWinStart > 0 else 0
-                    try:
-                        self.selectedAlbumName = list(self.albums.keys())[self.listWinStart]
-                    except IndexError:
-                        self.listWinStart += 1
-                    self._populateSongs(self.listWin, self.albums, start=self.listWinStart)
+        if self.insideAlbum:
+            if self.selectedEntry == "..":
+                self.insideAlbum = False
+                self.listWinStart = list(self.albums.keys()).index(self.selectedAlbumName) \
+                    if self.selectedAlbumName in self.albums.keys() else 0
+                self._invalidate("list", "meta")
 
-                self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
-                self._refreshEverything()
+            else:
+                self._playQueue(self.albums.get(self.selectedAlbumName),
+                                start=self.albums.get(self.selectedAlbumName).index(self.selectedEntry))
 
-            # Plays the selected song
-            elif self.configuration["ks_PlayPauseSong"] == key:
-                if self.insideAlbum:
-                    if self.selectedEntry == "..":
-                        self.insideAlbum = False
-                        self.listWinStart = 0
-                        self.selectedAlbumName = list(self.albums.keys())[self.listWinStart]
-                        self._populateSongs(self.listWin,
-                                            self.albums,
-                                            start=0,
-                                            insideAlbum=False)
-                        self._populateMetadata(self.metaWin,
-                                               insideAlbum=False)
-                        return
+        elif self.selectedAlbumName == ".." and self.browsePath:
+            self._leaveGroup()
 
-                    else:
-                        try:
-                            # To avoid having two conflicting threads
-                            self.queueThread.kill()
-                        except Exception:
-                            pass
-
-                        self.queue.index = 0
-                        self.currentPlaylist = str(self.selectedEntry)[:-1] \
-                            if f"playlist_{str(self.selectedEntry)[:-1]}" in self.configuration.keys() else None
-                        self.queue = self._generateQueue(self.albums.get(self.selectedAlbumName),
-                                                         start=self.albums.get(self.selectedAlbumName).index(self.selectedEntry))
-                        self._playSong(song=self.queue[self.queue.index])
-
-                else:
-                    self.insideAlbum = True
-                    self.listWinStart = 0
-                    self.listWin.clear()
-                    self.selectedEntry = self.albums.get(self.selectedAlbumName)[0]
-                    self._populateSongs(self.listWin,
-                                        self.albums.get(self.selectedAlbumName),
-                                        start=self.albums.get(self.selectedAlbumName).index(self.selectedEntry),
-                                        insideAlbum=True)
-                    self._refreshEverything()
-
-            # Creates a playlist
-            elif self.configuration["ks_NewPlaylist"] == key:
-                if self.insideAlbum:
-                    self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
-                                                  self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
-                    self._makeErrorPopup(self.popupWin, "Return to album selection to create new playlist", "Error")
-                    return
+        elif isinstance(self.albums.get(self.selectedAlbumName), Group):
+            self._enterGroup(self.selectedAlbumName)
 
-                self._createNewPlaylist()
-
-            # Adds the selected song to a playlist
-            elif self.configuration["ks_AddToPlaylist"] == key:
-                self._addToPlaylist()
-
-            # Removes the selected song from a playlist
-            elif self.configuration["ks_RemoveFromPlaylist"] == key:
-                self._removeFromPlaylist()
-
-        # Metadata Window specific hotkeys
-        elif self.selectedWin == self.metaWin:
-            # Changes the song's Metadata:
-            if self.configuration["ks_ChangeMetadata"] == key:
-                self._changeMetadataFor(self.selectedEntry)
-                self._refreshEverything()
-
-            # Changes the music folder
-            if self.configuration["ks_ChangeFolderSetting"] == key:
-                self.metaWin.clear()
-                self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum, promptingForFolder=True)
-                curses.echo()
-                newFolder = self.metaWin.getstr(self.metaWin.getmaxyx()[0] - 3, 2)
-                curses.noecho()
-                if not os.path.isdir(newFolder.decode()):
-                    self._refreshEverything()
-                    self._addError(self.metaWin, self.metaWin.getmaxyx()[0] - 4, 2, "Current Folder:",
-                                   "Folder doesn't exist")
-                    self._refreshWindow(self.metaWin)
-                    return
-                if not len(self._getMusic(folder=newFolder.decode())):
-                    self._refreshEverything()
-                    self._addError(self.metaWin, self.metaWin.getmaxyx()[0] - 4, 2, "Current Folder:",
-                                   "Folder has no songs ")
-                    self._refreshWindow(self.metaWin)
-                    return
+        else:
+            self.insideAlbum = True
+            self.listWinStart = 0
+            self.selectedEntry = self.albums.get(self.selectedAlbumName)[0]
+            self._refreshEverything()
 
-                self.configuration["musicFolder"] = newFolder.decode()
-                self._refreshEverything()
-                self.listWin.clear()
-                self.listWinStart = 0
-                # self.music = self._getMusic(folder=newFolder.decode())
-                self._populateSongs(self.listWin,
-                                    self.albums if not self.insideAlbum else self.albums.get(self.selectedAlbumName),
-                                    self.listWinStart)
-                self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
+    def _newPlaylist(self, count=1):
+        if self.insideAlbum:
+            self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
+                                          self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
+            self._makeErrorPopup(self.popupWin, "Return to album selection to create new playlist", "Error")
+            return
 
-            # Changes the song flow (Linear / Random)
-            if self.configuration["ks_ChangeFlowSetting"] == key:
-                if self.insideAlbum:
-                    self.configuration["random"] = not self.configuration["random"]
-                    self.queue = self._generateQueue(self.albums.get(self.selectedAlbumName),
-                                                     start=self.albums.get(self.selectedAlbumName)[self.selectedEntry])
-                    self.queue.index = 1  # Skip first song, it's already playing
-                    if not self.configuration["random"]:
-                        self.queue.index = self.albums.get(self.selectedAlbumName)[self.selectedEntry] + 1
-                    self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
+        self._createNewPlaylist()
 
-        # Progress Bar Window specific hotkeys
-        elif self.selectedWin == self.barWin:
-
-            # Turns the volume down
-            if self.configuration["ks_VolumeDown"] == key:
-                if self.configuration["volume"] > 0:
-                    self.configuration["volume"] -= 1
-                    self._changeVolume(self.configuration["volume"])
-                    self._refreshWindow(self.barWin)
-
-            # Turns the volume up
-            elif self.configuration["ks_VolumeUp"] == key:
-                if self.configuration["volume"] < 100:
-                    self.configuration["volume"] += 1
-                    self._changeVolume(self.configuration["volume"])
-                    self._refreshWindow(self.barWin)
-
-            # Goes to the previous song
-            if self.configuration["ks_SongPrevious"] == key:
-                try:
-                    self.queueThread.kill()
-                except Exception:
-                    pass
-                self.queue.index = (self.queue.index - 1) % len(self.queue)
-                if self.queue[self.queue.index] == "..":
-                    self.queue.index = (self.queue.index - 1) % len(self.queue)
-                while f"playlist_{str(self.queue[self.queue.index])[:-1]}" in self.configuration.keys():
-                    self.queue.index = (self.queue.index - 1) % len(self.queue)
-                self._playSong(song=self.queue[self.queue.index])
-
-            # Goes to the next song
-            elif self.configuration["ks_SongNext"] == key:
-                try:
-                    self.queueThread.kill()
-                except Exception:
-                    pass
-                self.queue.index = (self.queue.index + 1) % len(self.queue)
-                if self.queue[self.queue.index] == "..":
-                    self.queue.index = (self.queue.index + 1) % len(self.queue)
-                while f"playlist_{str(self.queue[self.queue.index])[:-1]}" in self.configuration.keys():
-                    self.queue.index = (self.queue.index + 1) % len(self.queue)
-                self._playSong(song=self.queue[self.queue.index])
-
-            # Pauses / UnPauses the song
-            elif self.configuration["ks_PlayPauseSong"] == key:
-                if self.paused:
-                    mixer.music.unpause()
-                    self.barWin.clear()
-                    self.paused = False
-                else:
-                    mixer.music.pause()
-                    self.paused = True
-                    self._refreshWindow(self.barWin)
-
-    def _playSong(self, song=None, start=1.0):
+    def _changeFolder(self, count=1):
+        # Changes the music folder
+        self.metaWin.clear()
+        self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum, promptingForFolder=True)
+        curses.echo()
+        newFolder = self.metaWin.getstr(self.metaWin.getmaxyx()[0] - 3, 2)
+        curses.noecho()
+        if not os.path.isdir(newFolder.decode()):
+            # Drawn right away, so the error is drawn over it
+            self._refreshEverything()
+            self._render(force=True)
+            self._addError(self.metaWin, self.metaWin.getmaxyx()[0] - 4, 2, "Current Folder:",
+                           "Folder doesn't exist")
+            self._refreshWindow(self.metaWin)
+            return
+        if next(Scanner.walk(newFolder.decode(), Engine.supportedExtensions, self.configuration["includeGlobs"],
+                             self.configuration["excludeGlobs"], Formats.sniff), None) is None:
+            # Drawn right away, so the error is drawn over it
+            self._refreshEverything()
+            self._render(force=True)
+            self._addError(self.metaWin, self.metaWin.getmaxyx()[0] - 4, 2, "Current Folder:",
+                           "Folder has no songs ")
+            self._refreshWindow(self.metaWin)
+            return
+
+        self.configuration["musicFolder"] = newFolder.decode()
+        self.engine.configure({"musicFolder": self.configuration["musicFolder"]})
+        self._startScan()
+        self._refreshEverything()
+
+    def _changeFlow(self, count=1):
+        # Changes the song flow (Linear / Random). The current queue is reordered, not rebuilt
+        self.configuration["random"] = not self.configuration["random"]
+        self.engine.setShuffled(self.configuration["random"])
+        self._invalidate("meta")
+
+    def _stepVolume(self, steps):
+        volume = min(max(self.configuration["volume"] + steps, 0), 100)
+        if volume != self.configuration["volume"]:
+            self.engine.setVolume(volume)
+            self._invalidate("bar")
+
+    def _skip(self, forward):
+        # Goes to the next or previous song
+        if len(self.queue):
+            self._showPlaying(self.engine.next() if forward else self.engine.previous())
+
+    def _togglePause(self, count=1):
+        # Pauses / UnPauses the song
+        if self.paused:
+            self.engine.resume()
+        else:
+            self.engine.pause()
+        self._invalidate("bar")
+
+    def _playQueue(self, songs, start=0):
         """
         Summary:
         -------
-        plays a given song.
+        replaces the queue and plays it from a given index.
 
         Parameters:
         -------
-        song : str
-            The song to play. If None, the currently selected song plays
+        songs : List
+            The songs to include in the queue
 
-        start : float
-            The start time of the song. If None, begin at the start of the song
+        start : int
+            The index to start from
         """
 
-        # Currently selected song or "song" parameter
-        self.selectedEntry = self.albums.get(self.selectedAlbumName)[self.listWinStart] if not song else song
-        self.playingSong = self.selectedEntry
-
-        # Automatically moves to the progress bar window
-        self.selectedWin = self.barWin
-        self._refreshEverything()
-        mixer.music.stop()
+        playlist = self.selectedAlbumName \
+            if f"playlist_{self.selectedAlbumName}" in self.configuration.keys() else None
+        if playlist:
+            # The queue is the playlist itself
+            songs = self.configuration[f"playlist_{playlist}"]
 
-        mixer.music.load(self.selectedEntry.path)
+        self._showPlaying(self.engine.setQueue(songs, start=start, shuffled=self.configuration["random"],
+                                               playlist=playlist))
 
-        # To avoid "pygame.error: Audio device hasn't been opened"
-        while True:
-            try:
-                mixer.music.play(start=start)
-                break
-            except Exception:
-                continue
-        self.paused = False
-        mixer.music.set_volume(self.configuration["volume"] / 100)
-        self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
-        if self.insideAlbum:
-            self._populateSongs(self.listWin, self.albums.get(self.selectedAlbumName), self.listWinStart,
-                                insideAlbum=True)
-        else:
-            self._populateSongs(self.listWin, self.albums, self.listWinStart,
-                                insideAlbum=False)
+    def _showPlaying(self, played):
+        """
+        Summary:
+        -------
+        shows the song the engine just started playing.
 
-        if self.progressBarThread is not None:
-            try:
-                self.progressBarThread.terminate()
-            except Exception as e:
-                pass
+        Parameters:
+        -------
+        played : bool
+            Wether the song could be played
+        """
 
-        if self.queueThread is not None:
-            try:
-                self.queueThread.terminate()
-            except Exception:
-                pass
+        if not played:
+            self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
+                                          self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
+            self._makeErrorPopup(self.popupWin, "This song can't be played", "Unsupported Format")
+            return
 
-        self.progressBarThread = kthread.KThread(target=self._startProgressBar, kwargs={"song": song}, daemon=True)
-        self.progressBarThread.start()
+        self.selectedEntry = self.shownSong = self.playingSong
 
-        if not self.queueThread:
-            self.queueThread = kthread.KThread(target=self._queueHelper, daemon=True)
-            self.queueThread.start()
+        # Automatically moves to the progress bar window
+        self.selectedWin = self.barWin
+        self._refreshEverything()
 
-    def _queueHelper(self):
+    def _seek(self, seconds):
         """
         Summary:
         -------
-        the method used by the queueThread thread.
-        Handles the queue.
+        moves the playback position of the current song.
+
+        Parameters:
+        -------
+        seconds : float
+            How much to move by. Negative values seek backwards
         """
 
-        # Generates a new queue
-        self.queue = self._generateQueue(self.albums.get(self.selectedAlbumName),
-                                         start=self.albums.get(self.selectedAlbumName).index(self.selectedEntry))
-        self.queue.index = 0
+        self.engine.seek(seconds)
+        self.barWinState = None
 
-        while True:
-            while mixer.music.get_busy():
-                continue
-
-            self.queue.index = (self.queue.index + 1) % len(self.queue)
-            if self.queue[self.queue.index] == "..":
-                self.queue.index = (self.queue.index + 1) % len(self.queue)
-            while f"playlist_{str(self.queue[self.queue.index])[:-1]}" in self.configuration.keys():
-                self.queue.index = (self.queue.index + 1) % len(self.queue)
+    def _refreshEverything(self):
+        """
+        Summary:
+        -------
+        redraws all visible windows with the next frame
+        """
 
-            self.barWinProgress = 0
-            self.progressBarThread.terminate()
-            self._playSong(song=self.queue[self.queue.index], start=0.0)
+        self._invalidate("all")
 
-    def _generateQueue(self, songs, start=0) -> Queue:
+    def _invalidate(self, *parts):
         """
         Summary:
         -------
-        generates a queue starting at a given index.
+        marks parts of the screen as outdated, so
+        they're drawn again with the next frame.
 
         Parameters:
         -------
-        songs : List
-            The songs to include in the queue
-
-        start : int
-            The index to start from
-
-        Returns:
-        -------
-        List
-            The generated queue
+        parts : str
+            "list", "meta", "bar" or "all"
         """
 
-        if not self.currentPlaylist:
-            if len(songs) > 1:
-                order = list(range(start, len(songs))) + list(range(0, start))
-            else:
-                order = [0]
-            queue = [songs[i] for i in order if i < len(songs)]
-            if self.configuration["random"]:
-                random.shuffle(queue)
-                queue[0] = self.selectedEntry
-            return Queue(*queue)
-        else:
-            # The queue is the playlist itself
-            music = self.configuration[f"playlist_{self.currentPlaylist}"]
-            if self.configuration["random"]:
-                random.shuffle(music)
-            return Queue(*music)
+        self.dirty.update(parts)
 
-    def _refreshEverything(self):
+    def _render(self, force=False):
         """
         Summary:
         -------
-        refreshes all visible windows
+        draws the outdated parts of the screen, at most "maxFps" times
+        per second. The windows are only drawn in memory, and the
+        terminal is updated once per frame, however many changed.
+
+        Parameters:
+        -------
+        force : bool
+            Wether to draw right away, even if the last frame is too recent
         """
 
+        if not self.dirty and not self.pendingUpdate:
+            return
+        now = time.monotonic()
+        if not force and now - self.renderedAt < 1 / self.configuration["maxFps"]:
+            return
+        self.renderedAt = now
+
+        dirty, self.dirty = self.dirty, set()
+        try:
+            if "all" in dirty:
+                self._drawEverything()
+            else:
+                if "list" in dirty:
+                    self.listWin.erase()
+                    if self.insideAlbum:
+                        self._populateSongs(self.listWin, self.albums.get(self.selectedAlbumName),
+                                            start=self.listWinStart, insideAlbum=True)
+                    else:
+                        self._populateSongs(self.listWin, self.albums, start=self.listWinStart)
+                    self._refreshWindow(self.listWin)
+                if "meta" in dirty:
+                    self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
+                    self._refreshWindow(self.metaWin)
+                if "bar" in dirty:
+                    self._setProgressBar(self.barWinProgress if self.playingSong else 0)
+        except curses.error:
+            pass
+
+        curses.doupdate()
+        self.pendingUpdate = False
+
+    def _drawEverything(self):
+        # Draws every window from scratch
         try:
             self.stdscr.clear()
             self.metaWin.clear()
             self.listWin.clear()
             self.barWin.clear()
-            if mixer.music.get_busy():
+            if self.playingSong:
                 # A song is playing, don't reset the progress bar
                 self._setProgressBar(int(self.barWinProgress))
             else:
@@ -716,96 +708,365 @@ class Player:
                 self._populateSongs(self.listWin, self.albums, self.listWinStart, insideAlbum=False)
             self._refreshWindow(self.listWin)
             self._refreshWindow(self.barWin)
-            self._refreshWindow(self.metaWin)
             self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
-            self._changeVolume(self.configuration["volume"])
+            self._refreshWindow(self.metaWin)
         except Exception:
             pass
 
-    def _getMusic(self, folder=None) -> List[Song]:
+    def _readKey(self, context) -> Tuple[int, int]:
         """
         Summary:
         -------
-        returns all songs inside a given folder.
-        if folder is None, the folder is taken from the
-        configuration file
+        waits for a keypress. A key held down (scrolling,
+        changing the volume...) fills the input with copies
+        of itself: they're all read at once and handled as one.
 
         Parameters:
         -------
-        folder : str
-            The folder to check
+        context : str
+            The window the key is pressed in
 
         Returns:
         -------
-        List
-            All the songs that were found
+        Tuple
+            The key and the number of times it was pressed
+        """
+
+        # Wakes up in time for the next frame, or regularly to update the progress bar
+        if self.dirty:
+            wait = self.renderedAt + 1 / self.configuration["maxFps"] - time.monotonic()
+        else:
+            wait = 0.25
+        if self.visualizer and self.playingSong and not self.paused:
+            wait = min(wait, self.visualizer.wait(time.monotonic()))
+        self.inputWin.timeout(max(int(wait * 1000), 0))
+
+        key = self.inputWin.getch()
+        if self.keymap.action(context, key) not in Keymap.repeatable:
+            return key, 1
+
+        count = 1
+        self.inputWin.timeout(0)
+        while count < 1000:
+            following = self.inputWin.getch()
+            if following != key:
+                # Any other key is left for whoever reads next (a popup...)
+                if following != -1:
+                    curses.ungetch(following)
+                break
+            count += 1
+        return key, count
+
+    def _scroll(self, steps):
+        """
+        Summary:
+        -------
+        moves the selection of the song selection window.
+
+        Parameters:
+        -------
+        steps : int
+            How many entries to move by. Negative values move up
+        """
+
+        entries = self.albums.get(self.selectedAlbumName) if self.insideAlbum else list(self.albums.keys())
+        self.listWinStart = min(max(self.listWinStart + steps, 0), max(len(entries) - 1, 0))
+        if self.insideAlbum:
+            self.selectedEntry = entries[self.listWinStart]
+        else:
+            self.selectedAlbumName = entries[self.listWinStart]
+        self._invalidate("list", "meta")
+
+    def _startScan(self):
+        """
+        Summary:
+        -------
+        empties the library and starts looking for songs
+        in the music folders, in the background.
+        """
+
+        self.engine.startScan()
+        self.browsePath = []
+        self.albums = self._getAlbums()
+        self.insideAlbum = False
+        self.listWinStart = 0
+        self.selectedAlbumName = None
+        self.listWin.clear()
+
+    def _pollEngine(self):
+        """
+        Summary:
+        -------
+        shows what changed in the engine since the last call:
+        the songs found by the scanners, the song being played...
+        """
+
+        changes = self.engine.update()
+
+        if self.engine.remote and not self.engine.connected:
+            self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
+                                          self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
+            self._makeErrorPopup(self.popupWin, "The daemon stopped", "Daemon")
+            sys.exit(-1)
+
+        if (changes["added"] or changes["removed"] or changes["updated"] or changes["playlists"]
+                or changes["played"]) and not self.insideAlbum:
+            self._refreshLevel()
+
+        if self.artCache.ready():
+            self._invalidate("meta")
+
+        if changes["scanned"]:
+            if not len(self.library) and self.engine.scanned:
+                self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
+                                              self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
+                self._makeErrorPopup(self.popupWin, "No songs in the music folders", "Music Folder")
+                sys.exit(-1)
+
+            # Once the eager folders are scanned, unless the user already moved somewhere else
+            if self.session and self.engine.eagerScanned:
+                if not self.browsePath and not self.insideAlbum:
+                    self._restoreBrowsing(self.session)
+                    self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
+                self.session = None
+
+        if not self.playlistsChecked and self.engine.eagerScanned:
+            self.playlistsChecked = True
+            self._checkPlaylists()
+
+        # The engine moved on to the next song by itself
+        if self.playingSong is not self.shownSong:
+            self.shownSong = self.playingSong
+            self._refreshEverything()
+        elif changes["status"]:
+            self.barWinState = None
+        self._updateProgress()
+
+    def _checkPlaylists(self):
+        """
+        Summary:
+        -------
+        removes the songs that don't exist anymore from the playlists,
+        as playlists can contain songs from different folders, and trying
+        to access a song that has been deleted would crash the program.
+        It's done once the library is scanned, so the songs it holds
+        were just found and aren't looked for again.
+        """
+
+        missing = Parser.getSongsMissingFromPlaylist({k: v for k, v in self.configuration.items()
+                                                      if k.startswith("playlist_")}, self.library)
+        if missing:
+            # The playlists are saved with the rest of the settings when quitting
+            for name, songs in missing.items():
+                self.engine.removeFromPlaylist(name[9:], songs)
+            self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
+                                          self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
+            self._makeErrorPopup(self.popupWin, "Unaccessible songs were removed from playlists", "Playlists")
+
+    def _refreshLevel(self):
+        """
+        Summary:
+        -------
+        shows the current level of the library again after it changed,
+        keeping the same entry selected.
+        """
+
+        self.albums = self._getAlbums()
+        if not self.albums:
+            return
+
+        if self.selectedAlbumName in self.albums.keys():
+            self.listWinStart = list(self.albums.keys()).index(self.selectedAlbumName)
+        else:
+            self.listWinStart = 0
+            self.selectedAlbumName = list(self.albums.keys())[self.listWinStart]
+            self.selectedEntry = self.albums[self.selectedAlbumName]
+            self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
+
+        self.listWin.clear()
+        self._populateSongs(self.listWin, self.albums, start=self.listWinStart)
+
+    def _getAlbums(self) -> Dict:
+        """
+        Summary:
+        -------
+        returns the level of the library the user is currently
+        browsing, grouped according to the selected view.
+        The orderings are kept up to date by the library
+        index, so this doesn't sort anything
+
+        Returns:
+        -------
+        Dict
+            The groups or albums of the current level
+        """
+
+        albums = self.library.level(self.configuration["view"], self.browsePath)
+        if self.browsePath:
+            albums[".."] = None
+        else:
+            for conf in self.configuration.keys():
+                if conf.startswith("playlist_") and conf[9:].strip() not in albums.keys():
+                    albums[conf[9:].strip()] = self.configuration[conf] + [".."]
+            # Kept up to date by the library index, so this doesn't filter anything
+            for name in self.library.smartPlaylists:
+                if name not in albums.keys():
+                    albums[name] = self.library.smartPlaylist(name)
+        return albums
+
+    def _enterGroup(self, name):
+        """
+        Summary:
+        -------
+        descends into a group of the library hierarchy.
+
+        Parameters:
+        -------
+        name : str
+            The name of the group
+        """
+
+        self.browsePath.append(name)
+        self.albums = self._getAlbums()
+        self.listWinStart = 0
+        self.selectedAlbumName = list(self.albums.keys())[self.listWinStart]
+        self.listWin.clear()
+        self._populateSongs(self.listWin, self.albums, start=self.listWinStart)
+        self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
+        self._refreshEverything()
+
+    def _leaveGroup(self):
+        """
+        Summary:
+        -------
+        goes back to the level above the current one,
+        selecting the group the user came from.
+        """
+
+        name = self.browsePath.pop()
+        self.albums = self._getAlbums()
+        self.listWinStart = list(self.albums.keys()).index(name) if name in self.albums.keys() else 0
+        self.selectedAlbumName = list(self.albums.keys())[self.listWinStart]
+        self.listWin.clear()
+        self._populateSongs(self.listWin, self.albums, start=self.listWinStart)
+        self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
+        self._refreshEverything()
+
+    def _changeView(self):
+        """
+        Summary:
+        -------
+        switches to the next library view and goes
+        back to the group selection.
         """
 
-        if not folder:
-            folder = self.configuration["musicFolder"]
-        out = []
-        for f in os.listdir(folder):
-            if os.path.isdir(os.path.join(folder, f)):
-                out.extend(self._getMusic(folder=os.path.join(folder, f)))
-            elif f.split(".")[-1] in supportedExtensions:
-                out.append(Song(os.path.join(folder, f)))
-        return out
+        self.configuration["view"] = viewOrder[(viewOrder.index(self.configuration["view"]) + 1) % len(viewOrder)]
+        self.browsePath = []
+        self.albums = self._getAlbums()
+        self.insideAlbum = False
+        self.listWinStart = 0
+        self.selectedAlbumName = list(self.albums.keys())[self.listWinStart]
+        self.listWin.clear()
+        self._populateSongs(self.listWin, self.albums, start=self.listWinStart)
+        self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
+        self._refreshEverything()
 
-    @staticmethod
-    def _getAlbums(songs) -> Dict:
+    def start(self):
         """
         Summary:
         -------
-        classifies the given song list by album
+        starts the program itself
+        """
 
-        Parameters:
-        -------
-        songs : List
-            The songs to classify
+        # The library is shown and can be played while it's being scanned.
+        # The daemon already has it, and scans it for every player
+        if not self.engine.remote:
+            self._startScan()
+        self._pollEngine()
+        self._invalidate("all")
+        self._render(force=True)
+
+        # Used by benchmarks/startup.py to measure the time to the first frame
+        if os.environ.get("MUSICLI_BENCHMARK"):
+            with open(os.environ["MUSICLI_BENCHMARK"], "w") as f:
+                f.write(str(time.perf_counter() - startTime))
+            return
 
-        Returns:
+        # The previous session resumes playing before the library is scanned
+        self.session = Session.load(self.sessionFile)
+        if self.session:
+            self.engine.restoreSession(self.session)
+            # Attached to a daemon that's done scanning, there's nothing to wait for
+            if self.engine.eagerScanned and len(self.library):
+                self._restoreBrowsing(self.session)
+                self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
+                self.session = None
+        # Wakes up regularly even without input, to update the progress bar
+        # and to show the songs found by the scanner
+        while True:
+            self._checkForInput()
+            self._pollEngine()
+            self._updateVisualizer()
+            # Checking the file takes a system call, so it's only done every second
+            if time.monotonic() - self.keymapCheckedAt > 1:
+                self.keymapCheckedAt = time.monotonic()
+                self._reloadKeymap()
+            self._render()
+
+            if time.monotonic() - self.sessionSavedAt > 30:
+                self._saveSession()
+
+    def _saveSession(self):
+        """
+        Summary:
         -------
-        Dict
-            The classified songs
+        saves the queue, the playback position and the
+        browsing position, so they can be restored on the next start.
         """
 
-        albums = {}
-        for song in songs:
-            key = song.album
-            try:
-                albums[key].append(song)
-            except (AttributeError, KeyError):
-                albums[key] = Album([song])
-
-        for k in albums.keys():
-            albums[k].append("..")
-        return albums
+        self.sessionSavedAt = time.monotonic()
+        self.engine.saveSession({"view": self.configuration["view"],
+                                 "album": self.selectedAlbumName,
+                                 "browsePath": self.browsePath,
+                                 "insideAlbum": self.insideAlbum})
 
-    def start(self):
+    def _restoreBrowsing(self, session):
         """
         Summary:
         -------
-        starts the program itself
+        goes back to the album the user was browsing in a previous session,
+        if it still exists.
+
+        Parameters:
+        -------
+        session : Dict
+            The state loaded from the session snapshot
         """
 
-        music = self._getMusic()
-        if not music:
-            self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
-                                          self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
-            self._makeErrorPopup(self.popupWin, "No songs in default music folder", "Music Folder")
-            sys.exit(-1)
-        self.albums = self._getAlbums(music)
-        self.selectedAlbumName = list(self.albums.keys())[0]
+        if session["view"] not in views.keys():
+            return
 
-        self._populateSongs(self.listWin, self.albums, self.listWinStart)
-        self.selectedEntry = self.albums[list(self.albums.keys())[self.listWinStart]]
-        self.currentPlaylist = str(self.selectedEntry)[:-1] \
-            if f"playlist_{str(self.selectedEntry)[:-1]}" in self.configuration.keys() else None
+        self.configuration["view"] = session["view"]
+        self.browsePath = session["browsePath"]
+        self.albums = self._getAlbums()
+        if session["album"] not in self.albums.keys():
+            self.browsePath = []
+            self.albums = self._getAlbums()
+            # The eager folders may have no songs while the lazy ones are still being scanned
+            self.listWinStart = 0
+            self.selectedAlbumName = next(iter(self.albums), None)
+            return
 
-        self._populateMetadata(self.metaWin, insideAlbum=self.insideAlbum)
-        self._setProgressBar(0)
-        while True:
-            self._checkForInput()
+        self.selectedAlbumName = session["album"]
+        self.listWinStart = list(self.albums.keys()).index(self.selectedAlbumName)
+        self.listWin.clear()
+        if session["insideAlbum"] and isinstance(self.albums[self.selectedAlbumName], (Album, list)):
+            self.insideAlbum = True
+            self.listWinStart = 0
+            self.selectedEntry = self.albums[self.selectedAlbumName][0]
+            self._populateSongs(self.listWin, self.albums[self.selectedAlbumName], start=0, insideAlbum=True)
+        else:
+            self._populateSongs(self.listWin, self.albums, start=self.listWinStart)
 
     def stop(self):
         """
@@ -817,6 +1078,11 @@ class Player:
         # Saves the latest settings
         Parser.writeConfigFile(self.configFile,
                                self.configuration)
+        self.fingerprinter.stop()
+        if self.visualizer:
+            self.visualizer.follow(None, 0.0)
+        self._saveSession()
+        self.engine.close()
         curses.nocbreak()
         self.stdscr.keypad(False)
         curses.echo()
@@ -847,74 +1113,70 @@ class Player:
         x = 2
         y = 1
         for conf in self.configuration.keys():
-            if conf.startswith("playlist_"):
+            if conf.startswith("playlist_") and not self.browsePath:
                 # Adds playlists that may have been left out
                 if not conf[9:].strip() in self.albums.keys():
                     self.albums[conf[9:].strip()] = self.configuration[conf] + [".."]
 
+        # Only the entries that fit in the window are drawn
+        visible = itertools.islice(elements, start, start + win.getmaxyx()[0] - 2)
         if insideAlbum:
-            for i, song in enumerate(list(elements)[start:]):
+            for i, song in enumerate(visible):
                 songName = song.title if isinstance(song, Song) else song
                 if i == 0:
                     songName = "]-> " + songName
                 win.addstr(y, x, songName[:(self.stdscr.getmaxyx()[1] // 3 - 1)])
-                self._refreshWindow(win)
                 y += 1
 
         else:
-            for i, element in enumerate(list(elements)[start:]):
+            for i, element in enumerate(visible):
                 if i == 0:
                     element = "]-> " + element
                 win.addstr(y, x, element[:(self.stdscr.getmaxyx()[1] // 3 - 1)])
-                self._refreshWindow(win)
                 y += 1
+        self._refreshWindow(win)
 
     def _changeVolume(self, volume):
         """
         Summary:
         -------
-        changes the song volume and displayes the changes.
+        displays the song volume.
 
         Parameters:
         -------
         volume : int
-            The new volume
+            The volume
         """
 
         self.barWin.clear()
         self.barWin.addstr(2, self.barWin.getmaxyx()[1] - len("Volume") - 1, f"Volume", curses.color_pair(1))
         self.barWin.addstr(3, self.barWin.getmaxyx()[1] - 5, f"{volume}%")
 
-        # Usually it should be divided by 100,
-        # But on my test machine the volume was extremely high
-        mixer.music.set_volume(self.configuration["volume"] / 500)
-
-    def _startProgressBar(self, song=None):
+    def _updateProgress(self):
         """
         Summary:
         -------
-        starts the progress bar movement.
-
-        Parameters:
-        -------
-        song : str
-            The song playing
+        updates the progress bar according to the playback position.
+        The bar is only redrawn when what it shows changes.
         """
 
-        index = self.barWinProgress
-        length = song.length
+        progress = elapsed = 0
+        if self.playingSong and isinstance(self.playingSong.length, (int, float)):
+            length = max(self.playingSong.length, 1)
+            elapsed = min(self.engine.position(), length)
+            progress = int(elapsed / length * (self.barWin.getmaxyx()[1] - 5))
 
-        self.barWin.addstr(2, 1, f"Progress", curses.color_pair(1))
-        self._refreshWindow(self.barWin)
-        while mixer.music.get_busy():
-            # Don't do anything while the song is paused
-            if self.paused:
-                continue
+        state = (progress, int(elapsed), self.paused, self.playingSong, self.engine.scanning)
+        if state == self.barWinState:
+            return
 
-            self._setProgressBar(int(index))
-            self.barWinProgress = self.queue.index
-            time.sleep(1)
-            index += (self.barWin.getmaxyx()[1] - 5) / length
+        self.barWinState = state
+        self.barWinProgress = progress
+        self._invalidate("bar")
+
+    @staticmethod
+    def _formatTime(seconds) -> str:
+        return f"{int(seconds) // 60}:{int(seconds) % 60:02d}"
 
     def _setProgressBar(self, progress):
         """
@@ -931,13 +1193,24 @@ class Player:
         self.barWin.clear()
         self._changeVolume(self.configuration["volume"])
         self.barWin.addstr(1, 1, "Playing: ", curses.color_pair(1))
-        self.barWin.addstr(1, len("Playing: ") + 1, os.path.basename(self.playingSong.title)[:50] if self.playingSong else "")
+        self.barWin.addstr(1, len("Playing: ") + 1, str(self.playingSong.title)[:50] if self.playingSong else "")
 
-        if self.paused and mixer.music.get_busy():
+        if self.paused and self.playingSong:
             self.barWin.addstr(2, self.barWin.getmaxyx()[1] // 2 - len(f"Paused") // 2, f"Paused", curses.color_pair(1))
 
         self.barWin.addstr(2, 1, f"Progress", curses.color_pair(1))
+        if self.playingSong and isinstance(self.playingSong.length, (int, float)):
+            self.barWin.addstr(2, len("Progress") + 2,
+                               f"{self._formatTime(min(self.engine.position(), self.playingSong.length))}"
+                               f" / {self._formatTime(self.playingSong.length)}")
         self.barWin.addstr(3, 1, "#" * progress)
+        # The window was cleared, the last frame is drawn again
+        if self.visualizer and self.playingSong:
+            self.visualizer.draw(self.barWin, *self._visualizerArea())
+
+        if self.engine.scanning is not None:
+            status = f"Scanning: {self.engine.scanning} songs"
+            self.barWin.addstr(1, self.barWin.getmaxyx()[1] - len(status) - 1, status, curses.color_pair(1))
         self._refreshWindow(self.barWin)
 
     def _addMetadata(self, win, y, x, tag, value):
@@ -1015,39 +1288,17 @@ class Player:
             Wether or not the user is currently inside an album
         """
 
-        win.clear()
-
-        albumName = self.selectedAlbumName
-        first = Figlet(font="colossal").renderText(albumName[0].upper())
-        rest = Figlet(font="basic").renderText(albumName[1:])
-
-        difference = len(first.split("\n")) - len(rest.split("\n"))
-        logo = "\n".join(first.split("\n")[:difference]) + "\n"
-        for i, line in enumerate(rest.split("\n")):
-            logo += first.split("\n")[(difference + i - 1) % len(first.split("\n"))] + line + "\n"
+        # Erased rather than cleared, so the terminal isn't repainted from scratch
+        win.erase()
 
-        try:
-            for i, line in enumerate(logo.split("\n")):
-                win.addstr(win.getmaxyx()[0] - len(logo.split("\n")) + i,
-                           (win.getmaxyx()[1] - len(logo.split("\n")[len(logo.split("\n")) // 2])) // 2,
-                           line,
-                           curses.color_pair(3))
-        except Exception:
-            win.clear()
-            rest = Figlet(font="basic").renderText(f"{albumName[1:3]} . . .")
-            difference = len(first.split("\n")) - len(rest.split("\n"))
-            logo = "\n".join(first.split("\n")[:difference]) + "\n"
-            for i, line in enumerate(rest.split("\n")):
-                logo += first.split("\n")[(difference + i - 1) % len(first.split("\n"))] + line + "\n"
+        # The logo is only drawn for albums, songs clear it anyway.
+        # Nothing is selected while the library is still loading
+        if not insideAlbum and self.selectedAlbumName:
+            self._drawLogo(win, self.selectedAlbumName)
 
-            for i, line in enumerate(logo.split("\n")):
-                win.addstr(10 + i,
-                           (win.getmaxyx()[1] - len(logo.split("\n")[len(logo.split("\n")) // 2])) // 2,
-                           line,
-                           curses.color_pair(3))
         # The song is a single song
         if insideAlbum:
-            win.clear()
+            win.erase()
             if self.selectedEntry != "..":
                 # All these try except are really ugly
                 # I should find a better way, but this works
@@ -1074,14 +1325,19 @@ class Player:
                     self._addMetadata(win, 13, 2, "Album:", self.selectedEntry.album)
                 except Exception:
                     self._addMetadata(win, 13, 2, "Album:", "<Unknown>")
+                self._drawArt(win, self.selectedEntry)
 
             else:
                 self._addMetadata(win, 1, 2, "Type:", "Wildcard")
                 self._addMetadata(win, 4, 2, "Action:", "Go back")
 
         else:
+            # Nothing to show yet, the library is still loading
+            if self.selectedAlbumName not in self.albums.keys():
+                pass
+
             # The song is a playlist
-            if f"playlist_{self.selectedAlbumName}" in self.configuration.keys():
+            elif f"playlist_{self.selectedAlbumName}" in self.configuration.keys():
                 self._addMetadata(win, 1, 2, "Type:", "Playlist")
                 self._addMetadata(win, 4, 2, "Title:", self.selectedAlbumName)
                 win.addstr(7, 2, "Songs:", curses.color_pair(1))
@@ -1096,6 +1352,28 @@ class Player:
                 except Exception:
                     pass
 
+            # The entry is a smart playlist
+            elif self.selectedAlbumName in self.library.smartPlaylists and not self.browsePath:
+                rules = SmartPlaylist.fromConfiguration(self.configuration).get(self.selectedAlbumName, [])
+                self._addMetadata(win, 1, 2, "Type:", "Smart Playlist")
+                self._addMetadata(win, 4, 2, "Title:", self.selectedAlbumName)
+                self._addMetadata(win, 7, 2, "Contents:", f"{len(self.albums[self.selectedAlbumName]) - 1} songs")
+                win.addstr(10, 2, "Rules:", curses.color_pair(1))
+                for i, rule in enumerate(rules[:7]):
+                    win.addstr(11 + i, 2, str(rule)[:win.getmaxyx()[1] - 4])
+
+            # The entry goes back to the previous level
+            elif self.selectedAlbumName == ".." and self.browsePath:
+                self._addMetadata(win, 1, 2, "Type:", "Wildcard")
+                self._addMetadata(win, 4, 2, "Action:", "Go back")
+
+            # The entry is a group of albums (an artist, a year...)
+            elif isinstance(self.albums.get(self.selectedAlbumName), Group):
+                group = self.albums[self.selectedAlbumName]
+                self._addMetadata(win, 1, 2, "Type:", group.title)
+                self._addMetadata(win, 4, 2, "Title:", group.name)
+                self._addMetadata(win, 7, 2, "Contents:", f"{len(group)} albums, {group.songs} songs")
+
             # The song is an album
             else:
                 albumName = self.selectedAlbumName
@@ -1106,8 +1384,11 @@ class Player:
                     self._addMetadata(win, 7, 2, "Artist:", firstSong.artist)
                 except Exception:
                     self._addMetadata(win, 7, 2, "Artist:", "<Unknown>")
+                self._drawArt(win, firstSong)
 
-        # Adds global settings (Flow, Folder)
+        # Adds global settings (View, Flow, Folder)
+        self._addMetadata(win, win.getmaxyx()[0] - 10, 2, "Library View:",
+                          f"{views[self.configuration['view']].title} (Change: v)")
         self._addMetadata(win, win.getmaxyx()[0] - 7, 2, "Song Flow:",
                           "Random (Change: f)" if self.configuration["random"] else "Linear (Change: f)")
 
@@ -1117,10 +1398,101 @@ class Player:
             return
 
         self._addMetadata(win, win.getmaxyx()[0] - 4, 2, "Current Folder:",
-                          self.configuration["musicFolder"] + " (Change: c)")
+                          self.configuration["musicFolder"]
+                          + (f" +{len(self.configuration['musicRoots'])} more" if self.configuration["musicRoots"] else "")
+                          + " (Change: c)")
+
+    def _drawArt(self, win, song):
+        """
+        Summary:
+        -------
+        draws the cover art of a song in the top right corner of a window.
+        Each character holds two pixels, one above the other: the upper
+        half block takes the color of the top one, its background
+        the color of the bottom one.
+
+        Parameters:
+        -------
+        win : curses.window
+            The window to draw the art on
+
+        song : Song
+            The song whose art is drawn
+        """
+
+        if not isinstance(song, Song) or curses.COLORS < 256:
+            return
+
+        rows = min(12, (win.getmaxyx()[0] - 2) // 3)
+        cols = rows * 2
+        # Made in the background, the window is drawn again once it's ready (see _pollEngine)
+        pixels = self.artCache.request(song.path, cols, rows * 2)
+        if pixels is None:
+            return
+
+        if self.palette.available < rows * cols:
+            self.palette.reset()
+        x = win.getmaxyx()[1] - cols - 2
+        attribute = 0
+        for row in range(rows):
+            for col in range(cols):
+                top = (row * 2 * cols + col) * 3
+                bottom = top + cols * 3
+                pair = self.palette.pair(Art.colorIndex(*pixels[top:top + 3]),
+                                         Art.colorIndex(*pixels[bottom:bottom + 3]))
+                # Out of color pairs: keeps the color of the previous pixel
+                attribute = pair if pair is not None else attribute
+                try:
+                    win.addstr(1 + row, x + col, "\u2580", attribute)
+                except curses.error:
+                    return
+
+    @staticmethod
+    def _drawLogo(win, albumName):
+        """
+        Summary:
+        -------
+        draws the name of an album with big letters.
+
+        Parameters:
+        -------
+        win : curses.window
+            The window to draw the name on
+
+        albumName : str
+            The name of the album
+        """
+
+        first = _renderFiglet(albumName[0].upper(), "colossal")
+        rest = _renderFiglet(albumName[1:], "basic")
+
+        difference = len(first.split("\n")) - len(rest.split("\n"))
+        logo = "\n".join(first.split("\n")[:difference]) + "\n"
+        for i, line in enumerate(rest.split("\n")):
+            logo += first.split("\n")[(difference + i - 1) % len(first.split("\n"))] + line + "\n"
+
+        try:
+            for i, line in enumerate(logo.split("\n")):
+                win.addstr(win.getmaxyx()[0] - len(logo.split("\n")) + i,
+                           (win.getmaxyx()[1] - len(logo.split("\n")[len(logo.split("\n")) // 2])) // 2,
+                           line,
+                           curses.color_pair(3))
+        except Exception:
+            win.clear()
+            rest = _renderFiglet(f"{albumName[1:3]} . . .", "basic")
+            difference = len(first.split("\n")) - len(rest.split("\n"))
+            logo = "\n".join(first.split("\n")[:difference]) + "\n"
+            for i, line in enumerate(rest.split("\n")):
+                logo += first.split("\n")[(difference + i - 1) % len(first.split("\n"))] + line + "\n"
+
+            for i, line in enumerate(logo.split("\n")):
+                win.addstr(10 + i,
+                           (win.getmaxyx()[1] - len(logo.split("\n")[len(logo.split("\n")) // 2])) // 2,
+                           line,
+                           curses.color_pair(3))
 
     @staticmethod
-    def _createPrompt(win, title, prompt):
+    def _createPrompt(win, title, prompt, characters=string.ascii_letters + string.digits):
         """
         Summary:
         -------
@@ -1137,6 +1509,9 @@ class Player:
         prompt : str
             The prompt
 
+        characters : str
+            The characters allowed in the value (None: any printable one)
+
         Returns:
         -------
         str
@@ -1150,7 +1525,7 @@ class Player:
         win.refresh()
         curses.echo()
         value = "".join([char for char in win.getstr(5, 2 + len(prompt)).decode() if
-                         char in string.ascii_letters + string.digits])
+                         (char.isprintable() if characters is None else char in characters)])
         curses.noecho()
         win.clear()
         win.refresh()
@@ -1171,9 +1546,13 @@ class Player:
             self._makeErrorPopup(self.popupWin, "Invalid name", "Create New Playlist")
             return
 
+        if f"playlist_{name}" in self.configuration.keys():
+            self._makeErrorPopup(self.popupWin, "Playlist already exists", "Create New Playlist")
+            return
+
         self.popupWin.clear()
         self.popupWin.refresh()
-        self.configuration[f"playlist_{name}"] = []
+        self.engine.createPlaylist(name)
         self._refreshEverything()
 
     def _addToPlaylist(self):
@@ -1205,18 +1584,84 @@ class Player:
             self._refreshEverything()
             return
 
-        if os.path.join(self.configuration["musicFolder"], self.selectedEntry.path) \
-                in self.configuration[f"playlist_{playlist}"]:
+        if self.selectedEntry.path in self.configuration[f"playlist_{playlist}"]:
             self._makeErrorPopup(self.popupWin, "Song already is in playlist", "Add to Playlist")
             self._refreshEverything()
             return
 
         self.popupWin.clear()
         self.popupWin.refresh()
-        self.configuration[f"playlist_{playlist}"].append(
-            os.path.join(self.configuration["musicFolder"], self.selectedEntry.path))
+        self.engine.addToPlaylist(playlist, [self.selectedEntry.path])
         self._refreshEverything()
 
+    def _importPlaylist(self):
+        """
+        Summary:
+        -------
+        prompts the user for a M3U or M3U8 file and
+        creates a playlist with the songs in it
+        """
+
+        self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
+                                      self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
+        file = os.path.expanduser(self._createPrompt(self.popupWin, "Import Playlist", "File: ", characters=None))
+
+        if os.path.splitext(file)[1].lower() not in M3U.extensions or not os.path.isfile(file):
+            self._makeErrorPopup(self.popupWin, "No M3U playlist found", "Import Playlist")
+            return
+
+        # Named after the file, as the config file only allows some characters
+        name = "".join([char for char in os.path.splitext(os.path.basename(file))[0] if
+                        char in string.ascii_letters + string.digits])
+        if not name:
+            self._makeErrorPopup(self.popupWin, "Invalid name", "Import Playlist")
+            return
+
+        if f"playlist_{name}" in self.configuration.keys():
+            self._makeErrorPopup(self.popupWin, "Playlist already exists", "Import Playlist")
+            return
+
+        try:
+            paths, missing = M3U.load(file)
+        except OSError:
+            self._makeErrorPopup(self.popupWin, "Couldn't read the playlist", "Import Playlist")
+            return
+
+        # Stored all at once, rather than a song at a time
+        self.engine.createPlaylist(name, paths)
+        self._makeInfoPopup(self.popupWin, f"{name}: {len(paths)} songs, {missing} missing", "Import Playlist")
+
+    def _exportPlaylist(self):
+        """
+        Summary:
+        -------
+        prompts the user for a file and writes the
+        selected album or playlist to it as M3U
+        """
+
+        self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
+                                      self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
+        album = self.albums.get(self.selectedAlbumName)
+        if album is None or isinstance(album, Group):
+            self._makeErrorPopup(self.popupWin, "Select an album or playlist", "Export Playlist")
+            return
+
+        file = os.path.expanduser(self._createPrompt(self.popupWin, "Export Playlist", "File: ", characters=None))
+        if os.path.splitext(file)[1].lower() not in M3U.extensions:
+            self._makeErrorPopup(self.popupWin, "The file must end in .m3u or .m3u8", "Export Playlist")
+            return
+
+        # Songs of playlists are stored as paths, songs the library doesn't know are written as they are
+        songs = [self.library.get(song) or song if isinstance(song, str) else song
+                 for song in album if song != ".."]
+        try:
+            count = M3U.write(file, songs)
+        except OSError:
+            self._makeErrorPopup(self.popupWin, "Couldn't write the playlist", "Export Playlist")
+            return
+
+        self._makeInfoPopup(self.popupWin, f"{count} songs written", "Export Playlist")
+
     def _removeFromPlaylist(self):
         """
         Summary:
@@ -1238,7 +1683,7 @@ class Player:
             self.popupWin.addstr(5, 2, "Remove Playlist? <Y/N>", curses.color_pair(2))
             curses.echo()
             if self.popupWin.getstr(6, 2, 1).decode().lower() == "y":
-                del self.configuration[f"playlist_{albumName}"]
+                self.engine.deletePlaylist(albumName)
                 del self.albums[albumName]
                 self.listWinStart = 0
             curses.noecho()
@@ -1262,15 +1707,13 @@ class Player:
             self._makeErrorPopup(self.popupWin, "Playlist doesn't exist", "Remove from Playlist")
             return
 
-        if os.path.join(self.configuration["musicFolder"], self.selectedEntry) \
-                not in self.configuration[f"playlist_{playlist}"]:
+        if self.selectedEntry.path not in self.configuration[f"playlist_{playlist}"]:
             self._makeErrorPopup(self.popupWin, "Song is not in playlist", "Remove from Playlist")
             return
 
         self.popupWin.clear()
         self.popupWin.refresh()
-        self.configuration[f"playlist_{playlist}"].remove(
-            os.path.join(self.configuration["musicFolder"], self.selectedEntry))
+        self.engine.removeFromPlaylist(playlist, [self.selectedEntry.path])
         self._refreshEverything()
 
     def _makeErrorPopup(self, win, message, title):
@@ -1330,30 +1773,206 @@ class Player:
     def _showQueue(self):
         """
         Summary:
-        shows a window with the current queue
+        -------
+        shows an editable view of the current queue.
+        Songs can be played, moved, removed or played next.
+        Only the visible rows are drawn, so long queues
+        don't slow it down.
         """
 
         self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 2, self.stdscr.getmaxyx()[1] // 2,
                                       self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
-        self.popupWin.border(']', '[', '=', '=', '+', '+', '+', '+')
-        self.popupWin.addstr(2, 2, "Song queue: <Enter>",
-                             curses.color_pair(1))
+        self.popupWin.keypad(True)
+        # Redraws periodically, so the view follows the songs being played
+        self.popupWin.timeout(500)
 
-        y = 0
-        x = 2
-        for element in self.queue.allSongs:
-            if not element == "..":
-                self.popupWin.addstr(y + 4, x, f"{os.path.basename(element)}")
-                y += 1
-                if y >= 10:
-                    y = 0
-                    x += 35
+        rows = self.popupWin.getmaxyx()[0] - 7
+        cursor = self.queue.index
+        top = 0
+        while True:
+            cursor = min(max(cursor, 0), max(len(self.queue) - 1, 0))
+            top = min(max(top, cursor - rows + 1), cursor)
+            self._drawQueue(self.popupWin, top, cursor, rows)
+            key = self.popupWin.getch()
+            action = self.keymap.action("queue", key)
+            self._pollEngine()
+
+            if action == "Queue" or key in (10, 27):
+                break
 
-        self.popupWin.refresh()
-        self.popupWin.getstr(0, 0, 0)
+            elif action == "SongSelectionDown":
+                cursor += 1
+
+            elif action == "SongSelectionUp":
+                cursor -= 1
+
+            elif curses.KEY_NPAGE == key:
+                cursor += rows
+
+            elif curses.KEY_PPAGE == key:
+                cursor -= rows
+
+            elif not len(self.queue):
+                continue
+
+            # Moves the selected song up
+            elif action == "QueueMoveUp" and cursor > 0:
+                self.engine.move(cursor, cursor - 1)
+                cursor -= 1
+
+            # Moves the selected song down
+            elif action == "QueueMoveDown" and cursor < len(self.queue) - 1:
+                self.engine.move(cursor, cursor + 1)
+                cursor += 1
+
+            # Plays the selected song after the current one
+            elif action == "QueuePlayNext" and cursor != self.queue.index:
+                self.engine.playNext(cursor)
+                cursor = self.queue.index + 1
+
+            # Removes the selected song, skipping it if it's playing
+            elif action == "QueueRemove":
+                self.engine.remove(cursor)
+
+            # Plays the selected song
+            elif action == "PlayPauseSong":
+                self._showPlaying(self.engine.jump(cursor))
+
+        self.popupWin.clear()
+        self._refreshEverything()
+
+    def _drawQueue(self, win, top, cursor, rows):
+        """
+        Summary:
+        -------
+        draws the visible part of the queue.
+
+        Parameters:
+        -------
+        win : curses.window
+            The window to draw the queue on
+
+        top : int
+            The index of the first visible song
+
+        cursor : int
+            The index of the selected song
+
+        rows : int
+            The number of visible songs
+        """
+
+        win.erase()
+        win.border(']', '[', '=', '=', '+', '+', '+', '+')
+        win.addstr(2, 2, f"Song queue: {len(self.queue)} songs <Enter>", curses.color_pair(1))
+
+        width = win.getmaxyx()[1] - 4
+        for i in range(top, min(top + rows, len(self.queue))):
+            song = self.queue[i]
+            line = ("]-> " if i == cursor else "    ") + f"{i + 1}. {song.title} - {song.artist}"
+            win.addstr(4 + i - top, 2, line[:width],
+                       curses.color_pair(1) if i == self.queue.index else curses.A_NORMAL)
+
+        keys = self.notParsedConfiguration
+        win.addstr(win.getmaxyx()[0] - 2, 2,
+                   f"Move: {keys['ks_QueueMoveUp']} {keys['ks_QueueMoveDown']}  "
+                   f"Play next: {keys['ks_QueuePlayNext']}  Remove: {keys['ks_QueueRemove']}  "
+                   f"Play: {keys['ks_PlayPauseSong']}"[:width])
+        win.touchwin()
+        win.refresh()
+
+    def _showDuplicates(self):
+        """
+        Summary:
+        -------
+        shows the songs that are the same recording, found by
+        fingerprinting the library. The songs not fingerprinted yet
+        are fingerprinted in the background, and the groups are
+        updated as they come in.
+        """
+
+        self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 2, self.stdscr.getmaxyx()[1] // 2,
+                                      self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
+        self.popupWin.keypad(True)
+        self.popupWin.timeout(500)
+
+        self.fingerprinter.start(self.library.allSongs)
+        rows = self.popupWin.getmaxyx()[0] - 7
+        lines = None
+        grouped = 0
+        top = 0
+        while True:
+            self.fingerprinter.collect()
+            # Grouping compares fingerprints, so it's only done again once they are all in
+            finished = self.fingerprinter.done == self.fingerprinter.total
+            if lines is None or finished and grouped != len(self.fingerprinter.index):
+                grouped = len(self.fingerprinter.index)
+                lines = []
+                for i, group in enumerate(self.fingerprinter.index.groups()):
+                    lines.append((f"{i + 1}. {len(group)} copies", curses.color_pair(1)))
+                    lines.extend((f"    {path}", curses.A_NORMAL) for path in group)
+
+            top = min(max(top, 0), max(len(lines) - rows, 0))
+            self._drawDuplicates(self.popupWin, lines, top, rows)
+            key = self.popupWin.getch()
+            action = self.keymap.action("duplicates", key)
+            self._pollEngine()
+
+            if action == "Duplicates" or key in (10, 27):
+                break
+
+            elif action == "SongSelectionDown":
+                top += 1
+
+            elif action == "SongSelectionUp":
+                top -= 1
+
+            elif curses.KEY_NPAGE == key:
+                top += rows
+
+            elif curses.KEY_PPAGE == key:
+                top -= rows
+
+        self.fingerprinter.save()
         self.popupWin.clear()
         self._refreshEverything()
 
+    def _drawDuplicates(self, win, lines, top, rows):
+        """
+        Summary:
+        -------
+        draws the visible part of the duplicate groups.
+
+        Parameters:
+        -------
+        win : curses.window
+            The window to draw the groups on
+
+        lines : List
+            The text and the attribute of every line
+
+        top : int
+            The index of the first visible line
+
+        rows : int
+            The number of visible lines
+        """
+
+        win.erase()
+        win.border(']', '[', '=', '=', '+', '+', '+', '+')
+        width = win.getmaxyx()[1] - 4
+        title = "Duplicate songs <Enter>"
+        if self.fingerprinter.done < self.fingerprinter.total:
+            title += f"  Fingerprinting: {self.fingerprinter.done} / {self.fingerprinter.total}"
+        win.addstr(2, 2, title[:width], curses.color_pair(1))
+
+        if not lines and self.fingerprinter.done == self.fingerprinter.total:
+            win.addstr(4, 2, "No duplicates found"[:width])
+        for i, (line, attribute) in enumerate(lines[top:top + rows]):
+            win.addstr(4 + i, 2, line[:width], attribute)
+        win.touchwin()
+        win.refresh()
+
     def _showHelpMenu(self):
         """
         Summary:
@@ -1382,6 +2001,11 @@ class Player:
         self._refreshEverything()
 
     def _changeMetadataFor(self, song):
+        # Only a song has tags, not the ".." entry or a path of a playlist. Outside of
+        # an album, the metadata window shows the selected album rather than this song
+        if not self.insideAlbum or not isinstance(song, Song):
+            return
+
         self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
                                       self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
         newTitle = self._createPrompt(self.popupWin, "Change song Title", f"Default \"{song.title}\": ")
@@ -1392,29 +2016,34 @@ class Player:
         song.artist = newArtist if len(newArtist.strip()) else song.artist
         song.album = newAlbum if len(newAlbum.strip()) else song.album
 
-        if self.progressBarThread is not None:
-            try:
-                self.progressBarThread.terminate()
-            except Exception as e:
-                pass
+        # Moves the song to its new place in every view
+        self.engine.updateSong(song)
+        self.albums = self._getAlbums()
+        if self.selectedAlbumName not in self.albums.keys():
+            self.browsePath = []
+            self.albums = self._getAlbums()
+            self.insideAlbum = False
+            self.listWinStart = 0
+            self.selectedAlbumName = list(self.albums.keys())[self.listWinStart]
+        self._refreshEverything()
 
-        if self.queueThread is not None:
-            try:
-                self.queueThread.terminate()
-            except Exception:
-                pass
-        mixer.music.stop()
-        mixer.music.unload()
 
-        if newAlbum != song.album and len(newAlbum.strip()):
-            music = self._getMusic()
-            if not music:
-                self.popupWin = curses.newwin(self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 2,
-                                              self.stdscr.getmaxyx()[0] // 4, self.stdscr.getmaxyx()[1] // 4)
-                self._makeErrorPopup(self.popupWin, "No songs in default music folder", "Music Folder")
-                sys.exit(-1)
-            self.albums = self._getAlbums(music)
-            self.selectedAlbumName = list(self.albums.keys())[list(self.albums.keys()).index(newAlbum)]
+def daemon():
+    """
+    Summary:
+    -------
+    runs the daemon, which plays the music
+    without any interface, for the players to attach to.
+    """
+
+    configFile = os.path.join(pathsep.join(os.path.abspath(__file__).split(pathsep)[:-1]), "settings.config")
+    if not os.path.isfile(configFile):
+        Parser.writeConfigFile(configFile, defaultConfiguration)
+
+    configuration, _, valid = loadConfiguration(configFile)
+    if not valid:
+        sys.exit("Invalid configuration file")
+    Daemon.serve(Engine.Engine(configuration, os.path.dirname(configFile)), configFile=configFile)
 
 
 def main(stdscr):
@@ -1426,6 +2055,10 @@ def main(stdscr):
 
 
 if __name__ == '__main__':
+    if "--daemon" in sys.argv[1:]:
+        daemon()
+        sys.exit(0)
+
     try:
         curses.wrapper(main)
     except KeyboardInterrupt:
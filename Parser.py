@@ -4,7 +4,15 @@ import ast
 import string
 import curses
 
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Container, Dict
+
+import Scanner
+
+
+# How many folders are listed at once when looking for missing songs.
+# Listing mostly waits for the disk (or the network), so it's more than the cores
+LISTING_WORKERS = 16
 
 
 def syntaxIsValid(file: str) -> bool:
@@ -213,30 +221,50 @@ def makeReadableByCode(data: Dict) -> Dict:
     return data
 
 
-def getSongsMissingFromPlaylist(playlists: Dict) -> Dict:
+def getSongsMissingFromPlaylist(playlists: Dict, known: Container = ()) -> Dict:
     """
     Summary:
     -------
     checks if the songs in the given playlists still exist.
+    Songs are grouped by folder and every folder is listed once,
+    several at a time, instead of checking songs one by one.
 
     Parameters:
     -------
     playlists : Dict
         The playlists to check
 
+    known : Container
+        The songs known to exist, like the library, which aren't checked again
+
     Returns:
     -------
     Dict
         The missing songs ordered by corresponding playlist
     """
 
-    missing = {}
-    for name, playlist in playlists.items():
+    # Songs in several playlists are only checked once
+    folders = {}
+    for playlist in playlists.values():
         for song in playlist:
-            if not os.path.isfile(song):
-                try:
-                    missing[name].append(song)
-                except Exception:
-                    missing[name] = [song]
+            if song not in known:
+                folder, name = os.path.split(song)
+                folders.setdefault(folder, set()).add(name)
+
+    if not folders:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(LISTING_WORKERS, len(folders))) as pool:
+        listings = dict(zip(folders, pool.map(Scanner.listFiles, folders)))
+    # The songs of a folder that can't be read may well be there, they're kept
+    gone = {os.path.join(folder, name) for folder, names in folders.items()
+            if listings[folder] is not None for name in names - listings[folder]}
+
+    missing = {}
+    if gone:
+        for name, playlist in playlists.items():
+            songs = [song for song in playlist if song in gone]
+            if songs:
+                missing[name] = songs
 
     return missing
@@ -0,0 +1,214 @@
+import os
+import fnmatch
+import threading
+
+from queue import Empty, SimpleQueue
+from typing import Callable, Iterable, Iterator, List, Optional, Set
+
+
+def _matches(path: str, globs: Iterable[str]) -> bool:
+    name = os.path.basename(path)
+    return any(fnmatch.fnmatch(path, glob) or fnmatch.fnmatch(name, glob) for glob in globs)
+
+
+def walk(folder: str, extensions: Iterable[str], include: Iterable[str] = (), exclude: Iterable[str] = (),
+         sniff: Optional[Callable] = None) -> Iterator[str]:
+    """
+    Summary:
+    -------
+    yields the path of every supported file inside a folder
+    and its subfolders.
+    The type of the entries comes from the directory listing itself,
+    so files are never stat'ed. Folders are only stat'ed once, to
+    avoid walking the same folder twice through symlinks.
+
+    Parameters:
+    -------
+    folder : str
+        The folder to walk
+
+    extensions : Iterable
+        The supported file extensions, in any case
+
+    include : Iterable
+        If given, only the files matching one of these globs are yielded
+
+    exclude : Iterable
+        The files and folders matching one of these globs are skipped
+
+    sniff : Callable
+        If given, only the files it accepts are yielded.
+        Used to reject non-audio files by their first bytes
+
+    Returns:
+    -------
+    Iterator
+        The paths of the files
+    """
+
+    extensions = {extension.lower() for extension in extensions}
+    include, exclude = tuple(include), tuple(exclude)
+    visited = set()
+    folders = [folder]
+
+    while folders:
+        current = folders.pop()
+        try:
+            stat = os.stat(current)
+        except OSError:
+            continue
+        # A symlink leading back to a folder already walked
+        if (stat.st_dev, stat.st_ino) in visited:
+            continue
+        visited.add((stat.st_dev, stat.st_ino))
+
+        try:
+            with os.scandir(current) as entries:
+                entries = sorted(entries, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subfolders = []
+        for entry in entries:
+            relative = os.path.relpath(entry.path, folder)
+            if exclude and _matches(relative, exclude):
+                continue
+
+            try:
+                isDir = entry.is_dir()
+            except OSError:
+                continue
+            if isDir:
+                subfolders.append(entry.path)
+            elif os.path.splitext(entry.name)[1][1:].lower() in extensions:
+                if include and not _matches(relative, include):
+                    continue
+                if sniff is not None and not sniff(entry.path):
+                    continue
+                yield entry.path
+
+        # Walked in alphabetical order, like the files
+        folders.extend(reversed(subfolders))
+
+
+def listFiles(folder: str) -> Optional[Set[str]]:
+    """
+    Summary:
+    -------
+    returns the names of the files inside a folder.
+    Like walk, it relies on the directory listing alone, so
+    checking many files of the same folder costs a single call.
+
+    Parameters:
+    -------
+    folder : str
+        The folder to list
+
+    Returns:
+    -------
+    Set
+        The names of the files, empty if the folder doesn't exist and
+        None if it can't be read (permissions, a drive gone offline...),
+        since nothing can be said about its files then
+    """
+
+    try:
+        with os.scandir(folder) as entries:
+            return {entry.name for entry in entries if not entry.is_dir()}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+    except OSError:
+        return None
+
+
+class Scanner:
+    def __init__(self, folders: List[str], extensions: List[str], load: Callable,
+                 include: Iterable[str] = (), exclude: Iterable[str] = (), sniff: Optional[Callable] = None):
+        """
+        Summary:
+        -------
+        looks for songs in the background.
+        Songs are handed over as soon as they are loaded,
+        so the library can be shown while the scan goes on.
+
+        Parameters:
+        -------
+        folders : List
+            The folders to scan
+
+        extensions : List
+            The supported file extensions
+
+        load : Callable
+            Loads a song from its path
+
+        include : Iterable
+            The globs of the files to scan. If empty, every file is scanned
+
+        exclude : Iterable
+            The globs of the files and folders to skip
+
+        sniff : Callable
+            Tells wether a file really is a song, by its first bytes
+        """
+
+        self.folders = folders
+        self.extensions = extensions
+        self.found = 0
+        self.done = False
+        # Every file walked, even the ones that couldn't be loaded
+        self.paths = set()
+        # The folders that couldn't be reached
+        self.missing = []
+        self.include = include
+        self.exclude = exclude
+        self.sniff = sniff
+        self.__load = load
+        self.__songs = SimpleQueue()
+        self.__stopped = False
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def __run(self):
+        for folder in self.folders:
+            if not os.path.isdir(folder):
+                self.missing.append(folder)
+                continue
+            try:
+                for path in walk(folder, self.extensions, self.include, self.exclude, self.sniff):
+                    if self.__stopped:
+                        return
+                    self.paths.add(path)
+                    try:
+                        self.__songs.put(self.__load(path))
+                    except Exception:
+                        # Unreadable files are left out of the library
+                        continue
+                    self.found += 1
+            except OSError:
+                continue
+        self.done = True
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped = True
+
+    def drain(self) -> List:
+        """
+        Summary:
+        -------
+        returns the songs found since the last call.
+
+        Returns:
+        -------
+        List
+            The new songs
+        """
+
+        songs = []
+        while True:
+            try:
+                songs.append(self.__songs.get_nowait())
+            except Empty:
+                return songs
@@ -0,0 +1,128 @@
+import os
+import struct
+
+from typing import Dict, Optional
+
+
+MAGIC = b"MCS\x02"
+HEADER = struct.Struct("<IdBII")
+LENGTH = struct.Struct("<I")
+
+SHUFFLED = 1
+PAUSED = 2
+INSIDE_ALBUM = 4
+
+
+def _packString(value: str) -> bytes:
+    data = value.encode("utf-8", "surrogateescape")
+    return LENGTH.pack(len(data)) + data
+
+
+def _unpackStrings(data: bytes, offset: int, count: int):
+    strings = []
+    for _ in range(count):
+        length, = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        if offset + length > len(data):
+            raise ValueError("Truncated string")
+        strings.append(data[offset:offset + length].decode("utf-8", "surrogateescape"))
+        offset += length
+    return strings, offset
+
+
+def save(file: str, state: Dict):
+    """
+    Summary:
+    -------
+    writes a snapshot of the player into a compact binary file.
+
+    Parameters:
+    -------
+    file : str
+        The file to write to
+
+    state : Dict
+        The state to save. It contains the queue ("paths" in the order
+        they were queued, the play "order" as positions in them, how
+        many were "drawn" by the shuffle, the "index" in the play order,
+        "shuffled"), the playback ("position", "paused") and the
+        browsing position ("playlist", "view", "browsePath",
+        "album", "insideAlbum")
+    """
+
+    flags = (SHUFFLED if state["shuffled"] else 0) \
+        | (PAUSED if state["paused"] else 0) \
+        | (INSIDE_ALBUM if state["insideAlbum"] else 0)
+
+    count = len(state["paths"])
+    data = [MAGIC, HEADER.pack(state["index"], state["position"], flags, count, state["drawn"])]
+    data.extend(_packString(path) for path in state["paths"])
+    # Unshuffled, the play order is the order the songs were queued in
+    if state["shuffled"]:
+        data.append(struct.pack(f"<{count}I", *state["order"]))
+    data.append(_packString(state["playlist"] or ""))
+    data.append(_packString(state["view"]))
+    data.append(_packString(state["album"] or ""))
+    data.append(LENGTH.pack(len(state["browsePath"])))
+    data.extend(_packString(name) for name in state["browsePath"])
+
+    # Written aside first so a crash never leaves a broken snapshot
+    with open(file + ".tmp", "wb") as f:
+        f.write(b"".join(data))
+    os.replace(file + ".tmp", file)
+
+
+def load(file: str) -> Optional[Dict]:
+    """
+    Summary:
+    -------
+    reads a snapshot written by save().
+
+    Parameters:
+    -------
+    file : str
+        The file to read
+
+    Returns:
+    -------
+    Dict
+        The saved state, or None if there is no valid snapshot
+    """
+
+    try:
+        with open(file, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if not data.startswith(MAGIC):
+        return None
+
+    try:
+        index, position, flags, count, drawn = HEADER.unpack_from(data, len(MAGIC))
+        paths, offset = _unpackStrings(data, len(MAGIC) + HEADER.size, count)
+        order = list(range(count))
+        if flags & SHUFFLED:
+            order = list(struct.unpack_from(f"<{count}I", data, offset))
+            offset += 4 * count
+            # Every song once, or the snapshot is broken
+            if sorted(order) != list(range(count)):
+                return None
+        (playlist, view, album), offset = _unpackStrings(data, offset, 3)
+        depth, = LENGTH.unpack_from(data, offset)
+        browsePath, offset = _unpackStrings(data, offset + LENGTH.size, depth)
+    except (struct.error, UnicodeDecodeError, ValueError):
+        return None
+
+    return {"paths": paths,
+            "order": order,
+            "drawn": min(drawn, count),
+            "index": index,
+            "position": position,
+            "shuffled": bool(flags & SHUFFLED),
+            "paused": bool(flags & PAUSED),
+            "insideAlbum": bool(flags & INSIDE_ALBUM),
+            "playlist": playlist or None,
+            "view": view,
+            "album": album or None,
+            "browsePath": browsePath}
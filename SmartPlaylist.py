@@ -0,0 +1,196 @@
+import bisect
+import itertools
+import time
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def _text(value) -> Optional[str]:
+    return str(value).lower() if value is not None else None
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    # Years can be full dates ("1999-05-01") and tracks can be "3/12"
+    try:
+        return float(str(value).split("/")[0][:4])
+    except (TypeError, ValueError):
+        return None
+
+
+def _duration(value: str) -> float:
+    # Lengths are written in seconds or as "minutes:seconds"
+    minutes, _, seconds = value.rpartition(":")
+    return float(minutes or 0) * 60 + float(seconds)
+
+
+def _daysAgo(when) -> Optional[float]:
+    return (time.time() - when) / 86400 if when else None
+
+
+# What every field reads from a song, and how the values written in the rules are read
+fields: Dict[str, Tuple[Callable, Callable]] = {
+    "title": (lambda song: _text(song.title), _text),
+    "artist": (lambda song: _text(song.artist), _text),
+    "album": (lambda song: _text(song.album), _text),
+    "year": (lambda song: _number(song.year), float),
+    "track": (lambda song: _number(song.track), float),
+    "length": (lambda song: song.length, _duration),
+    "added": (lambda song: _daysAgo(song.added), float),
+    "plays": (lambda song: song.plays, float),
+    "played": (lambda song: _daysAgo(song.lastPlayed), float),
+    "skipped": (lambda song: song.skipRate * 100, float),
+}
+operators: Dict[str, Callable] = {
+    "=": lambda value, target: value == target,
+    "!=": lambda value, target: value != target,
+    "contains": lambda value, target: target in value,
+    "<": lambda value, target: value < target,
+    "<=": lambda value, target: value <= target,
+    ">": lambda value, target: value > target,
+    ">=": lambda value, target: value >= target,
+}
+# Days ago change as time goes by, the songs are sorted by the time itself (the latest first)
+orders: Dict[str, Callable] = {
+    "added": lambda song: -song.added if song.added else None,
+    "played": lambda song: -song.lastPlayed if song.lastPlayed else None,
+}
+textFields = {"title", "artist", "album"}
+defaultOrder = ["artist", "album", "track", "title"]
+
+
+def compileRules(rules: List[str]) -> Tuple[List[Callable], List[str], bool, Optional[int]]:
+    """
+    Summary:
+    -------
+    reads the rules of a smart playlist, like "artist = Queen",
+    "album contains live", "length < 5:00", "added < 30" (days ago),
+    "plays > 10", "played < 7" (days ago), "skipped < 50" (percent),
+    "sort added", "sort -plays" (reversed) or "limit 50".
+
+    Parameters:
+    -------
+    rules : List
+        The rules, as written in the config file
+
+    Returns:
+    -------
+    Tuple
+        The conditions every song must meet, the fields the songs
+        are sorted by, wether the order is reversed and the most
+        songs the playlist shows (None: no limit)
+
+    Raises:
+    -------
+    ValueError
+        If a rule can't be understood
+    """
+
+    conditions = []
+    order = defaultOrder
+    descending = False
+    limit = None
+    for rule in rules:
+        words = str(rule).split(maxsplit=2)
+        if len(words) == 2 and words[0] == "sort":
+            descending = words[1].startswith("-")
+            order = [words[1].lstrip("-")] + [field for field in defaultOrder if field != words[1].lstrip("-")]
+            if order[0] not in fields:
+                raise ValueError(f"Unknown field {order[0]}")
+
+        elif len(words) == 2 and words[0] == "limit":
+            limit = int(words[1])
+
+        elif len(words) == 3 and words[0] in fields and words[1] in operators:
+            if words[1] == "contains" and words[0] not in textFields:
+                raise ValueError(f"Invalid rule {rule}")
+            read, parse = fields[words[0]]
+            conditions.append(_condition(read, operators[words[1]], parse(words[2].strip("\"'"))))
+
+        else:
+            raise ValueError(f"Invalid rule {rule}")
+
+    return conditions, order, descending, limit
+
+
+def _condition(read, operator, target) -> Callable:
+    def condition(song):
+        value = read(song)
+        return value is not None and operator(value, target)
+    return condition
+
+
+def rulesAreValid(rules) -> bool:
+    if not isinstance(rules, list):
+        return False
+    try:
+        compileRules(rules)
+    except ValueError:
+        return False
+    return True
+
+
+def fromConfiguration(configuration: Dict) -> Dict[str, List[str]]:
+    # Smart playlists are written as smart_<name> :=: [rules]
+    return {key[6:].strip(): value for key, value in configuration.items() if key.startswith("smart_")}
+
+
+class SmartPlaylist:
+    def __init__(self, name: str, rules: List[str]):
+        """
+        Summary:
+        -------
+        a playlist made of the songs that meet some rules.
+        Songs are checked once, when they're added to the library,
+        and kept sorted with a binary search, so opening the playlist
+        never filters the whole library. Rules about when songs were
+        added are measured from when the songs are checked.
+
+        Parameters:
+        -------
+        name : str
+            The name of the playlist
+
+        rules : List
+            The rules, as written in the config file
+        """
+
+        self.name = name
+        self.rules = rules
+        self.__conditions, self.__order, self.descending, self.limit = compileRules(rules)
+        self.__members: List[Tuple] = []
+        self.__entries: Dict[str, Tuple] = {}
+        self.changed = True
+
+    def __len__(self):
+        return len(self.__members) if self.limit is None else min(len(self.__members), self.limit)
+
+    def __key(self, song) -> Tuple:
+        # Songs without a value are sorted last, whatever the direction
+        key = []
+        for field in self.__order:
+            value = orders[field](song) if field in orders else fields[field][0](song)
+            key.append((value is None) != self.descending)
+            key.append(value if value is not None else "" if field in textFields else 0)
+        return tuple(key)
+
+    def insert(self, song):
+        if not all(condition(song) for condition in self.__conditions):
+            return
+        key = (self.__key(song), song.path)
+        bisect.insort(self.__members, key)
+        self.__entries[song.path] = key
+        self.changed = True
+
+    def delete(self, path):
+        key = self.__entries.pop(path, None)
+        if key is None:
+            return
+        del self.__members[bisect.bisect_left(self.__members, key)]
+        self.changed = True
+
+    @property
+    def paths(self) -> List[str]:
+        members = reversed(self.__members) if self.descending else iter(self.__members)
+        return [path for _, path in itertools.islice(members, self.limit)]
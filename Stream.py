@@ -0,0 +1,571 @@
+import math
+import threading
+import time
+import importlib.util
+
+from typing import List, Optional
+
+import Decoder
+
+
+# The frames of every buffer handed to the mixer (about 93 ms at 44100 Hz)
+CHUNK = 4096
+# How often the mixer is checked for a free buffer, in seconds
+POLL = 0.01
+# The length of the equalizer's filter, in samples
+TAPS = 1025
+
+
+def available() -> bool:
+    # numpy is optional, it's only imported once the stream is used
+    return importlib.util.find_spec("numpy") is not None and Decoder.available()
+
+
+def equalizerIsValid(bands) -> bool:
+    # Written as [[frequency, gain], ...], in Hz and dB
+    return isinstance(bands, list) and all(
+        isinstance(band, (list, tuple)) and len(band) == 2 and
+        all(isinstance(value, (int, float)) for value in band) and band[0] > 0
+        for band in bands)
+
+
+class Gain:
+    def __init__(self, volume: float = 1.0):
+        # Multiplies the audio by a factor
+        self.volume = volume
+
+    def process(self, block):
+        if self.volume != 1.0:
+            block *= self.volume
+
+    def reset(self):
+        pass
+
+
+class Equalizer:
+    def __init__(self, bands: List, rate: int, frames: int, channels: int):
+        """
+        Summary:
+        -------
+        boosts or cuts frequencies. The gains between the given
+        frequencies are interpolated, and applied with a filter
+        convolved in the frequency domain (overlap-add), a whole
+        block of samples at once.
+
+        Parameters:
+        -------
+        bands : List
+            The gains, as [frequency, gain] pairs in Hz and dB
+
+        rate : int
+            The sample rate of the audio
+
+        frames : int
+            The most frames of the blocks processed
+
+        channels : int
+            The number of channels of the audio
+        """
+
+        import numpy as np
+
+        self.size = 1 << math.ceil(math.log2(frames + TAPS - 1))
+        bands = sorted(bands)
+        frequencies = np.fft.rfftfreq(self.size, 1 / rate)
+        # Interpolated on a logarithmic scale, like the ear hears them
+        decibels = np.interp(np.log2(np.maximum(frequencies, 1.0)),
+                             np.log2([frequency for frequency, _ in bands]), [gain for _, gain in bands])
+        # The ideal response, turned into a filter of TAPS samples
+        impulse = np.roll(np.fft.irfft(10 ** (decibels / 20), self.size), TAPS // 2)[:TAPS] * np.hanning(TAPS)
+        self.__response = np.fft.rfft(impulse, self.size)[:, None]
+        # What the filter spreads past the end of a block, added to the next one
+        self.__tail = np.zeros((TAPS - 1, channels), dtype=np.float32)
+
+    def process(self, block):
+        import numpy as np
+
+        spectrum = np.fft.rfft(block, self.size, axis=0)
+        spectrum *= self.__response
+        filtered = np.fft.irfft(spectrum, self.size, axis=0)
+        filtered[:TAPS - 1] += self.__tail
+        block[:] = filtered[:len(block)]
+        self.__tail[:] = filtered[len(block):len(block) + TAPS - 1]
+
+    def reset(self):
+        self.__tail.fill(0)
+
+
+class Crossfade:
+    def __init__(self, seconds: float, rate: int, frames: int, channels: int):
+        """
+        Summary:
+        -------
+        the curves two songs are mixed with while one fades into the
+        other. They're equal power, so the volume doesn't dip halfway.
+        They're as big as the blocks, broadcasting them would make
+        numpy allocate a buffer on every block.
+
+        Parameters:
+        -------
+        seconds : float
+            The length of the crossfade
+
+        rate : int
+            The sample rate of the audio
+
+        frames : int
+            The most frames of the blocks mixed
+
+        channels : int
+            The number of channels of the audio
+        """
+
+        import numpy as np
+
+        self.frames = int(seconds * rate)
+        self.__steps = np.arange(frames, dtype=np.float32)
+        self.__angles = np.zeros(frames, dtype=np.float32)
+        self.__curve = np.zeros(frames, dtype=np.float32)
+        self.fadeIn = np.zeros((frames, channels), dtype=np.float32)
+        self.fadeOut = np.zeros((frames, channels), dtype=np.float32)
+
+    def ramps(self, done: int):
+        """
+        Summary:
+        -------
+        computes the curves of the next block, in place.
+
+        Parameters:
+        -------
+        done : int
+            The frames of the crossfade already mixed
+        """
+
+        import numpy as np
+
+        # From 0 to pi / 2 over the whole crossfade
+        angles = self.__angles
+        np.add(self.__steps, done, out=angles)
+        np.multiply(angles, math.pi / 2 / max(self.frames, 1), out=angles)
+        np.clip(angles, 0, math.pi / 2, out=angles)
+        np.cos(angles, out=self.__curve)
+        np.copyto(self.fadeOut, self.__curve[:, None])
+        np.sin(angles, out=self.__curve)
+        np.copyto(self.fadeIn, self.__curve[:, None])
+
+
+class Source:
+    def __init__(self, path: str, rate: int, channels: int, frames: int, start: float = 0.0,
+                 length: Optional[float] = None, gain: float = 1.0):
+        """
+        Summary:
+        -------
+        a song being decoded. The samples are read straight
+        into a buffer allocated once for the whole song.
+
+        Parameters:
+        -------
+        path : str
+            The song
+
+        rate : int
+            The sample rate to decode to
+
+        channels : int
+            The number of channels to decode to
+
+        frames : int
+            The most frames read at once
+
+        start : float
+            Where to start from, in seconds
+
+        length : float
+            The length of the song, to know when to fade into the next one
+
+        gain : float
+            What the song is multiplied by, relative to the volume
+        """
+
+        import numpy as np
+
+        self.path = path
+        self.gain = gain
+        self.channels = channels
+        # The frames decoded before the song should start fading out, if known
+        self.fadeAt = int((length - start) * rate) if isinstance(length, (int, float)) else None
+        self.read = 0
+        self.ended = False
+        # Where the song starts and ends in the mixed audio, set once mixed
+        self.outputStart = None
+        self.outputEnd = None
+        self.__raw = np.zeros((frames, channels), dtype=np.int16)
+        self.__bytes = memoryview(self.__raw).cast("B")
+        self.__process = Decoder.spawn(path, rate, channels, start)
+
+    def fill(self, out) -> int:
+        """
+        Summary:
+        -------
+        decodes the next frames, as floats between -1 and 1.
+
+        Parameters:
+        -------
+        out : numpy.ndarray
+            Where to put them, as many as it fits
+
+        Returns:
+        -------
+        int
+            The number of frames put, less than asked once the song is over
+        """
+
+        import numpy as np
+
+        if self.ended:
+            return 0
+        size = len(out) * self.channels * 2
+        filled = 0
+        # A pipe gives what it has, not always a whole block
+        while filled < size:
+            count = self.__process.stdout.readinto(self.__bytes[filled:size])
+            if not count:
+                self.close()
+                break
+            filled += count
+
+        frames = filled // (self.channels * 2)
+        # Converted by copyto, multiplying with a cast would allocate a buffer
+        np.copyto(out[:frames], self.__raw[:frames], casting="unsafe")
+        out[:frames] *= self.gain / 32768
+        self.read += frames
+        return frames
+
+    def close(self):
+        self.ended = True
+        Decoder.close(self.__process)
+
+
+class Pipeline:
+    def __init__(self, rate: int, channels: int, crossfade: float = 0, equalizer: List = (), frames: int = CHUNK):
+        """
+        Summary:
+        -------
+        turns songs into blocks of audio ready to be played:
+        decodes them, fades each one into the next and runs the
+        result through a chain of effects (equalizer, volume...).
+        Every buffer is allocated up front, so producing a block
+        allocates nothing, unless the equalizer is on (numpy's FFT
+        allocates its results).
+
+        Parameters:
+        -------
+        rate : int
+            The sample rate of the audio
+
+        channels : int
+            The number of channels of the audio
+
+        crossfade : float
+            How long a song fades into the next one, in seconds (0: gapless)
+
+        equalizer : List
+            The gains of the equalizer, as [frequency, gain] pairs in Hz and dB
+
+        frames : int
+            The frames of every block
+        """
+
+        import numpy as np
+
+        self.rate = rate
+        self.channels = channels
+        self.frames = frames
+        self.volume = Gain()
+        # Applied in order to the mixed audio. More effects can be added, they process a block in place
+        self.chain = ([Equalizer(equalizer, rate, frames, channels)] if equalizer else []) + [self.volume]
+        self.crossfade = Crossfade(crossfade, rate, frames, channels)
+        self.current: Optional[Source] = None
+        self.next: Optional[Source] = None
+        # The frames of audio produced so far
+        self.produced = 0
+        self.__mix = np.zeros((frames, channels), dtype=np.float32)
+        self.__block = np.zeros((frames, channels), dtype=np.float32)
+
+    def start(self, path: str, start: float = 0.0, length: Optional[float] = None) -> Source:
+        # Cuts whatever was playing. The song queued after it stays, unless it was fading in already
+        following = self.next if self.next is not None and self.next.outputStart is None else None
+        if following is not None:
+            self.next = None
+        self.close()
+        self.next = following
+        self.current = Source(path, self.rate, self.channels, self.frames, start, length)
+        self.current.outputStart = self.produced
+        return self.current
+
+    def queue(self, path: str, length: Optional[float] = None, gain: float = 1.0) -> Optional[Source]:
+        # Decoding starts right away, so the song is ready the moment it's needed
+        if self.next is not None and self.next.outputStart is not None:
+            # Already fading in
+            return None
+        self.unqueue()
+        self.next = Source(path, self.rate, self.channels, self.frames, length=length, gain=gain)
+        return self.next
+
+    def unqueue(self):
+        # Drops the song queued next, unless it's fading in already
+        if self.next is not None and self.next.outputStart is None:
+            self.next.close()
+            self.next = None
+
+    def render(self, target) -> int:
+        """
+        Summary:
+        -------
+        produces the next block of audio.
+
+        Parameters:
+        -------
+        target : numpy.ndarray
+            Where to write it, as 16 bit samples
+
+        Returns:
+        -------
+        int
+            The frames of audio in the block, 0 once there's nothing left to play
+        """
+
+        import numpy as np
+
+        current = self.current
+        if current is None or current.ended and (self.next is None or self.next.outputStart is None):
+            return 0
+
+        mix, block = self.__mix, self.__block
+        mix.fill(0)
+        frames = current.fill(mix)
+        if current.ended:
+            current.outputEnd = self.produced + frames
+
+        following = self.next
+        # The next song starts fading in once the current one is close enough to its end
+        fading = self.crossfade.frames and current.fadeAt is not None and \
+            current.read >= current.fadeAt - self.crossfade.frames
+        if following is not None and following.outputStart is None and (current.ended or fading):
+            following.outputStart = self.produced + (frames if current.ended else 0)
+
+        if following is not None and following.outputStart is not None:
+            if current.ended and following.read == 0:
+                # Nothing to fade out: played right after, without a gap
+                mixed = following.fill(mix[frames:])
+                frames += mixed
+            else:
+                self.crossfade.ramps(following.read)
+                mixed = following.fill(block)
+                mix *= self.crossfade.fadeOut
+                block[:mixed] *= self.crossfade.fadeIn[:mixed]
+                mix[:mixed] += block[:mixed]
+                frames = max(frames, mixed)
+            if current.ended:
+                self.current, self.next = following, None
+
+        for effect in self.chain:
+            effect.process(mix)
+
+        np.clip(mix, -1, 1, out=mix)
+        mix *= 32767
+        np.copyto(target, mix, casting="unsafe")
+        self.produced += len(mix)
+        return frames
+
+    def close(self):
+        for source in (self.current, self.next):
+            if source is not None and not source.ended:
+                source.close()
+        self.current = self.next = None
+        for effect in self.chain:
+            effect.reset()
+
+
+class Stream:
+    def __init__(self, mixer, crossfade: float = 0, equalizer: List = ()):
+        """
+        Summary:
+        -------
+        plays songs decoded in pieces, instead of handing them to
+        pygame's own player: two buffers, allocated once, take turns
+        on a mixer channel, one playing while the other is filled.
+        It works like mixer.music (load, play, pause, get_pos...),
+        so the engine can use either.
+
+        Parameters:
+        -------
+        mixer : pygame.mixer
+            The opened mixer
+
+        crossfade : float
+            How long a song fades into the next one, in seconds (0: gapless)
+
+        equalizer : List
+            The gains of the equalizer, as [frequency, gain] pairs in Hz and dB
+        """
+
+        from pygame import sndarray
+
+        rate, _, channels = mixer.get_init()
+        self.pipeline = Pipeline(rate, channels, crossfade, equalizer)
+        mixer.set_reserved(1)
+        self.__channel = mixer.Channel(0)
+        self.__sounds = [mixer.Sound(buffer=bytes(CHUNK * channels * 2)) for _ in range(2)]
+        # Written in place: the arrays are the sounds' own samples
+        self.__buffers = [sndarray.samples(sound).reshape(CHUNK, channels) for sound in self.__sounds]
+        self.__turn = 0
+        self.__lock = threading.RLock()
+        self.__thread = None
+
+        # The song the engine loaded, which may be done while the next one fades in
+        self.__loaded: Optional[Source] = None
+        self.__song = None
+        self.__adopted = False
+        # Frames handed to the channel, and when the buffer playing started
+        self.__fed = 0
+        self.__playingSince = None
+        self.__queued = False
+        self.__pausedAt = None
+
+    # Like mixer.music
+
+    def load(self, path: str, namehint: str = "", length: Optional[float] = None):
+        with self.__lock:
+            # The song already fading in keeps playing
+            following = self.pipeline.next if self.pipeline.next is not None else self.pipeline.current
+            if following is not None and following is not self.__loaded and following.path == path and \
+                    following.outputStart is not None:
+                self.__loaded, self.__adopted = following, True
+            else:
+                self.stop()
+            self.__song = (path, length)
+
+    def play(self, loops: int = 0, start: float = 0.0):
+        with self.__lock:
+            if self.__adopted:
+                self.__adopted = False
+                # Played from its start, as it's already heard
+                if not start:
+                    return
+            if self.__song is None:
+                raise RuntimeError("No song loaded")
+            self.__reset()
+            self.__pausedAt = None
+            self.__channel.unpause()
+            self.__loaded = self.pipeline.start(self.__song[0], start, self.__song[1])
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__feed, name="stream", daemon=True)
+                self.__thread.start()
+
+    def queue(self, path: str, namehint: str = "", loops: int = 0, length: Optional[float] = None,
+              gain: float = 1.0):
+        with self.__lock:
+            self.pipeline.queue(path, length, gain)
+
+    def unqueue(self):
+        with self.__lock:
+            self.pipeline.unqueue()
+
+    def stop(self):
+        with self.__lock:
+            self.__reset()
+            self.pipeline.close()
+            self.__loaded = None
+            self.__adopted = False
+
+    def unload(self):
+        with self.__lock:
+            self.stop()
+            self.__song = None
+
+    def pause(self):
+        with self.__lock:
+            if self.__pausedAt is None:
+                self.__pausedAt = time.monotonic()
+                self.__channel.pause()
+
+    def unpause(self):
+        with self.__lock:
+            if self.__pausedAt is not None:
+                if self.__playingSince is not None:
+                    self.__playingSince += time.monotonic() - self.__pausedAt
+                self.__pausedAt = None
+                self.__channel.unpause()
+
+    def set_volume(self, volume: float):
+        with self.__lock:
+            self.pipeline.volume.volume = volume
+            # The volume includes the gain of the loaded song now
+            if self.__loaded is not None:
+                self.__loaded.gain = 1.0
+
+    def get_busy(self) -> bool:
+        with self.__lock:
+            loaded = self.__loaded
+            if loaded is None or self.__pausedAt is not None:
+                return False
+            return not loaded.ended or self.__heard() < loaded.outputEnd
+
+    def get_pos(self) -> int:
+        # In milliseconds since the song was played, like mixer.music
+        with self.__lock:
+            loaded = self.__loaded
+            if loaded is None:
+                return -1
+            heard = self.__heard()
+            if loaded.outputEnd is not None:
+                heard = min(heard, loaded.outputEnd)
+            return max(heard - loaded.outputStart, 0) * 1000 // self.pipeline.rate
+
+    # Feeding the channel
+
+    def __reset(self):
+        self.__channel.stop()
+        self.__fed = self.pipeline.produced
+        self.__playingSince = None
+        self.__queued = False
+
+    def __heard(self) -> int:
+        # The frames of audio that went through the speakers
+        if self.__playingSince is None:
+            return self.__fed
+        now = self.__pausedAt or time.monotonic()
+        playing = max(CHUNK - int((now - self.__playingSince) * self.pipeline.rate), 0)
+        return self.__fed - (CHUNK if self.__queued else 0) - playing
+
+    def __feed(self):
+        while True:
+            time.sleep(POLL)
+            with self.__lock:
+                if self.__pausedAt is not None or self.pipeline.current is None:
+                    continue
+                busy = self.__channel.get_busy()
+                if busy and self.__channel.get_queue() is not None:
+                    continue
+
+                if busy and self.__queued:
+                    # The waiting buffer started playing, the other one is free
+                    self.__playingSince = time.monotonic()
+                    self.__queued = False
+                elif not busy:
+                    # Nothing was waiting (or the buffers ran out)
+                    self.__playingSince = None
+                    self.__queued = False
+
+                buffer = self.__buffers[self.__turn]
+                if not self.pipeline.render(buffer):
+                    continue
+                if busy:
+                    self.__channel.queue(self.__sounds[self.__turn])
+                    self.__queued = True
+                else:
+                    self.__channel.play(self.__sounds[self.__turn])
+                    self.__playingSince = time.monotonic()
+                self.__fed = self.pipeline.produced
+                self.__turn ^= 1
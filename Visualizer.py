@@ -0,0 +1,320 @@
+import math
+import threading
+import time
+import importlib.util
+
+from typing import Optional
+
+import Decoder
+
+
+# The song is decoded again at a lower rate, the display barely shows the highest frequencies
+RATE = 22050
+# The samples every frame is computed from (about 93 ms)
+BLOCK = 2048
+# How far the decoding may run ahead of the playback, in samples
+CAPACITY = RATE * 4
+# The size of the pieces read from the decoder, in bytes (stereo 16 bit samples)
+CHUNK = 4096 * 4
+# The levels shown, in dB below full scale
+FLOOR = -60.0
+# How fast the levels fall once the sound gets quieter, in share of the height per second
+FALL = 1.5
+# The lowest frequency shown, in Hz
+LOWEST = 40.0
+modes = ["spectrum", "vu", "off"]
+
+
+def available() -> bool:
+    # numpy is optional, it's only imported once the visualizer is used
+    return importlib.util.find_spec("numpy") is not None and Decoder.available()
+
+
+class Visualizer:
+    def __init__(self, mode: str = "spectrum", fps: int = 20, budget: int = 5):
+        """
+        Summary:
+        -------
+        shows the spectrum or the volume of the playing song.
+        The song is decoded a second time, in the background and just
+        ahead of the playback, into a buffer allocated once. Every frame
+        takes the samples at the playback position and measures them
+        with a single FFT.
+        Frames are drawn at most "fps" times per second and are skipped
+        when drawing them takes more than "budget" percent of one core,
+        so the visualizer never slows down the input or the audio.
+
+        Parameters:
+        -------
+        mode : str
+            "spectrum" (the energy of frequency bands) or "vu" (the volume of each channel)
+
+        fps : int
+            The most frames drawn per second
+
+        budget : int
+            The share of one core the frames may take, in percent
+        """
+
+        import numpy as np
+
+        self.mode = mode
+        self.interval = 1 / max(fps, 1)
+        # The time a frame may take, in seconds
+        self.budget = self.interval * min(max(budget, 1), 100) / 100
+
+        # Exposed, to see how the visualizer keeps up
+        self.frames = 0
+        self.dropped = 0
+        # The time to compute and draw a frame, in milliseconds (average and last)
+        self.frameTime = 0.0
+        self.lastFrameTime = 0.0
+
+        # Allocated once: the decoded samples, a block and its window
+        self.__buffer = np.zeros((CAPACITY, 2), dtype=np.int16)
+        self.__block = np.zeros(BLOCK, dtype=np.float32)
+        window = np.hanning(BLOCK)
+        # A full scale sine wave, once windowed, has this magnitude
+        self.__scale = window.sum() / 2
+        # Also turns the sum of the two channels into their mean, between -1 and 1
+        self.__window = (window / 65536).astype(np.float32)
+        self.__edges = None
+        self.levels = np.zeros(0, dtype=np.float32)
+
+        self.__condition = threading.Condition()
+        # Bumped to stop the decoding of the previous song (or position)
+        self.__generation = 0
+        self.__path = None
+        # The position the decoding started from, and the samples decoded since
+        self.__start = 0.0
+        self.__written = 0
+        self.__read = 0
+        self.__nextFrame = 0.0
+        self.__drawnAt = None
+
+    # Decoding
+
+    def follow(self, path: Optional[str], position: float):
+        """
+        Summary:
+        -------
+        keeps the decoding in step with the playback. It starts
+        over when the song changes or the playback jumps.
+
+        Parameters:
+        -------
+        path : str
+            The playing song, None when nothing is playing
+
+        position : float
+            The playback position, in seconds
+        """
+
+        with self.__condition:
+            if path is None and self.__path is None:
+                return
+            read = int((position - self.__start) * RATE)
+            if path == self.__path and path is not None and \
+                    self.__written - CAPACITY + BLOCK <= read <= self.__written + RATE:
+                self.__read = read
+                # The decoding waits for the playback to catch up
+                self.__condition.notify()
+                return
+
+            self.__generation += 1
+            self.__condition.notify()
+            self.__path = path
+            self.__start = max(position, 0.0)
+            self.__written = self.__read = 0
+            self.levels[:] = 0
+            if path is None:
+                return
+            threading.Thread(target=self.__decode, args=(self.__generation, path, self.__start),
+                             name="visualizer", daemon=True).start()
+
+    def __decode(self, generation, path, start):
+        import numpy as np
+
+        leftover = b""
+        chunks = Decoder.pcm(path, rate=RATE, channels=2, chunk=CHUNK, start=start)
+        try:
+            for data in chunks:
+                data = leftover + data
+                usable = len(data) // 4 * 4
+                leftover = data[usable:]
+                samples = np.frombuffer(data[:usable], dtype="<i2").reshape(-1, 2)
+
+                with self.__condition:
+                    # Never overwrites the samples the next frames need
+                    while generation == self.__generation and \
+                            self.__written + len(samples) - (self.__read - BLOCK) > CAPACITY:
+                        self.__condition.wait(0.25)
+                    if generation != self.__generation:
+                        return
+
+                    # Written around the end of the buffer when needed, without copies
+                    at = self.__written % CAPACITY
+                    first = min(len(samples), CAPACITY - at)
+                    self.__buffer[at:at + first] = samples[:first]
+                    self.__buffer[:len(samples) - first] = samples[first:]
+                    self.__written += len(samples)
+        except RuntimeError:
+            # Songs that can't be decoded show nothing
+            pass
+        finally:
+            chunks.close()
+
+    # Frames
+
+    def wait(self, now: float) -> float:
+        # The time until the next frame, in seconds
+        return max(self.__nextFrame - now, 0.0)
+
+    def frame(self, win, top: int, left: int, height: int, width: int) -> bool:
+        """
+        Summary:
+        -------
+        measures the samples at the playback position and draws
+        them, if a frame is due.
+
+        Parameters:
+        -------
+        win : curses.window
+            The window to draw in
+
+        top, left : int
+            Where to draw
+
+        height, width : int
+            The space to draw in
+
+        Returns:
+        -------
+        bool
+            Wether a frame was drawn
+        """
+
+        now = time.monotonic()
+        if now < self.__nextFrame or height < 1 or width < 4:
+            return False
+        # Frames that should have been drawn while the player was busy
+        if self.__drawnAt is not None and now - self.__nextFrame > self.interval:
+            self.dropped += int((now - self.__nextFrame) / self.interval)
+
+        started = time.perf_counter()
+        self.__measure(now, width)
+        self.draw(win, top, left, height, width)
+        took = time.perf_counter() - started
+
+        self.frames += 1
+        self.lastFrameTime = took * 1000
+        self.frameTime += (self.lastFrameTime - self.frameTime) / min(self.frames, 20)
+        self.__drawnAt = now
+        self.__nextFrame = now + self.interval
+        # Too slow: the next frames are skipped so the average stays within the budget
+        if took > self.budget:
+            skipped = math.ceil(took / self.budget) - 1
+            self.dropped += skipped
+            self.__nextFrame += skipped * self.interval
+        return True
+
+    def __measure(self, now, width):
+        import numpy as np
+
+        with self.__condition:
+            end = self.__read
+            # Not decoded yet: shown as silence
+            if end > self.__written or end < BLOCK:
+                end = None
+            else:
+                at = (end - BLOCK) % CAPACITY
+                first = min(BLOCK, CAPACITY - at)
+                # Both channels mixed, straight into the block
+                np.add(self.__buffer[at:at + first, 0], self.__buffer[at:at + first, 1],
+                       out=self.__block[:first], dtype=np.float32)
+                np.add(self.__buffer[:BLOCK - first, 0], self.__buffer[:BLOCK - first, 1],
+                       out=self.__block[first:], dtype=np.float32)
+                if self.mode == "vu":
+                    left = self.__buffer[at:at + first, 0], self.__buffer[:BLOCK - first, 0]
+                    right = self.__buffer[at:at + first, 1], self.__buffer[:BLOCK - first, 1]
+                    power = [sum(float(np.dot(part, part.astype(np.float32))) for part in channel)
+                             for channel in (left, right)]
+
+        if end is None:
+            levels = np.zeros(2 if self.mode == "vu" else self.__bands(width), dtype=np.float32)
+        elif self.mode == "vu":
+            rms = np.sqrt(np.array(power, dtype=np.float32) / BLOCK) / 32768
+            levels = self.__normalize(rms)
+        else:
+            self.__block *= self.__window
+            magnitudes = np.abs(np.fft.rfft(self.__block))
+            levels = self.__normalize(np.maximum.reduceat(magnitudes, self.__edgesFor(width)) / self.__scale)
+
+        # Rises at once, falls slowly
+        elapsed = now - self.__drawnAt if self.__drawnAt is not None else self.interval
+        if len(self.levels) != len(levels):
+            self.levels = levels
+        else:
+            self.levels = np.maximum(levels, self.levels - FALL * elapsed)
+
+    @staticmethod
+    def __normalize(values):
+        import numpy as np
+
+        decibels = 20 * np.log10(np.maximum(values, 1e-9))
+        return np.clip((decibels - FLOOR) / -FLOOR, 0, 1).astype(np.float32)
+
+    @staticmethod
+    def __bands(width):
+        # Two columns per band, the second one left empty
+        return max(width // 2, 1)
+
+    def __edgesFor(self, width):
+        import numpy as np
+
+        bands = self.__bands(width)
+        if self.__edges is None or len(self.__edges) != bands:
+            # Spaced logarithmically, like the ear hears them
+            frequencies = np.geomspace(LOWEST, RATE / 2, bands + 1)[:-1]
+            edges = np.round(frequencies / RATE * BLOCK).astype(np.intp)
+            # The lowest bands are narrower than the bins, they're given one bin each
+            self.__edges = np.maximum(edges, np.arange(1, bands + 1))
+            self.__edges = np.minimum(self.__edges, BLOCK // 2)
+        return self.__edges
+
+    def draw(self, win, top: int, left: int, height: int, width: int):
+        """
+        Summary:
+        -------
+        draws the levels of the last frame again, without
+        measuring anything (the window was cleared).
+
+        Parameters:
+        -------
+        win : curses.window
+            The window to draw in
+
+        top, left : int
+            Where to draw
+
+        height, width : int
+            The space to draw in
+        """
+
+        levels = self.levels.tolist()
+        if not levels or height < 1:
+            return
+
+        if self.mode == "vu":
+            # One row per channel, or both mixed when there's a single row
+            rows = [("L ", levels[0]), ("R ", levels[1])] if height >= 2 else [("  ", max(levels))]
+            for row, (label, level) in enumerate(rows):
+                bar = "#" * int(level * (width - len(label)))
+                win.addstr(top + row, left, (label + bar).ljust(width))
+            return
+
+        heights = [int(round(level * height)) for level in levels]
+        for row in range(height):
+            needed = height - row
+            line = "".join("# " if size >= needed else "  " for size in heights)
+            win.addstr(top + row, left, line[:width].ljust(width))
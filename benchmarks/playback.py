@@ -0,0 +1,139 @@
+"""
+Summary:
+-------
+measures how fast the streaming playback (Stream.py) produces audio.
+
+It reports:
+    - the real-time factor: the time spent producing the audio divided by
+      its length (below 1 means it keeps up, the lower the better)
+    - the time taken by every block, against the time the block lasts
+    - the memory allocated while producing every block
+
+Usage:
+-------
+    python benchmarks/playback.py song [next song] [crossfade seconds] [--equalizer]
+
+The songs are decoded and mixed as fast as possible, without an audio device.
+With a second song the first one fades into it. The equalizer uses a few
+typical bands.
+"""
+
+import os
+import sys
+import time
+import statistics
+import tracemalloc
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import Stream  # noqa: E402
+
+RATE = 44100
+CHANNELS = 2
+# Blocks at the start, while the decoder and numpy warm up, aren't counted in the allocations
+WARMUP = 8
+EQUALIZER = [[60, 4], [250, -2], [4000, 1], [12000, 3]]
+
+
+def render(songs, crossfade, equalizer) -> tuple:
+    """
+    Summary:
+    -------
+    produces the audio of some songs, one block at a time.
+
+    Parameters:
+    -------
+    songs : List
+        The songs, the first one fading into the second one
+
+    crossfade : float
+        The length of the crossfade, in seconds
+
+    equalizer : List
+        The gains of the equalizer
+
+    Returns:
+    -------
+    tuple
+        The frames produced, the time taken by every block
+        and the bytes allocated by every block
+    """
+
+    import numpy as np
+
+    pipeline = Stream.Pipeline(RATE, CHANNELS, crossfade, equalizer)
+    target = np.zeros((Stream.CHUNK, CHANNELS), dtype=np.int16)
+    # The length is only needed to fade, the end of a song is found anyway
+    pipeline.start(songs[0], length=_length(songs[0]) if len(songs) > 1 else None)
+    if len(songs) > 1:
+        pipeline.queue(songs[1])
+
+    times = []
+    allocated = []
+    frames = 0
+    tracemalloc.start()
+    while True:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        produced = pipeline.render(target)
+        times.append(time.perf_counter() - start)
+        allocated.append(tracemalloc.get_traced_memory()[1] - before)
+        if not produced:
+            break
+        frames += produced
+    tracemalloc.stop()
+    pipeline.close()
+    return frames, times[:-1], allocated[WARMUP:-1]
+
+
+def _length(song) -> float:
+    # Decoded once beforehand (not measured), so the benchmark doesn't depend on the tags
+    import numpy as np
+
+    frames = 0
+    pipeline = Stream.Pipeline(RATE, CHANNELS)
+    pipeline.start(song)
+    target = np.zeros((Stream.CHUNK, CHANNELS), dtype=np.int16)
+    while True:
+        produced = pipeline.render(target)
+        if not produced:
+            return frames / RATE
+        frames += produced
+
+
+def main():
+    arguments = [argument for argument in sys.argv[1:] if argument != "--equalizer"]
+    if not arguments:
+        print(__doc__)
+        return
+    if not Stream.available():
+        print("The streaming playback needs numpy and ffmpeg")
+        return
+
+    songs = [argument for argument in arguments if os.path.isfile(argument)][:2]
+    crossfade = next((float(argument) for argument in arguments if argument not in songs), 0.0)
+    equalizer = EQUALIZER if "--equalizer" in sys.argv else []
+
+    frames, times, allocated = render(songs, crossfade, equalizer)
+    seconds = frames / RATE
+    spent = sum(times)
+    block = Stream.CHUNK / RATE
+
+    print(f"{len(songs)} song(s), {seconds:.1f} s of audio, crossfade {crossfade:g} s, "
+          f"equalizer {'on' if equalizer else 'off'}")
+    print(f"Real-time factor: {spent / seconds:.4f} ({seconds / spent:.0f}x faster than playback)")
+    print(f"Time per block ({len(times)} blocks of {block * 1000:.1f} ms):")
+    print(f"{statistics.median(times) * 1000:10.3f} ms  median")
+    print(f"{sorted(times)[int(len(times) * 0.99)] * 1000:10.3f} ms  99th percentile")
+    print(f"{max(times) * 1000:10.3f} ms  slowest")
+    if allocated:
+        print("Memory allocated per block (largest temporary):")
+        print(f"{statistics.median(allocated):10.0f} B   median")
+        print(f"{max(allocated):10.0f} B   most")
+
+
+if __name__ == '__main__':
+    main()
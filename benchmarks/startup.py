@@ -0,0 +1,123 @@
+"""
+Summary:
+-------
+measures how long MusiCli takes to start.
+
+It reports:
+    - the modules that take the longest to import (python -X importtime)
+    - the time from launching the process to the first frame being drawn
+
+Usage:
+-------
+    python benchmarks/startup.py [runs]
+
+The player is started inside a pseudo terminal big enough for its windows,
+using the normal settings.config. It exits on its own once the first frame
+is drawn, without playing anything.
+"""
+
+import os
+import pty
+import sys
+import time
+import fcntl
+import select
+import struct
+import termios
+import tempfile
+import statistics
+import subprocess
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def importTimes(top=15):
+    """
+    Summary:
+    -------
+    imports MusiCli with -X importtime and prints the slowest modules.
+
+    Parameters:
+    -------
+    top : int
+        The number of modules to print
+    """
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import MusiCli"],
+                            cwd=root, capture_output=True, text=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times.append((int(cumulative), name.rstrip()))
+
+    if result.returncode:
+        print(result.stderr.splitlines()[-1])
+        return
+
+    print("Slowest imports (cumulative):")
+    for cumulative, name in sorted(times, reverse=True)[:top]:
+        print(f"{cumulative / 1000:10.1f} ms  {name}")
+
+
+def firstFrame() -> tuple:
+    """
+    Summary:
+    -------
+    starts the player in a pseudo terminal and waits for
+    the first frame to be drawn.
+
+    Returns:
+    -------
+    tuple
+        The time to the first frame measured from the outside
+        (process start) and from the inside (MusiCli import), in seconds
+    """
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        output = f.name
+
+    start = time.perf_counter()
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.chdir(root)
+        os.environ["MUSICLI_BENCHMARK"] = output
+        # The player needs a terminal that can change its colors
+        os.environ["TERM"] = "xterm-256color"
+        os.execv(sys.executable, [sys.executable, "MusiCli.py"])
+
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack("HHHH", 40, 160, 0, 0))
+    # Dismisses the welcome popup shown on the first start
+    os.write(fd, b"\n")
+    while True:
+        ready, _, _ = select.select([fd], [], [], 10)
+        try:
+            if not ready or not os.read(fd, 65536):
+                break
+        except OSError:
+            break
+    os.waitpid(pid, 0)
+    outside = time.perf_counter() - start
+
+    with open(output) as f:
+        inside = float(f.read() or "nan")
+    os.remove(output)
+    return outside, inside
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    importTimes()
+    print()
+
+    results = [firstFrame() for _ in range(runs)]
+    print(f"Time to first frame ({runs} runs, median):")
+    print(f"{statistics.median(r[0] for r in results) * 1000:10.1f} ms  from process start")
+    print(f"{statistics.median(r[1] for r in results) * 1000:10.1f} ms  from MusiCli import")
+
+
+if __name__ == '__main__':
+    main()
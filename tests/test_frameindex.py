@@ -0,0 +1,107 @@
+"""
+Summary:
+-------
+checks the MP3 frame index used for seeking (FrameIndex.py),
+on files made of silent frames.
+
+Usage:
+-------
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import FrameIndex
+
+
+# MPEG 1 layer III, 128 kbps, 44100 Hz, joint stereo: 417 bytes and 1152 samples per frame
+HEADER = b"\xff\xfb\x90\x44"
+SIZE = 417
+
+
+def frame(header=HEADER, size=SIZE, body=b""):
+    return header + body + bytes(size - len(header) - len(body))
+
+
+class ParseHeaderTest(unittest.TestCase):
+    def testLayer3(self):
+        self.assertEqual(FrameIndex._parseHeader(HEADER), (417, 44100, 1152, 1))
+        # With padding
+        self.assertEqual(FrameIndex._parseHeader(b"\xff\xfb\x92\x44"), (418, 44100, 1152, 1))
+
+    def testOtherVersionsAndLayers(self):
+        # MPEG 2 layer III, 64 kbps, 22050 Hz, mono
+        self.assertEqual(FrameIndex._parseHeader(b"\xff\xf3\x80\xc0"), (208, 22050, 576, 3))
+        # MPEG 1 layer II, 192 kbps, 48000 Hz
+        self.assertEqual(FrameIndex._parseHeader(b"\xff\xfd\xa4\x00"), (576, 48000, 1152, 0))
+        # MPEG 1 layer I, 32 kbps, 32000 Hz
+        self.assertEqual(FrameIndex._parseHeader(b"\xff\xff\x18\x00"), (48, 32000, 384, 0))
+
+    def testInvalid(self):
+        for header in (b"", b"\xff\xfb\x90", b"\x00\xfb\x90\x44", b"\xff\x1b\x90\x44",
+                       b"\xff\xeb\x90\x44", b"\xff\xf9\x90\x44", b"\xff\xfb\x00\x44",
+                       b"\xff\xfb\xf0\x44", b"\xff\xfb\x9c\x44"):
+            with self.subTest(header=header):
+                self.assertIsNone(FrameIndex._parseHeader(header))
+
+
+class BuildTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.folder.name, "song.mp3")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def build(self, data):
+        with open(self.file, "wb") as f:
+            f.write(data)
+        return FrameIndex.build(self.file)
+
+    def testIndex(self):
+        index = self.build(frame() * 100)
+        self.assertEqual(index.frameCount, 100)
+        self.assertAlmostEqual(index.duration, 100 * 1152 / 44100)
+        # One entry for every second: 38.28 frames per second
+        self.assertEqual(list(index.frames), [0, 39, 77])
+        self.assertEqual(list(index.offsets), [0, 39 * SIZE, 77 * SIZE])
+        offset, seconds = index.locate(1.5)
+        self.assertEqual((offset, seconds), (39 * SIZE, 39 * 1152 / 44100))
+        self.assertEqual(index.locate(-1)[0], 0)
+        self.assertEqual(index.locate(60)[0], 77 * SIZE)
+
+    def testTagsAndInfoFrame(self):
+        # An ID3v2 tag of 20 bytes, a Xing frame, some garbage and an ID3v1 tag at the end
+        tag = b"ID3\x04\x00\x00\x00\x00\x00\x14" + bytes(20)
+        info = frame(body=bytes(32) + b"Xing")
+        data = tag + info + frame() * 10 + b"\x00\x12" + frame() * 5 + b"TAG" + bytes(125)
+        index = self.build(data)
+        self.assertEqual(index.frameCount, 15)
+        self.assertEqual(index.offsets[0], len(tag) + SIZE)
+
+    def testNotAnMP3File(self):
+        self.assertIsNone(self.build(b""))
+        self.assertIsNone(self.build(b"RIFF" + bytes(1000)))
+
+
+class FileSliceTest(unittest.TestCase):
+    def testSlice(self):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b"0123456789")
+            f.flush()
+            with FrameIndex.FileSlice(f.name, 4) as part:
+                self.assertEqual(part.read(3), b"456")
+                self.assertEqual(part.tell(), 3)
+                part.seek(0)
+                self.assertEqual(part.read(), b"456789")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Summary:
+-------
+checks the play history (History.py): the aggregates kept in
+memory, and how they come back from the log and the saved stats.
+
+Usage:
+-------
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from History import History
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def play(self, history, path, times):
+        for _ in range(times):
+            history.record("start", path)
+            history.record("complete", path, 200.0, 200.0)
+
+    def testAggregates(self):
+        history = History(self.folder.name)
+        self.play(history, "a", 3)
+        self.play(history, "b", 1)
+        history.record("start", "c")
+        history.record("skip", "c", 10.0, 200.0)
+
+        self.assertEqual((history.plays("a"), history.plays("b"), history.plays("c")), (3, 1, 0))
+        self.assertEqual(history.skipRate("c"), 1.0)
+        self.assertEqual(history.skipRate("a"), 0.0)
+        self.assertIsNone(history.lastPlayed("c"))
+        self.assertIsNotNone(history.lastPlayed("a"))
+        self.assertEqual(history.mostPlayed(), ["a", "b"])
+        self.assertEqual(history.recentlyPlayed(), ["b", "a"])
+        self.assertEqual(history.plays("unknown"), 0)
+
+    def testLongSkipCountsAsPlayed(self):
+        history = History(self.folder.name)
+        self.assertEqual(history.record("skip", "a", 120.0, 200.0)[1], "complete")
+        self.assertEqual(history.record("skip", "b", 250.0)[1], "complete")
+        self.assertEqual(history.record("skip", "c", 30.0, 200.0)[1], "skip")
+
+    def testEventsWaitForTheFlush(self):
+        history = History(self.folder.name)
+        self.play(history, "a", 1)
+        history.flush()
+        self.assertFalse(os.path.exists(history.logFile))
+        history.flush(force=True)
+        with open(history.logFile, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def testReadOnly(self):
+        history = History(self.folder.name, writable=False)
+        self.play(history, "a", 1)
+        history.flush(force=True)
+        history.save()
+        self.assertEqual(os.listdir(self.folder.name), [])
+
+    def testReadBackFromTheLog(self):
+        history = History(self.folder.name)
+        self.play(history, "a", 2)
+        history.flush(force=True)
+        # A line cut short by a crash is left out
+        with open(history.logFile, "a", encoding="utf-8") as f:
+            f.write('[1.0, "complete", "a"')
+
+        history = History(self.folder.name)
+        self.assertEqual(history.plays("a"), 2)
+
+    def testReadBackFromTheStats(self):
+        history = History(self.folder.name)
+        self.play(history, "a", 2)
+        history.save()
+        # Only what was logged after the save is read from the log
+        self.play(history, "a", 1)
+        history.record("start", "b")
+        history.flush(force=True)
+
+        history = History(self.folder.name)
+        self.assertEqual((history.plays("a"), history.skipRate("b")), (3, 0.0))
+        self.assertEqual(history.recentlyPlayed(), ["a"])
+
+    def testReplacedLog(self):
+        history = History(self.folder.name)
+        self.play(history, "a", 2)
+        history.save()
+        # A log shorter than what the stats cover was replaced, the stats are dropped
+        with open(history.logFile, "w", encoding="utf-8") as f:
+            f.write('[1.0, "complete", "b", 0]\n')
+
+        history = History(self.folder.name)
+        self.assertEqual((history.plays("a"), history.plays("b")), (0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Summary:
+-------
+checks the keymaps (Keymap.py): the action bound to a key in
+every context, and the config file being watched for edits.
+
+Usage:
+-------
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import Keymap
+
+
+UP, DOWN, SPACE = 259, 258, 32
+
+
+def configuration(**changes):
+    # Every action on a key of its own, except the ones sharing the arrows as by default
+    actions = sorted({action for actions in Keymap.contexts.values() for action in actions})
+    keys = {f"ks_{action}": 1000 + i for i, action in enumerate(actions)}
+    keys.update(ks_SongSelectionUp=UP, ks_VolumeUp=UP, ks_SongSelectionDown=DOWN, ks_VolumeDown=DOWN,
+                ks_PlayPauseSong=SPACE, ks_Quit=ord("q"))
+    keys.update({f"ks_{action}": key for action, key in changes.items()})
+    return keys
+
+
+class KeymapTest(unittest.TestCase):
+    def testSharedKeysDependOnTheWindow(self):
+        keymap = Keymap.compileKeymap(configuration())
+        self.assertEqual(keymap["list"][UP], "SongSelectionUp")
+        self.assertEqual(keymap["bar"][UP], "VolumeUp")
+        self.assertEqual(keymap["queue"][DOWN], "SongSelectionDown")
+        self.assertEqual(keymap["bar"][SPACE], "PlayPauseSong")
+        self.assertNotIn(UP, keymap["meta"])
+
+    def testGlobalActions(self):
+        keymap = Keymap.compileKeymap(configuration())
+        for context in Keymap.windows:
+            self.assertEqual(keymap[context][ord("q")], "Quit")
+        # The popups only react to their own actions
+        self.assertNotIn(ord("q"), keymap["queue"])
+        self.assertNotIn(ord("q"), keymap["duplicates"])
+
+    def testConflicts(self):
+        # The global actions win over the window ones, then the ones listed first
+        keymap = Keymap.compileKeymap(configuration(Quit=SPACE, QueueRemove=UP))
+        self.assertEqual(keymap["list"][SPACE], "Quit")
+        self.assertEqual(keymap["queue"][SPACE], "PlayPauseSong")
+        self.assertEqual(keymap["queue"][UP], "SongSelectionUp")
+
+    def testRebuildAndReload(self):
+        with tempfile.TemporaryDirectory() as folder:
+            file = os.path.join(folder, "settings.config")
+            open(file, "w").close()
+            keymap = Keymap.Keymap(file, configuration())
+            tables = keymap.tables["list"]
+            self.assertEqual(keymap.action("list", SPACE), "PlayPauseSong")
+            self.assertIsNone(keymap.action("list", 1))
+            self.assertFalse(keymap.outdated())
+
+            os.utime(file, ns=(0, 0))
+            self.assertTrue(keymap.outdated())
+            self.assertFalse(keymap.outdated())
+
+            keymap.build(configuration(PlayPauseSong=ord("p")))
+            self.assertEqual(keymap.action("list", ord("p")), "PlayPauseSong")
+            self.assertNotIn(SPACE, keymap.tables["list"])
+            # The tables handed out stay valid
+            self.assertIs(keymap.tables["list"], tables)
+
+            os.remove(file)
+            self.assertTrue(keymap.outdated())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Summary:
+-------
+checks the library index (Library.LibraryIndex): the views kept
+sorted while songs are added, retagged and removed, the albums
+and the smart playlists.
+
+Usage:
+-------
+    python -m pytest tests
+"""
+
+import os
+import sys
+import unittest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from Library import Group, LibraryIndex, Song, unknown
+
+
+def song(path, artist, album, track=None, year=None, title=None):
+    # The metadata is given, so no file is read
+    return Song(path, {"artist": artist, "album": album, "track": track, "year": year,
+                       "title": title or path, "added": 0})
+
+
+def names(level):
+    return list(level)
+
+
+def paths(album):
+    return [song.path for song in album.allSongs if song != ".."]
+
+
+class LibraryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.library = LibraryIndex()
+        self.library.extend([song("b2", "Beatles", "Help", "2/14", "1965"),
+                             song("b1", "beatles", "Help", "1/14", "1965"),
+                             song("a1", "ABBA", "Gold", "01", "1992-09-21"),
+                             song("q1", "Queen", "Gold", "3"),
+                             song("u1", None, None, title="Zzz"),
+                             song("b0", "Beatles", "Help", None, "1965", title="Bonus")])
+
+    def testAlbumView(self):
+        artists = self.library.level()
+        self.assertEqual(names(artists), [unknown, "ABBA", "Beatles", "beatles", "Queen"])
+        self.assertIsInstance(artists["Beatles"], Group)
+        self.assertEqual((len(artists["Beatles"]), artists["Beatles"].songs), (1, 2))
+
+        albums = self.library.level("album", ["Beatles"])
+        # Songs without a track number come last
+        self.assertEqual(paths(albums["Help"]), ["b2", "b0"])
+        self.assertEqual(albums["Help"].allSongs[-1], "..")
+
+    def testAlbumsWithTheSameName(self):
+        self.assertEqual(paths(self.library.level("album", ["ABBA"])["Gold"]), ["a1"])
+        self.assertEqual(paths(self.library.level("album", ["Queen"])["Gold"]), ["q1"])
+
+    def testOtherViews(self):
+        self.assertEqual(names(self.library.level("year")), ["1965", "1992", unknown])
+        self.assertEqual(paths(self.library.level("year", ["1965"])["Help"]), ["b1", "b2", "b0"])
+        self.assertEqual(names(self.library.level("artist")), [unknown, "ABBA", "Beatles", "beatles", "Queen"])
+        self.assertEqual(paths(self.library.level("artist")["Beatles"]), ["b2", "b0"])
+        # An unknown view falls back to the album one
+        self.assertEqual(names(self.library.level("unknown")), names(self.library.level()))
+
+    def testRetagAndRemove(self):
+        self.library.update(song("q1", "ABBA", "Gold", "2"))
+        self.assertNotIn("Queen", self.library.level())
+        self.assertEqual(paths(self.library.level("album", ["ABBA"])["Gold"]), ["a1", "q1"])
+
+        self.library.remove("a1")
+        self.library.remove("q1")
+        self.library.remove("unknown")
+        self.assertNotIn("ABBA", self.library.level())
+        self.assertNotIn("a1", self.library)
+        self.assertEqual(len(self.library), 4)
+
+    def testShownAlbumsAreRebuiltWhenTheyChange(self):
+        shown = self.library.level("album", ["Beatles"])["Help"]
+        self.assertIs(self.library.level("album", ["Beatles"])["Help"], shown)
+        self.library.add(song("b3", "Beatles", "Help", "3"))
+        self.assertEqual(paths(self.library.level("album", ["Beatles"])["Help"]), ["b2", "b3", "b0"])
+
+    def testAlbumOfASong(self):
+        self.assertEqual([s.path for s in self.library.album(self.library.get("b0"))], ["b2", "b0"])
+        self.assertEqual(self.library.album(song("elsewhere", "Beatles", "Help")), [])
+
+    def testSmartPlaylists(self):
+        library = LibraryIndex({"Gold": ["album = gold", "sort -track"]})
+        library.extend(self.library.allSongs)
+        self.assertEqual(library.smartPlaylists, ["Gold"])
+        self.assertEqual(paths(library.smartPlaylist("Gold")), ["q1", "a1"])
+        library.remove("q1")
+        self.assertEqual(paths(library.smartPlaylist("Gold")), ["a1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Summary:
+-------
+checks how songs are found missing with one listing per folder
+(Scanner.listFiles, Parser.getSongsMissingFromPlaylist, M3U.load),
+and that the songs of a folder that can't be read are kept.
+
+Usage:
+-------
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import M3U
+import Parser
+import Scanner
+
+
+class ListingTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.folder.name)
+        os.makedirs(os.path.join(self.root, "album", "inner"))
+        for name in ("one.mp3", "two.mp3"):
+            open(os.path.join(self.root, "album", name), "wb").close()
+        # Listing it fails with an error other than the folder missing, like a drive gone offline
+        self.unreadable = os.path.join(self.root, "x" * 300)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def path(self, *names):
+        return os.path.join(self.root, *names)
+
+    def testListFiles(self):
+        self.assertEqual(Scanner.listFiles(self.path("album")), {"one.mp3", "two.mp3"})
+        self.assertEqual(Scanner.listFiles(self.path("gone")), set())
+        self.assertEqual(Scanner.listFiles(self.path("album", "one.mp3")), set())
+        self.assertIsNone(Scanner.listFiles(self.unreadable))
+
+    def testMissingFromPlaylists(self):
+        playlists = {"first": [self.path("album", "one.mp3"), self.path("album", "three.mp3"),
+                               self.path("gone", "song.mp3")],
+                     "second": [self.path("album", "two.mp3"), os.path.join(self.unreadable, "song.mp3")],
+                     "third": [self.path("album", "three.mp3")]}
+        self.assertEqual(Parser.getSongsMissingFromPlaylist(playlists),
+                         {"first": [self.path("album", "three.mp3"), self.path("gone", "song.mp3")],
+                          "third": [self.path("album", "three.mp3")]})
+        # The songs known to exist aren't checked
+        self.assertEqual(Parser.getSongsMissingFromPlaylist(playlists, {self.path("album", "three.mp3")}),
+                         {"first": [self.path("gone", "song.mp3")]})
+        self.assertEqual(Parser.getSongsMissingFromPlaylist({}), {})
+
+    def testPlaylistKeepsSongsOfUnreadableFolders(self):
+        playlist = self.path("list.m3u")
+        with open(playlist, "w", encoding="utf-8") as f:
+            f.write(f"album/one.mp3\n{os.path.join(self.unreadable, 'song.mp3')}\ngone/song.mp3\n")
+        found, missing = M3U.load(playlist)
+        self.assertEqual(found, [self.path("album", "one.mp3"), os.path.join(self.unreadable, "song.mp3")])
+        self.assertEqual(missing, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
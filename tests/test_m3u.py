@@ -0,0 +1,93 @@
+"""
+Summary:
+-------
+checks the M3U/M3U8 playlists (M3U.py): the entries read,
+the songs kept and the playlists written.
+
+Usage:
+-------
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import M3U
+
+
+class FakeSong:
+    def __init__(self, path, length=None):
+        self.path = path
+        self.artist = "Artist"
+        self.title = os.path.basename(path)
+        self.length = length
+
+
+class M3UTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.folder.name)
+        os.makedirs(os.path.join(self.root, "album"))
+        for name in ("one.mp3", "two.flac", "é.ogg"):
+            open(os.path.join(self.root, "album", name), "wb").close()
+        self.playlist = os.path.join(self.root, "list.m3u")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def path(self, *names):
+        return os.path.join(self.root, *names)
+
+    def writeLines(self, *lines, encoding="utf-8"):
+        with open(self.playlist, "wb") as f:
+            f.write("\n".join(lines).encode(encoding))
+
+    def testEntries(self):
+        self.writeLines("\ufeff#EXTM3U",
+                        "#EXTINF:200,Artist - One",
+                        "album/one.mp3",
+                        "",
+                        "  album\\two.flac  ",
+                        f"file://{self.path('album', 'one%20more.mp3')}",
+                        "http://radio.example/stream",
+                        "/elsewhere/song.mp3")
+        self.assertEqual(list(M3U.entries(self.playlist)),
+                         [self.path("album", "one.mp3"),
+                          self.path("album", "two.flac"),
+                          self.path("album", "one more.mp3"),
+                          "/elsewhere/song.mp3"])
+
+    def testLatin1(self):
+        self.writeLines("album/é.ogg", encoding="latin-1")
+        self.assertEqual(list(M3U.entries(self.playlist)), [self.path("album", "é.ogg")])
+
+    def testLoad(self):
+        self.writeLines("album/two.flac", "album/one.mp3", "album/missing.mp3", "album/two.flac",
+                        "gone/song.mp3")
+        found, missing = M3U.load(self.playlist)
+        # In order, without duplicates
+        self.assertEqual(found, [self.path("album", "two.flac"), self.path("album", "one.mp3")])
+        self.assertEqual(missing, 2)
+
+    def testWriteAndLoad(self):
+        songs = [FakeSong(self.path("album", "é.ogg"), 61.5), self.path("album", "one.mp3"), "/elsewhere/song.mp3"]
+        self.assertEqual(M3U.write(self.playlist, songs), 3)
+        self.assertFalse(os.path.exists(self.playlist + ".tmp"))
+
+        with open(self.playlist, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        # Songs inside the playlist's folder are written relative to it
+        self.assertEqual(lines, ["#EXTM3U", "#EXTINF:61,Artist - é.ogg", os.path.join("album", "é.ogg"),
+                                 os.path.join("album", "one.mp3"), "/elsewhere/song.mp3"])
+        self.assertEqual(list(M3U.entries(self.playlist)),
+                         [self.path("album", "é.ogg"), self.path("album", "one.mp3"), "/elsewhere/song.mp3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
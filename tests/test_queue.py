@@ -0,0 +1,180 @@
+"""
+Summary:
+-------
+checks the queue (Library.Queue): the play order, the lazy shuffle,
+the edits and the journal that keeps a mirror of the queue identical.
+
+Usage:
+-------
+    python -m pytest tests
+"""
+
+import os
+import sys
+import random
+import unittest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from Library import Queue
+
+
+class FakeSong:
+    # The queue only keeps the songs, any object that isn't a path does
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+def songs(count):
+    return [FakeSong(f"s{i}") for i in range(count)]
+
+
+class QueueTest(unittest.TestCase):
+    def assertConsistent(self, queue):
+        # Both orders hold the same songs and the positions rebuild the play order
+        self.assertEqual(sorted(map(id, queue.allSongs)), sorted(map(id, queue.linearSongs)))
+        order = queue.positions()
+        self.assertEqual(sorted(order), list(range(len(queue))))
+        self.assertEqual([queue.linearSongs[position] for position in order], queue.allSongs)
+
+    def testUnshuffledOrder(self):
+        queued = songs(5)
+        queue = Queue(*queued, start=2)
+        self.assertIs(queue.current, queued[2])
+        self.assertIs(queue.advance(), queued[3])
+        self.assertIs(queue.advance(), queued[4])
+        self.assertIs(queue.advance(), queued[0])
+        self.assertIs(queue.rewind(), queued[4])
+
+    def testEmptyQueue(self):
+        queue = Queue()
+        self.assertIsNone(queue.current)
+        self.assertIsNone(queue.advance())
+        self.assertIsNone(queue.rewind())
+        song = FakeSong("s")
+        queue.insertNext(song)
+        self.assertIs(queue.current, song)
+
+    def testShufflePlaysEverySongOnce(self):
+        queued = songs(50)
+        queue = Queue(*queued, start=7, shuffled=True)
+        self.assertIs(queue.current, queued[7])
+        # Nothing but the current song is drawn until it's needed
+        self.assertEqual(queue.drawn, 1)
+        played = [queue.current] + [queue.advance() for _ in range(49)]
+        self.assertEqual(sorted(map(id, played)), sorted(map(id, queued)))
+        self.assertConsistent(queue)
+
+    def testShuffleOffGoesBackToTheQueuedOrder(self):
+        queued = songs(20)
+        queue = Queue(*queued, shuffled=True)
+        for _ in range(5):
+            queue.advance()
+        current = queue.current
+        queue.shuffled = False
+        self.assertIs(queue.current, current)
+        self.assertEqual(queue.allSongs, queued)
+        self.assertEqual(queue.index, queued.index(current))
+
+    def testInsertNext(self):
+        queued = songs(4)
+        queue = Queue(*queued, start=1)
+        song = FakeSong("next")
+        queue.insertNext(song)
+        self.assertIs(queue.advance(), song)
+        self.assertEqual(queue.linearSongs, queued[:2] + [song] + queued[2:])
+
+    def testAppendWhileShuffledJoinsTheUndrawnSongs(self):
+        queue = Queue(*songs(10), shuffled=True)
+        drawn = queue.drawn
+        queue.append(FakeSong("last"))
+        self.assertEqual(queue.drawn, drawn)
+        self.assertEqual(len(queue), 11)
+        self.assertConsistent(queue)
+
+    def testPopKeepsTheCurrentSong(self):
+        queued = songs(5)
+        queue = Queue(*queued, start=3)
+        self.assertIs(queue.pop(1), queued[1])
+        self.assertIs(queue.current, queued[3])
+        self.assertEqual(queue.index, 2)
+        queue.pop(queue.index)
+        self.assertIs(queue.current, queued[4])
+
+    def testMoveKeepsTheCurrentSong(self):
+        queued = songs(5)
+        queue = Queue(*queued, start=2)
+        queue.move(0, 4)
+        self.assertIs(queue.current, queued[2])
+        self.assertEqual(queue.index, 1)
+        queue.move(1, 3)
+        self.assertIs(queue.current, queued[2])
+        self.assertEqual(queue.index, 3)
+        # Unshuffled, the queued order follows the play order
+        self.assertEqual(queue.linearSongs, queue.allSongs)
+
+    def testSongQueuedTwice(self):
+        # The same object twice: editing one of them must leave the other in place
+        song, other = FakeSong("twice"), FakeSong("other")
+        queue = Queue(song, other, song)
+        queue.pop(2)
+        self.assertEqual(queue.allSongs, [song, other])
+        self.assertEqual(queue.linearSongs, [song, other])
+        queue.shuffled = True
+        queue.append(song)
+        queue.pop(0)
+        self.assertConsistent(queue)
+        self.assertEqual(len(queue), 2)
+
+    def testRestoreExactly(self):
+        queue = Queue(*songs(30), start=4, shuffled=True)
+        for _ in range(10):
+            queue.advance()
+        restored = Queue(*queue.linearSongs, start=queue.index, shuffled=True,
+                         order=queue.positions(), drawn=queue.drawn)
+        self.assertEqual(restored.allSongs[:queue.drawn], queue.allSongs[:queue.drawn])
+        self.assertIs(restored.current, queue.current)
+        self.assertEqual(restored.drawn, queue.drawn)
+
+    def testReplayMakesAnIdenticalMirror(self):
+        rng = random.Random(1)
+        queued = songs(40)
+        queue = Queue(*queued, shuffled=True)
+        queue.journal = []
+        # Both start from the same play order, the journal holds what comes after
+        mirror = Queue(*queue.linearSongs, start=queue.index, shuffled=True,
+                       order=queue.positions(), drawn=queue.drawn)
+
+        for _ in range(300):
+            operation = rng.randrange(7)
+            if operation == 0:
+                queue.advance()
+            elif operation == 1:
+                queue.rewind()
+            elif operation == 2:
+                queue.insertNext(FakeSong("new"))
+            elif operation == 3:
+                queue.append(FakeSong("new"))
+            elif operation == 4 and len(queue) > 1:
+                queue.pop(rng.randrange(len(queue)))
+            elif operation == 5 and len(queue) > 1:
+                queue.move(rng.randrange(len(queue)), rng.randrange(len(queue)))
+            elif operation == 6:
+                queue.shuffled = not queue.shuffled
+
+            mirror.replay(queue.journal)
+            queue.journal.clear()
+            self.assertEqual(mirror.allSongs, queue.allSongs)
+            self.assertEqual(mirror.linearSongs, queue.linearSongs)
+            self.assertEqual((mirror.index, mirror.drawn, mirror.shuffled),
+                             (queue.index, queue.drawn, queue.shuffled))
+            self.assertConsistent(queue)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""
+Summary:
+-------
+checks how the music roots of the config file are read
+and validated (Engine.rootsAreValid).
+
+Usage:
+-------
+    python -m pytest tests
+"""
+
+import os
+import sys
+import unittest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import Engine
+
+
+class RootsTest(unittest.TestCase):
+    def testShortForms(self):
+        # The path alone, or without its last settings
+        self.assertEqual(Engine._root("/music"), ["/music", "eager", 0])
+        self.assertEqual(Engine._root(["/music"]), ["/music", "eager", 0])
+        self.assertEqual(Engine._root(("/music", "lazy")), ["/music", "lazy", 0])
+        self.assertEqual(Engine._root(["/music", "lazy", 30]), ["/music", "lazy", 30])
+
+    def testValid(self):
+        for roots in ([], ["/music"], [["/music", "lazy", 30], ["/nas", "eager", 0.5]], [["/music"], "/nas"]):
+            with self.subTest(roots=roots):
+                self.assertTrue(Engine.rootsAreValid(roots))
+
+    def testInvalid(self):
+        for roots in ("/music", None, [None], [[]], [["/music", "eager", 0, "extra"]], [[""]], [""],
+                      [[1]], [["/music", "sometimes"]], [["/music", "lazy", -1]], [["/music", "lazy", True]],
+                      [["/music", "lazy", "30"]], [{"path": "/music"}]):
+            with self.subTest(roots=roots):
+                self.assertFalse(Engine.rootsAreValid(roots))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Summary:
+-------
+checks the snapshot of the player (Session.py): what is saved
+comes back as it was, and broken snapshots are ignored.
+
+Usage:
+-------
+    python -m pytest tests
+"""
+
+import os
+import sys
+import struct
+import tempfile
+import unittest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import Session
+from Library import Queue
+
+
+def state(**changes):
+    saved = {"paths": ["/music/a.mp3", "/music/b.flac", "/music/\udcff.ogg"],
+             "order": [2, 0, 1],
+             "drawn": 2,
+             "index": 1,
+             "position": 83.25,
+             "shuffled": True,
+             "paused": True,
+             "insideAlbum": True,
+             "playlist": "Favorites",
+             "view": "Artists",
+             "album": "Album",
+             "browsePath": ["Artist", "Album"]}
+    saved.update(changes)
+    return saved
+
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.folder.name, "session.snapshot")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def testRoundTrip(self):
+        Session.save(self.file, state())
+        self.assertEqual(Session.load(self.file), state())
+        self.assertFalse(os.path.exists(self.file + ".tmp"))
+
+    def testUnshuffled(self):
+        # The play order isn't written, it's the order the songs were queued in
+        Session.save(self.file, state(shuffled=False, order=[0, 1, 2], drawn=3))
+        self.assertEqual(Session.load(self.file), state(shuffled=False, order=[0, 1, 2], drawn=3))
+
+    def testNothingToRestore(self):
+        saved = state(paths=[], order=[], drawn=0, index=0, playlist=None, album=None,
+                      insideAlbum=False, browsePath=[])
+        Session.save(self.file, saved)
+        self.assertEqual(Session.load(self.file), saved)
+
+    def testMissingFile(self):
+        self.assertIsNone(Session.load(self.file))
+
+    def testBrokenSnapshots(self):
+        Session.save(self.file, state())
+        with open(self.file, "rb") as f:
+            data = f.read()
+
+        for broken in (b"", data[:-3], b"XXXX" + data[4:]):
+            with open(self.file, "wb") as f:
+                f.write(broken)
+            self.assertIsNone(Session.load(self.file))
+
+        # A play order that doesn't hold every song once
+        offset = data.index(struct.pack("<3I", 2, 0, 1))
+        with open(self.file, "wb") as f:
+            f.write(data[:offset] + struct.pack("<3I", 2, 2, 1) + data[offset + 12:])
+        self.assertIsNone(Session.load(self.file))
+
+    def testShuffledQueueComesBackExactly(self):
+        songs = [object() for _ in range(25)]
+        queue = Queue(*songs, start=3, shuffled=True)
+        for _ in range(6):
+            queue.advance()
+
+        paths = [str(songs.index(song)) for song in queue.linearSongs]
+        Session.save(self.file, state(paths=paths, order=queue.positions(), drawn=queue.drawn,
+                                      index=queue.index))
+        saved = Session.load(self.file)
+
+        restored = Queue(*[songs[int(path)] for path in saved["paths"]], start=saved["index"],
+                         shuffled=saved["shuffled"], order=saved["order"], drawn=saved["drawn"])
+        self.assertEqual(restored.allSongs[:queue.drawn], queue.allSongs[:queue.drawn])
+        self.assertIs(restored.current, queue.current)
+        self.assertEqual(restored.drawn, queue.drawn)
+        # The songs left are drawn again, among the same ones
+        self.assertEqual(sorted(map(id, restored.allSongs[queue.drawn:])),
+                         sorted(map(id, queue.allSongs[queue.drawn:])))
+
+
+if __name__ == "__main__":
+    unittest.main()
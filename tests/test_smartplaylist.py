@@ -0,0 +1,134 @@
+"""
+Summary:
+-------
+checks the smart playlists (SmartPlaylist.py): the rules,
+the order of the songs and the limit.
+
+Usage:
+-------
+    python -m pytest tests
+"""
+
+import os
+import sys
+import time
+import unittest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import SmartPlaylist
+
+
+class FakeSong:
+    def __init__(self, path, **tags):
+        self.path = path
+        self.title = tags.get("title", path)
+        self.artist = tags.get("artist", "Artist")
+        self.album = tags.get("album", "Album")
+        self.year = tags.get("year")
+        self.track = tags.get("track")
+        self.length = tags.get("length", 200.0)
+        self.added = tags.get("added", time.time())
+        self.plays = tags.get("plays", 0)
+        self.lastPlayed = tags.get("lastPlayed")
+        self.skipRate = tags.get("skipRate", 0.0)
+
+
+def playlist(rules, *songs):
+    smart = SmartPlaylist.SmartPlaylist("test", rules)
+    for song in songs:
+        smart.insert(song)
+    return smart
+
+
+class CompileRulesTest(unittest.TestCase):
+    def testDefaults(self):
+        conditions, order, descending, limit = SmartPlaylist.compileRules([])
+        self.assertEqual((conditions, order, descending, limit), ([], SmartPlaylist.defaultOrder, False, None))
+
+    def testSortAndLimit(self):
+        _, order, descending, limit = SmartPlaylist.compileRules(["sort -plays", "limit 10"])
+        self.assertEqual(order, ["plays"] + SmartPlaylist.defaultOrder)
+        self.assertTrue(descending)
+        self.assertEqual(limit, 10)
+
+        # Sorting by a field of the default order doesn't list it twice
+        _, order, _, _ = SmartPlaylist.compileRules(["sort album"])
+        self.assertEqual(order, ["album", "artist", "track", "title"])
+
+    def testInvalidRules(self):
+        for rule in ("artist", "artist ~ Queen", "mood = happy", "plays contains 3", "sort mood",
+                     "limit many", "plays > many", "length < 5:xx"):
+            with self.subTest(rule=rule):
+                with self.assertRaises(ValueError):
+                    SmartPlaylist.compileRules([rule])
+                self.assertFalse(SmartPlaylist.rulesAreValid([rule]))
+
+    def testRulesAreValid(self):
+        self.assertTrue(SmartPlaylist.rulesAreValid(["artist = Queen", "length < 5:00", "sort -added"]))
+        self.assertFalse(SmartPlaylist.rulesAreValid("artist = Queen"))
+
+    def testFromConfiguration(self):
+        configuration = {"smart_ Recent": ["added < 30"], "musicFolder": "/music"}
+        self.assertEqual(SmartPlaylist.fromConfiguration(configuration), {"Recent": ["added < 30"]})
+
+
+class SmartPlaylistTest(unittest.TestCase):
+    def testConditions(self):
+        songs = [FakeSong("a", artist="Queen", length=180),
+                 FakeSong("b", artist="queen", length=400),
+                 FakeSong("c", artist="Abba", length=120),
+                 FakeSong("d", artist=None, length=100)]
+        self.assertEqual(playlist(["artist = Queen"], *songs).paths, ["a", "b"])
+        self.assertEqual(playlist(["artist = Queen", "length < 5:00"], *songs).paths, ["a"])
+        self.assertEqual(playlist(["artist contains b"], *songs).paths, ["c"])
+        # Songs without the tag never meet a condition on it
+        self.assertEqual(playlist(["artist != Queen"], *songs).paths, ["c"])
+
+    def testNumbers(self):
+        songs = [FakeSong("a", year="1999-05-01", track="3/12"),
+                 FakeSong("b", year=2004, track="1"),
+                 FakeSong("c", year="unknown")]
+        self.assertEqual(playlist(["year < 2000"], *songs).paths, ["a"])
+        self.assertEqual(playlist(["track >= 1", "track < 3"], *songs).paths, ["b"])
+
+    def testDays(self):
+        now = time.time()
+        songs = [FakeSong("old", added=now - 90 * 86400, lastPlayed=now - 86400),
+                 FakeSong("new", added=now - 86400),
+                 FakeSong("newest", added=now - 60)]
+        self.assertEqual(playlist(["added < 30", "sort added"], *songs).paths, ["newest", "new"])
+        self.assertEqual(playlist(["played < 7"], *songs).paths, ["old"])
+
+    def testDefaultOrder(self):
+        songs = [FakeSong("3", artist="B", album="X", track="1"),
+                 FakeSong("2", artist="A", album="Y", track="2"),
+                 FakeSong("1", artist="A", album="Y", track="1"),
+                 FakeSong("4", artist=None)]
+        # Songs without a value are sorted last
+        self.assertEqual(playlist([], *songs).paths, ["1", "2", "3", "4"])
+
+    def testDescendingAndLimit(self):
+        songs = [FakeSong(str(plays), plays=plays) for plays in (5, 1, 9, 3)]
+        smart = playlist(["sort -plays", "limit 2"], *songs)
+        self.assertEqual(smart.paths, ["9", "5"])
+        self.assertEqual(len(smart), 2)
+        self.assertEqual(playlist(["sort plays"], *songs).paths, ["1", "3", "5", "9"])
+
+    def testDelete(self):
+        songs = [FakeSong(str(plays), plays=plays) for plays in (5, 1, 9)]
+        smart = playlist(["sort plays"], *songs)
+        smart.changed = False
+        smart.delete("5")
+        self.assertEqual(smart.paths, ["1", "9"])
+        self.assertTrue(smart.changed)
+
+        smart.changed = False
+        smart.delete("unknown")
+        self.assertFalse(smart.changed)
+
+
+if __name__ == "__main__":
+    unittest.main()